@@ -795,6 +795,22 @@ class ApiService {
     }
   }
 
+  static Future<Map<String, dynamic>> getUnreadNotificationCount() async {
+    try {
+      final response = await http.get(
+        Uri.parse('$baseUrl$apiVersion/notifications/unread-count/'),
+        headers: _getHeaders(),
+      );
+
+      return await _handleResponse(response);
+    } catch (e) {
+      return {
+        'success': false,
+        'error': 'Network error: $e',
+      };
+    }
+  }
+
   static Future<Map<String, dynamic>> markNotificationAsRead(int id) async {
     try {
       final response = await http.post(
@@ -2,4 +2,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pos_tracker.settings")
+# Web workers skip the scheduler apps (see PROCESS_ROLE in settings)
+os.environ.setdefault("PROCESS_ROLE", "web")
 application = get_asgi_application()
@@ -1,6 +1,5 @@
 from pathlib import Path
 import os
-import pymysql
 import logging
 
 # Apply compatibility monkeypatch for Django template Context on Python 3.14+
@@ -10,21 +9,20 @@ try:
 except Exception:
     pass
 
-# Install MySQL driver
-pymysql.install_as_MySQLdb()
-
 # Base directory of the project
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Load .env (optional) - set environment-specific variables here
-try:
-    from dotenv import load_dotenv
-    load_dotenv(BASE_DIR / '.env')
-    logger = logging.getLogger(__name__)
-    logger.info(f"Loaded .env from {BASE_DIR / '.env'}")
-except Exception:
-    # dotenv not installed or .env missing; fall back to environment
-    pass
+# Load .env (optional) - set environment-specific variables here. dotenv is only
+# imported when there is a file to load.
+if (BASE_DIR / '.env').exists():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(BASE_DIR / '.env')
+        logger = logging.getLogger(__name__)
+        logger.info(f"Loaded .env from {BASE_DIR / '.env'}")
+    except Exception:
+        # dotenv not installed; fall back to environment
+        pass
 
 # Security key (DO NOT use the default in production)
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-your-secret-key-here')
@@ -48,6 +46,11 @@ else:
         'https://a99e3758fd314a06b25b47e7ff9cefff-dbdd01988b5e48108627748db.fly.dev',
     ]
 
+# Process role: 'web' (set by wsgi.py/asgi.py) serves requests only; 'worker' and
+# 'all' (manage.py's default) also load the scheduler apps, for run_scheduler and migrate
+PROCESS_ROLE = os.environ.get('PROCESS_ROLE', 'all').lower()
+SCHEDULER_APPS = ["django_apscheduler"]
+
 # Application definition
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -57,24 +60,31 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.humanize",
-    "django_apscheduler",
     "rest_framework",
     "rest_framework.authtoken",
     "corsheaders",
     "tracker.apps.TrackerConfig",
 ]
+if PROCESS_ROLE != 'web':
+    INSTALLED_APPS += SCHEDULER_APPS
 
 MIDDLEWARE = [
+    "tracker.middleware.RequestLogContextMiddleware",
+    "tracker.middleware.TracingMiddleware",
+    "tracker.middleware.DBStatsMiddleware",
+    "tracker.middleware.MetricsMiddleware",
+    "tracker.middleware.CostBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "tracker.middleware.ProfilerMiddleware",  # After AuthenticationMiddleware: X-Profile checks request.user
+    "tracker.middleware.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "tracker.middleware.TimezoneMiddleware",  # Custom middleware
-    "tracker.middleware.AutoProgressOrdersMiddleware",  # Auto-progress orders
 ]
 
 ROOT_URLCONF = "pos_tracker.urls"
@@ -97,32 +107,140 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "pos_tracker.wsgi.application"
+ASGI_APPLICATION = "pos_tracker.asgi.application"
+
+# Serve the hottest read endpoints from async views (enable when running under ASGI)
+ASYNC_READ_VIEWS = str(os.environ.get('ASYNC_READ_VIEWS', 'False')).lower() in ('1', 'true', 'yes')
+
+# DATABASE CONFIGURATION
+# DB_PROFILE=sqlite (default, single box) or DB_PROFILE=mysql (production, several app servers)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite').lower()
+
+# Optional bounded pool shared by all threads of a process (tracker.db_pool). Use it
+# under ASGI, where every request runs in a new thread and Django's per-thread
+# persistent connections are never reused. DB_POOL_SIZE=0 (default) disables it.
+DB_POOL = {
+    'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE', '0')),
+    'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '5')),      # Wait for a free connection
+    'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '1800')),     # Reconnect after this many seconds
+    'CHECK_AFTER': int(os.environ.get('DB_POOL_CHECK_AFTER', '30')),  # Ping connections idle this long
+} if int(os.environ.get('DB_POOL_SIZE', '0')) > 0 else None
+
+# Persistent connections (ignored while pooling: connections go back to the pool
+# after each request). CONN_HEALTH_CHECKS pings a reused connection before a request.
+DB_CONN_MAX_AGE = 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '300' if DB_PROFILE == 'mysql' else '0'))
+
+DATABASE_REPLICAS = []
+
+if DB_PROFILE == 'mysql':
+    # PyMySQL stands in for mysqlclient; only imported by the MySQL profile
+    import pymysql
+    pymysql.install_as_MySQLdb()
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'tracker.mysql_backend',
+            'NAME': os.environ.get('DB_NAME', '7pos_db'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'OPTIONS': {
+                'init_command': os.environ.get('DB_INIT_COMMAND', "SET sql_mode='STRICT_TRANS_TABLES', default_storage_engine=INNODB"),
+                'charset': os.environ.get('DB_CHARSET', 'utf8mb4'),
+                'autocommit': str(os.environ.get('DB_AUTOCOMMIT', 'True')).lower() in ('1', 'true', 'yes'),
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+            },
+            'TIME_ZONE': os.environ.get('TIME_ZONE', 'Asia/Riyadh'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': DB_POOL,
+        }
+    }
+    # Read replicas: DB_REPLICA_HOSTS=host1,host2 (same credentials as the primary)
+    for _index, _host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+        DATABASES[f'replica{_index}'] = {**DATABASES['default'], 'HOST': _host.strip(), 'TEST': {'MIRROR': 'default'}}
+        DATABASE_REPLICAS.append(f'replica{_index}')
 
- # DATABASE CONFIGURATION (MySQL) 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.mysql'),
-#         'NAME': os.environ.get('DB_NAME', '7pos_db'),
-#         'USER': os.environ.get('DB_USER', 'root'),
-#         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
-#         'HOST': os.environ.get('DB_HOST', 'localhost'),
-#         'PORT': os.environ.get('DB_PORT', '3306'),
-#         'OPTIONS': {
-#             'init_command': os.environ.get('DB_INIT_COMMAND', "SET sql_mode='STRICT_TRANS_TABLES', default_storage_engine=INNODB"),
-#             'charset': os.environ.get('DB_CHARSET', 'utf8mb4'),
-#             'autocommit': str(os.environ.get('DB_AUTOCOMMIT', 'True')).lower() in ('1', 'true', 'yes'),
-#         },
-#         'TIME_ZONE': os.environ.get('TIME_ZONE', 'Asia/Riyadh'),
-#         'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '300')),
-#     }
-# }
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    # MySQL has no partial indexes; Django creates the plain ones and skips these
+    SILENCED_SYSTEM_CHECKS = ['models.W037']
+    SQLITE_PRAGMAS = {}
+else:
+    # SQLite production profile: pragmas applied to every new connection (tracker.sqlite)
+    # and BEGIN IMMEDIATE transactions (tracker.sqlite_backend). WAL lets readers run
+    # alongside the single writer; busy_timeout makes writers wait for the lock instead
+    # of failing with "database is locked". SQLITE_TUNED=false keeps SQLite's defaults.
+    SQLITE_TUNED = str(os.environ.get('SQLITE_TUNED', 'True')).lower() in ('1', 'true', 'yes')
+    SQLITE_ENGINE = 'tracker.sqlite_backend' if SQLITE_TUNED else 'django.db.backends.sqlite3'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # KiB, i.e. 64 MB per connection
+        'temp_store': 'MEMORY',
+    } if SQLITE_TUNED else {}
+
+    DATABASES = {
+        'default': {
+            'ENGINE': SQLITE_ENGINE,
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': DB_POOL if SQLITE_TUNED else None,
+        }
+    }
+
+    # Read replicas. Locally, DB_REPLICA_SQLITE=/path/replica.sqlite3 (comma separated for
+    # several) adds SQLite replicas; refresh them from the primary with manage.py sync_replica.
+    for _index, _path in enumerate(filter(None, os.environ.get('DB_REPLICA_SQLITE', '').split(',')), start=1):
+        DATABASES[f'replica{_index}'] = {
+            **DATABASES['default'],
+            'NAME': _path.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(f'replica{_index}')
+
+DATABASE_ROUTERS = ['tracker.db_router.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing (read-your-writes)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
+# CACHES
+# 'default' is per process. 'shared' is seen by every process (unread counters, replica
+# pins, second tier of the response cache): CACHE_BACKEND=file (default, one box),
+# redis (REDIS_URL, needs the redis package) or locmem (single process only).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'file').lower()
+if CACHE_BACKEND == 'redis':
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
     }
+elif CACHE_BACKEND == 'locmem':
+    _shared_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'}
+else:
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 5000, 'CULL_FREQUENCY': 4},
+    }
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {**_shared_cache, 'TIMEOUT': 300, 'KEY_PREFIX': 'sitms'},
 }
 
+# Tiered response cache for catalog and organization reads (tracker.cache)
+RESPONSE_CACHE_ENABLED = str(os.environ.get('RESPONSE_CACHE_ENABLED', 'True')).lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_TIMEOUT = 300            # Seconds in the shared tier
+RESPONSE_CACHE_LOCAL_MAX_ENTRIES = 1000  # Per-process LRU size
+RESPONSE_CACHE_LOCAL_TIMEOUT = 60       # Seconds in the per-process tier
+RESPONSE_CACHE_TAG_TIMEOUT = 1          # How long a process trusts its copy of tag versions
+
+# Token -> user lookups cached per process (tracker.authentication)
+AUTH_TOKEN_CACHE_ENABLED = str(os.environ.get('AUTH_TOKEN_CACHE_ENABLED', 'True')).lower() in ('1', 'true', 'yes')
+AUTH_TOKEN_CACHE_TIMEOUT = 300          # Seconds before a token is re-read from the database
+AUTH_TOKEN_CACHE_MAX_ENTRIES = 10000
+
 # Timezone settings
 TIME_ZONE = 'Asia/Riyadh'
 USE_TZ = True
@@ -163,6 +281,49 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Acceptance letter PDFs (tracker.letters); outside MEDIA_ROOT, they are only downloaded through the API
+LETTERS_ROOT = BASE_DIR / 'letters'
+# Uploaded CVs (tracker.cv_ingestion); private like the letters
+CVS_ROOT = BASE_DIR / 'cvs'
+
+# Profile photos and logos are stored once per content under blobs/<sha256> (tracker.storage)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'uploads': {'BACKEND': 'tracker.storage.ContentAddressedStorage'},
+    'letters': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': LETTERS_ROOT}},
+    'cvs': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': CVS_ROOT}},
+}
+MEDIA_BLOB_GRACE_SECONDS = 24 * 60 * 60  # Unreferenced blobs are kept this long before deletion
+# How /media/ responses carry the file: 'x-accel' (nginx X-Accel-Redirect to MEDIA_ACCEL_PREFIX),
+# 'x-sendfile' (Apache/lighttpd) or '' (Django streams it; development only)
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '' if DEBUG else 'x-accel').lower()
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_SECONDS = 60 * 60  # Legacy (not content-addressed) uploads
+MEDIA_IMMUTABLE_CACHE_SECONDS = 365 * 24 * 60 * 60  # Blobs and thumbnails: names change with content
+
+# Resized variants of profile photos and logos (tracker.thumbnails), by longest side in pixels
+THUMBNAILS_ENABLED = str(os.environ.get('THUMBNAILS_ENABLED', 'True')).lower() in ('1', 'true', 'yes')
+THUMBNAIL_SIZES = {'small': 64, 'medium': 160, 'large': 480}
+THUMBNAIL_FORMAT = os.environ.get('THUMBNAIL_FORMAT', 'webp')  # 'webp' or 'jpeg'
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 1  # Background render threads per process
+
+# Acceptance letter rendering (tracker.letters)
+LETTER_WORKERS = int(os.environ.get('LETTER_WORKERS', '2'))  # Render processes per batch; 0 renders in-thread
+LETTER_MAX_IN_FLIGHT = 64  # Letters queued on the pool at once (bounds a batch's memory)
+LETTER_POOL_CHUNK = 8  # Letters per pool task
+LETTER_BATCH_STALE_SECONDS = 10 * 60  # A running batch without progress for this long is resumed
+
+# CV ingestion (tracker.cv_ingestion): PyMuPDF text extraction, tesseract OCR for image-only pages
+CV_WORKERS = int(os.environ.get('CV_WORKERS', '2'))  # Extraction processes; 0 extracts in-thread
+CV_DOCUMENT_TIMEOUT = int(os.environ.get('CV_DOCUMENT_TIMEOUT', '120'))  # Seconds per CV, OCR included
+CV_MAX_ATTEMPTS = 3  # Tries per CV when its pool process dies under it (a crash, or another CV's timeout)
+CV_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+CV_MAX_PAGES = 20  # Pages read per CV
+CV_OCR_LANGUAGES = os.environ.get('CV_OCR_LANGUAGES', 'eng')  # tesseract -l, e.g. 'eng+swa'
+CV_OCR_DPI = 300
+
 # Allow same-origin embedding (needed to preview PDFs in iframes)
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
@@ -189,11 +350,20 @@ if not DEBUG:
 # APScheduler configuration
 APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"
 APSCHEDULER_RUN_NOW_TIMEOUT = 25  # Seconds
+LIFECYCLE_SWEEP_INTERVAL_MINUTES = int(os.environ.get('LIFECYCLE_SWEEP_INTERVAL_MINUTES', '15'))
+
+# Background maintenance tasks (run by `manage.py run_scheduler`, never in the request path)
+MAINTENANCE_TASK_MODULES = [
+    'tracker.lifecycle',
+    'tracker.retention',
+    'tracker.maintenance',
+]
+MAINTENANCE_TASK_TICK_SECONDS = 60  # How often each node checks whether a task is due
 
 # Django REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'tracker.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -209,15 +379,31 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
     ),
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'tracker.throttling.SharedAnonRateThrottle',
+        'tracker.throttling.SharedUserRateThrottle',
+        'tracker.throttling.CostBudgetThrottle',
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'cost': '120000/hour',  # DB query-milliseconds per client (CostBudgetThrottle)
     }
 }
 
+# Throttle counters shared by all worker processes (tracker.throttling):
+# 'sqlite' (THROTTLE_DB file), 'cache' (the 'shared' cache; atomic with Redis) or 'local'
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'sqlite')
+THROTTLE_DB = os.environ.get('THROTTLE_DB', str(BASE_DIR / 'throttle.sqlite3'))
+
+# Notification stream (server-sent events, ASGI only)
+# 'broadcast' pushes from post_save in-process; use 'poll' when running several worker processes
+NOTIFICATION_STREAM_BACKEND = os.environ.get('NOTIFICATION_STREAM_BACKEND', 'broadcast')
+NOTIFICATION_STREAM_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_STREAM_POLL_INTERVAL', '2'))  # Seconds
+NOTIFICATION_STREAM_LOOKBACK = 10  # Seconds re-read for notifications whose transaction committed late
+NOTIFICATION_STREAM_HEARTBEAT = 15  # Seconds between keepalive comments
+NOTIFICATION_STREAM_RETRY_MS = 3000  # Client reconnect delay
+NOTIFICATION_STREAM_QUEUE_SIZE = 100  # Pending events per connection before it is dropped
+
 # CORS Configuration - Allow Flutter app and frontend
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8081",
@@ -229,7 +415,58 @@ CORS_ALLOWED_ORIGINS = [
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 
+# Let browser clients read their remaining cost budget
+CORS_EXPOSE_HEADERS = [
+    'X-Cost-Budget-Limit', 'X-Cost-Budget-Remaining', 'X-Cost-Budget-Reset', 'X-Request-Cost', 'X-Trace-Id',
+]
+
+# Per-route request metrics (tracker.metrics), served at /metrics to staff
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / '.metrics'))  # One file per worker process
+METRICS_FLUSH_SECONDS = 5
+SERVER_TIMING = str(os.environ.get('SERVER_TIMING', str(DEBUG))).lower() in ('1', 'true', 'yes')
+
+# Slow-query and N+1 reports (tracker.slow_queries; `manage.py slow_queries`)
+SLOW_QUERY_LOG = str(os.environ.get('SLOW_QUERY_LOG', 'True')).lower() in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '10'))  # Same statement this often in one request
+SLOW_QUERY_DB = os.environ.get('SLOW_QUERY_DB', str(BASE_DIR / 'slow_queries.sqlite3'))
+
+# On-demand request profiler (tracker.profiling; `manage.py profiles`)
+PROFILER_ENABLED = str(os.environ.get('PROFILER_ENABLED', 'True')).lower() in ('1', 'true', 'yes')
+PROFILER_SPOOL_DIR = os.environ.get('PROFILER_SPOOL_DIR', str(BASE_DIR / '.profiles'))
+PROFILER_SPOOL_MAX_PROFILES = 100
+PROFILER_INTERVAL_MS = 5             # Stack sampling period
+PROFILER_TRACEMALLOC_FRAMES = 10     # Frames kept per allocation
+PROFILER_TOP_ALLOCATIONS = 25
+
+# Request tracing (tracker.tracing): every request is traced in memory, and only
+# slow or failed ones (plus TRACE_SAMPLE_RATE of the rest) are written to TRACE_FILE
+TRACE_ENABLED = str(os.environ.get('TRACE_ENABLED', 'True')).lower() in ('1', 'true', 'yes')
+TRACE_FILE = os.environ.get('TRACE_FILE', str(BASE_DIR / 'traces.jsonl'))
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', str(50 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = 3
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', '500'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))  # Fraction of fast, successful traces kept
+TRACE_MAX_SPANS = 2000               # Per trace; further spans are counted, not kept
+TRACE_MAX_STATEMENT_LENGTH = 1000
+
+# Cold start budget for a web worker: interpreter start to first response
+# (`manage.py benchmark_startup` fails above it)
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '1500'))
+
 # Logging configuration
+# Everything goes through one non-blocking QueuedHandler (tracker.logs): records are
+# tagged with request/user ids, high-volume loggers are sampled, and a background
+# thread writes JSON lines to a size-rotated LOG_FILE (plus INFO+ to the console).
+LOG_FILE = os.environ.get('LOG_FILE', str(BASE_DIR / 'debug.log'))
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '5'))
+# Fraction of sub-WARNING records kept per logger prefix (whole requests are kept or dropped)
+LOG_SAMPLE_RATES = {
+    'django.db.backends': float(os.environ.get('LOG_SQL_SAMPLE_RATE', '0.01')),
+    'tracker.db_stats': 0.1,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -242,22 +479,50 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'tracker.logs.JSONFormatter',
+        },
+    },
+    'filters': {
+        'request_context': {
+            '()': 'tracker.logs.RequestContextFilter',
+        },
+        'sampling': {
+            '()': 'tracker.logs.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
     },
     'handlers': {
-        'file': {
+        'queue': {
+            '()': 'tracker.logs.QueuedHandler',
             'level': 'DEBUG' if DEBUG else 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'debug.log',
-            'formatter': 'verbose',
+            'filters': ['sampling', 'request_context'],
+            'filename': LOG_FILE,
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'console_level': 'INFO',
         },
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+        'traces': {
+            '()': 'tracker.logs.QueuedHandler',
+            'filename': TRACE_FILE,
+            'max_bytes': TRACE_MAX_BYTES,
+            'backup_count': TRACE_BACKUP_COUNT,
+            'raw': True,
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
+        'handlers': ['queue'],
         'level': 'DEBUG' if DEBUG else 'INFO',
     },
+    'loggers': {
+        'tracker.traces': {
+            'handlers': ['traces'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
+
+# SQL statement logging (DEBUG only; sampled by LOG_SQL_SAMPLE_RATE)
+if DEBUG and str(os.environ.get('LOG_SQL', 'False')).lower() in ('1', 'true', 'yes'):
+    LOGGING['loggers']['django.db.backends'] = {'level': 'DEBUG'}
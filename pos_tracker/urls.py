@@ -28,6 +28,18 @@ urlpatterns = [
     path('api/auth/login/', views.login, name='login'),
     path('api/auth/profile/', views.user_profile, name='user_profile'),
     
+    # API v1 - Response cache hit ratios (staff only)
+    path('api/v1/cache-stats/', views.cache_stats, name='cache_stats'),
+    
+    # Prometheus metrics (staff only)
+    path('metrics', views.metrics_view, name='metrics'),
+    
+    # Uploads and thumbnails, sent by the web server (see MEDIA_SENDFILE)
+    re_path(r'^media/(?P<path>.+)$', views.media, name='media'),
+    
+    # API v1 - Notification stream (server-sent events, served under ASGI)
+    path('api/v1/notifications/stream/', views.notification_stream, name='notification_stream'),
+    
     # API v1 - ViewSets (handled by router)
     path('api/v1/', include(router.urls)),
     
@@ -38,7 +50,19 @@ urlpatterns = [
     path('', include('tracker.urls')),
 ]
 
-# Serve media files in development
+# Async read endpoints for ASGI deployments; they shadow the matching router URLs (<int:pk> so
+# the viewset's list actions, e.g. training-opportunities/my_opportunities/, still reach the router)
+if settings.ASYNC_READ_VIEWS:
+    from tracker import async_views
+    urlpatterns = [
+        path('api/auth/profile/', async_views.user_profile, name='user_profile'),
+        path('api/v1/notifications/', async_views.notification_list, name='notification-list'),
+        path('api/v1/training-opportunities/', async_views.opportunity_list, name='training-opportunity-list'),
+        path('api/v1/training-opportunities/<int:pk>/', async_views.opportunity_detail, name='training-opportunity-detail'),
+        path('api/v1/students/my_profile/', async_views.student_my_profile, name='student-my-profile'),
+        path('api/v1/organizations/my_profile/', async_views.organization_my_profile, name='organization-my-profile'),
+    ] + urlpatterns
+
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -3,10 +3,11 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.db.models import Q, Count
 from django.utils import timezone
+from .cache import response_cache, tags_for_instance
 from .models import (
     Institution, Department, Course, Skill, Student, Organization,
     TrainingOpportunity, Application, ApplicationStatusHistory, Notification,
-    SystemConfig, Review
+    NotificationArchive, SystemConfig, TaskLease, TaskRun, Review
 )
 
 
@@ -14,8 +15,18 @@ from .models import (
 # CUSTOM ADMIN ACTIONS
 # ============================================================================
 
+def _invalidate_cached_responses(queryset):
+    """queryset.update() sends no post_save, so retire the cached responses here"""
+    tags = set()
+    for instance in queryset:
+        tags.update(tags_for_instance(instance) or ())
+    if tags:
+        response_cache.invalidate_on_commit(sorted(tags))
+
+
 def mark_as_active(modeladmin, request, queryset):
     """Mark selected items as active"""
+    _invalidate_cached_responses(queryset)
     updated = queryset.update(is_active=True)
     modeladmin.message_user(request, f'{updated} items marked as active.')
 mark_as_active.short_description = 'Mark selected as active'
@@ -23,6 +34,7 @@ mark_as_active.short_description = 'Mark selected as active'
 
 def mark_as_inactive(modeladmin, request, queryset):
     """Mark selected items as inactive"""
+    _invalidate_cached_responses(queryset)
     updated = queryset.update(is_active=False)
     modeladmin.message_user(request, f'{updated} items marked as inactive.')
 mark_as_inactive.short_description = 'Mark selected as inactive'
@@ -30,6 +42,7 @@ mark_as_inactive.short_description = 'Mark selected as inactive'
 
 def verify_organizations(modeladmin, request, queryset):
     """Mark selected organizations as verified"""
+    _invalidate_cached_responses(queryset)
     updated = queryset.update(is_verified=True, verified_at=timezone.now(), verified_by=request.user)
     modeladmin.message_user(request, f'{updated} organizations verified.')
 verify_organizations.short_description = 'Verify selected organizations'
@@ -37,6 +50,7 @@ verify_organizations.short_description = 'Verify selected organizations'
 
 def unverify_organizations(modeladmin, request, queryset):
     """Mark selected organizations as unverified"""
+    _invalidate_cached_responses(queryset)
     updated = queryset.update(is_verified=False, verified_at=None, verified_by=None)
     modeladmin.message_user(request, f'{updated} organizations unverified.')
 unverify_organizations.short_description = 'Unverify selected organizations'
@@ -264,7 +278,7 @@ class OrganizationAdmin(admin.ModelAdmin):
     list_display = ('name', 'industry_type', 'location', 'is_verified', 'rating', 'review_count', 'opportunity_count', 'is_active')
     list_filter = ('is_verified', 'is_active', 'location', 'industry_type', 'created_at')
     search_fields = ('name', 'industry_type', 'location', 'email')
-    readonly_fields = ('created_at', 'updated_at', 'verified_at', 'rating', 'review_count', 'opportunity_count')
+    readonly_fields = ('created_at', 'updated_at', 'verified_at', 'rating', 'review_count', 'rating_histogram', 'opportunity_count')
     actions = [mark_as_active, mark_as_inactive, verify_organizations, unverify_organizations]
     filter_horizontal = ('supported_courses', 'required_skills')
     
@@ -287,7 +301,7 @@ class OrganizationAdmin(admin.ModelAdmin):
             'fields': ('is_verified', 'verified_by', 'verified_at')
         }),
         ('Ratings', {
-            'fields': ('rating', 'review_count'),
+            'fields': ('rating', 'review_count', 'rating_histogram'),
             'classes': ('collapse',)
         }),
         ('Status', {
@@ -466,6 +480,17 @@ class NotificationAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'notification_type', 'was_read', 'created_at', 'archived_at')
+    list_filter = ('notification_type', 'was_read', 'archived_at')
+    search_fields = ('title', 'message', 'user__username')
+    readonly_fields = [f.name for f in NotificationArchive._meta.fields]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 # ============================================================================
 # REVIEW ADMIN
 # ============================================================================
@@ -543,6 +568,29 @@ class SystemConfigAdmin(admin.ModelAdmin):
     value_preview.short_description = 'Value'
 
 
+# ============================================================================
+# BACKGROUND TASK ADMIN
+# ============================================================================
+
+@admin.register(TaskRun)
+class TaskRunAdmin(admin.ModelAdmin):
+    list_display = ('task_name', 'started_at', 'duration_ms', 'succeeded', 'stats')
+    list_filter = ('task_name', 'succeeded', 'started_at')
+    readonly_fields = [f.name for f in TaskRun._meta.fields]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TaskLease)
+class TaskLeaseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'expires_at', 'last_run_at', 'last_success_at', 'last_duration_ms')
+    readonly_fields = [f.name for f in TaskLease._meta.fields]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 # ============================================================================
 # ADMIN SITE CUSTOMIZATION
 # ============================================================================
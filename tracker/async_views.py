@@ -0,0 +1,236 @@
+"""
+Async versions of the hottest read endpoints, served when running under ASGI.
+DRF views are synchronous, so each handler runs DRF's own authentication,
+permission, throttling and filtering in a single thread hop, then fetches rows
+with Django's async ORM and serializes fully prefetched instances, so the
+event loop is not tied up while the database works.
+Enabled with the ASYNC_READ_VIEWS setting (see pos_tracker/urls.py); other
+methods on the same URLs fall through to the regular viewsets.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Prefetch
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Course, Organization, Student
+from .serializers import (
+    NotificationSerializer, OrganizationDetailSerializer, StudentDetailSerializer,
+    TrainingOpportunityDetailSerializer, TrainingOpportunityListSerializer, UserDetailSerializer
+)
+from .views import (
+    NotificationViewSet, OrganizationViewSet, StudentViewSet, TrainingOpportunityViewSet,
+    user_profile as sync_user_profile
+)
+
+
+# ============================================================================
+# PREFETCHED QUERYSETS
+# ============================================================================
+
+def student_detail_queryset():
+    return Student.objects.select_related(
+        'user', 'institution', 'department', 'course'
+    ).prefetch_related('skills')
+
+
+def organization_detail_queryset():
+    return Organization.objects.select_related('user').prefetch_related(
+        Prefetch('supported_courses', queryset=Course.objects.select_related('department')),
+        'required_skills',
+    )
+
+
+def opportunity_detail_queryset(queryset):
+    return queryset.select_related('organization__user').prefetch_related(
+        Prefetch('supported_courses', queryset=Course.objects.select_related('department')),
+        'required_skills',
+        'organization__supported_courses',
+    )
+
+
+# ============================================================================
+# DRF PLUMBING
+# ============================================================================
+
+class _ProfileView(APIView):
+    permission_classes = [IsAuthenticated]
+
+
+def _initial(view_class, request, action=None, **kwargs):
+    """
+    Run DRF's request setup for an async handler (sync; call via sync_to_async).
+    Returns (view, None) on success or (view, rendered error response).
+    """
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.format_kwarg = None
+    if action:
+        view.action = action
+        view.action_map = {'get': action}
+    drf_request = view.initialize_request(request, **kwargs)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(drf_request, **kwargs)
+    except Exception as exc:
+        return view, _finalize(view, view.handle_exception(exc))
+    return view, None
+
+
+def _finalize(view, response):
+    response = view.finalize_response(view.request, response)
+    response.render()
+    return response
+
+
+def _filtered_queryset(view):
+    return view.filter_queryset(view.get_queryset())
+
+
+async def _paginate(view, queryset):
+    """Async equivalent of view.paginate_queryset() for PageNumberPagination"""
+    paginator = view.paginator
+    page_size = paginator.get_page_size(view.request)
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(view.request, django_paginator)
+    try:
+        number = django_paginator.validate_number(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    bottom = (number - 1) * page_size
+    items = [o async for o in queryset[bottom:bottom + page_size]]
+    paginator.request = view.request
+    paginator.page = Page(items, number, django_paginator)
+    return items
+
+
+async def _serialize(serializer_class, instance, many=False):
+    """Serialize prefetched instances off the event loop"""
+    return await sync_to_async(lambda: serializer_class(instance, many=many).data)()
+
+
+def async_read_view(fallback):
+    """Serve safe methods from the async handler; delegate writes to the DRF view"""
+    sync_fallback = sync_to_async(fallback)
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_fallback(request, *args, **kwargs)
+            return await handler(request, *args, **kwargs)
+        # DRF enforces CSRF itself for session auth (csrf_exempt only wraps sync views on Django 4.2)
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+
+# ============================================================================
+# ASYNC READ ENDPOINTS
+# ============================================================================
+
+@async_read_view(sync_user_profile)
+async def user_profile(request):
+    """Get current user profile"""
+    view, error = await sync_to_async(_initial)(_ProfileView, request)
+    if error:
+        return error
+
+    user = view.request.user
+    student = await student_detail_queryset().filter(user=user).afirst()
+    organization = None if student else await organization_detail_queryset().filter(user=user).afirst()
+
+    data = await _serialize(UserDetailSerializer, user)
+    if student:
+        data['type'] = 'student'
+        data['profile'] = await _serialize(StudentDetailSerializer, student)
+    elif organization:
+        data['type'] = 'organization'
+        data['profile'] = await _serialize(OrganizationDetailSerializer, organization)
+    return _finalize(view, Response(data))
+
+
+@async_read_view(NotificationViewSet.as_view({'get': 'list'}))
+async def notification_list(request):
+    """List the current user's notifications"""
+    view, error = await sync_to_async(_initial)(NotificationViewSet, request, action='list')
+    if error:
+        return error
+    try:
+        queryset = await sync_to_async(_filtered_queryset)(view)
+        page = await _paginate(view, queryset.select_related('user'))
+    except Exception as exc:
+        return _finalize(view, view.handle_exception(exc))
+
+    data = await _serialize(NotificationSerializer, page, many=True)
+    return _finalize(view, view.paginator.get_paginated_response(data))
+
+
+@async_read_view(TrainingOpportunityViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def opportunity_list(request):
+    """List active training opportunities"""
+    view, error = await sync_to_async(_initial)(TrainingOpportunityViewSet, request, action='list')
+    if error:
+        return error
+    try:
+        queryset = await sync_to_async(_filtered_queryset)(view)
+        page = await _paginate(view, queryset.select_related('organization'))
+    except Exception as exc:
+        return _finalize(view, view.handle_exception(exc))
+
+    data = await _serialize(TrainingOpportunityListSerializer, page, many=True)
+    return _finalize(view, view.paginator.get_paginated_response(data))
+
+
+@async_read_view(TrainingOpportunityViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}))
+async def opportunity_detail(request, pk):
+    """Retrieve a training opportunity"""
+    view, error = await sync_to_async(_initial)(TrainingOpportunityViewSet, request, action='retrieve', pk=pk)
+    if error:
+        return error
+
+    queryset = opportunity_detail_queryset(view.get_queryset())
+    opportunity = await queryset.filter(pk=pk).afirst()
+    if opportunity is None:
+        not_found = Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        return _finalize(view, view.handle_exception(not_found))
+
+    data = await _serialize(TrainingOpportunityDetailSerializer, opportunity)
+    return _finalize(view, Response(data))
+
+
+@async_read_view(StudentViewSet.as_view({'get': 'my_profile'}))
+async def student_my_profile(request):
+    """Get current student's profile"""
+    view, error = await sync_to_async(_initial)(StudentViewSet, request, action='my_profile')
+    if error:
+        return error
+
+    student = await student_detail_queryset().filter(user=view.request.user).afirst()
+    if student is None:
+        return _finalize(view, Response({'error': 'Not a student'}, status=status.HTTP_400_BAD_REQUEST))
+    return _finalize(view, Response(await _serialize(StudentDetailSerializer, student)))
+
+
+@async_read_view(OrganizationViewSet.as_view({'get': 'my_profile'}))
+async def organization_my_profile(request):
+    """Get current organization's profile"""
+    view, error = await sync_to_async(_initial)(OrganizationViewSet, request, action='my_profile')
+    if error:
+        return error
+
+    organization = await organization_detail_queryset().filter(user=view.request.user).afirst()
+    if organization is None:
+        return _finalize(view, Response({'error': 'Not an organization'}, status=status.HTTP_400_BAD_REQUEST))
+    return _finalize(view, Response(await _serialize(OrganizationDetailSerializer, organization)))
@@ -0,0 +1,75 @@
+"""
+Cached DRF token authentication.
+TokenAuthentication joins Token and User on every API call. CachedTokenAuthentication
+keeps the resolved user, with student_profile/organization_profile preloaded, in a
+bounded per-process TTL cache keyed by token. Entries carry the user's auth tag
+version from the shared cache (see tracker.cache); signals.py bumps it when a token
+is deleted, the user is saved (deactivation, password change) or the user's
+student/organization profile changes, so every process drops the entry within
+RESPONSE_CACHE_TAG_TIMEOUT seconds. Bulk queryset.update() skips signals; call
+invalidate_user_tokens() after one.
+"""
+import pickle
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import LocalLRU, response_cache
+
+AUTH_TAG = 'auth:user:{user_id}'
+
+_token_cache = LocalLRU(
+    max_entries=getattr(settings, 'AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000),
+    timeout=getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300),
+)
+
+
+def _auth_tag(user_id):
+    return AUTH_TAG.format(user_id=user_id)
+
+
+def invalidate_user_tokens(user_ids):
+    """Drop cached token lookups for these users in every process (after commit)"""
+    tags = [_auth_tag(user_id) for user_id in user_ids]
+    if tags:
+        response_cache.invalidate_on_commit(tags)
+
+
+def clear_token_cache():
+    _token_cache.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication with a TTL cache of token -> user (profiles preloaded)"""
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+
+        entry = _token_cache.get(key)
+        if entry is not None:
+            user_id, version, payload = entry
+            tag = _auth_tag(user_id)
+            if response_cache.tag_versions([tag])[tag] == version:
+                # Each request gets its own copy; views may modify request.user
+                token = pickle.loads(payload)
+                return token.user, token
+            _token_cache.delete(key)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related(
+                'user', 'user__student_profile', 'user__organization_profile'
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        tag = _auth_tag(token.user_id)
+        version = response_cache.tag_versions([tag])[tag]
+        _token_cache.set(key, (token.user_id, version, pickle.dumps(token, pickle.HIGHEST_PROTOCOL)))
+        return token.user, token
@@ -0,0 +1,250 @@
+"""
+Tiered response cache for the catalog and organization endpoints.
+
+Serialized response data is kept in two tiers: a small per-process LRU (L1) in
+front of the 'shared' cache (L2, file-based or Redis, seen by every process).
+Keys embed the current version of every tag the response depends on, e.g. a
+department list depends on 'department' and 'institution'. A model write bumps
+its tags in L2 (see signals.py), which retires every key built from the old
+versions in both tiers at once. Tag versions are re-read from L2 at most every
+RESPONSE_CACHE_TAG_TIMEOUT seconds, which bounds staleness in other processes.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+from rest_framework.response import Response
+
+SHARED_CACHE_ALIAS = 'shared'
+TAG_VERSION_KEY = 'tag:{tag}'
+
+# Cache shared by all processes (cross-process counters, pins, L2 of the response cache)
+shared_cache = ConnectionProxy(caches, SHARED_CACHE_ALIAS)
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries=1000, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """L1 per-process LRU + L2 shared cache with tag-versioned keys and hit counters"""
+
+    def __init__(self):
+        self.local = LocalLRU(
+            max_entries=getattr(settings, 'RESPONSE_CACHE_LOCAL_MAX_ENTRIES', 1000),
+            timeout=getattr(settings, 'RESPONSE_CACHE_LOCAL_TIMEOUT', 60),
+        )
+        self._tag_versions = LocalLRU(max_entries=10000, timeout=getattr(settings, 'RESPONSE_CACHE_TAG_TIMEOUT', 1))
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    # Tags ------------------------------------------------------------------
+
+    def tag_versions(self, tags):
+        versions, missing = {}, []
+        for tag in tags:
+            version = self._tag_versions.get(tag)
+            if version is None:
+                missing.append(tag)
+            else:
+                versions[tag] = version
+
+        if missing:
+            keys = {TAG_VERSION_KEY.format(tag=tag): tag for tag in missing}
+            found = shared_cache.get_many(list(keys))
+            for key, tag in keys.items():
+                version = found.get(key)
+                if version is None:
+                    # Start from the clock so a tag evicted from L2 never reuses an old version
+                    version = int(time.time() * 1000)
+                    if not shared_cache.add(key, version, None):
+                        version = shared_cache.get(key, version)
+                versions[tag] = version
+                self._tag_versions.set(tag, version)
+        return versions
+
+    def invalidate(self, tags):
+        """Bump tag versions now; use invalidate_on_commit() from model signals"""
+        for tag in set(tags):
+            key = TAG_VERSION_KEY.format(tag=tag)
+            try:
+                version = shared_cache.incr(key)
+            except ValueError:
+                version = int(time.time() * 1000)
+                shared_cache.set(key, version, None)
+            self._tag_versions.set(tag, version)
+        self._count('invalidation', 'tags', len(set(tags)))
+
+    def invalidate_on_commit(self, tags):
+        tags = list(tags)
+        transaction.on_commit(lambda: self.invalidate(tags))
+
+    # Entries ---------------------------------------------------------------
+
+    def make_key(self, namespace, request, tags):
+        versions = self.tag_versions(sorted(set(tags)))
+        query = '&'.join(sorted(request.GET.urlencode().split('&')))
+        raw = '|'.join([request.get_host(), request.path, query] + [f'{tag}={versions[tag]}' for tag in sorted(versions)])
+        return f'resp:{namespace}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def get(self, namespace, key):
+        """Returns (tier, value); tier is 'L1', 'L2' or None on a miss"""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count(namespace, 'l1_hits')
+            return 'L1', value
+        value = shared_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local.set(key, value)
+            self._count(namespace, 'l2_hits')
+            return 'L2', value
+        self._count(namespace, 'misses')
+        return None, None
+
+    def set(self, namespace, key, value):
+        self.local.set(key, value)
+        shared_cache.set(key, value, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        self._count(namespace, 'sets')
+
+    # Metrics ---------------------------------------------------------------
+
+    def _count(self, namespace, field, amount=1):
+        with self._stats_lock:
+            self._stats.setdefault(namespace, Counter())[field] += amount
+
+    def stats(self):
+        """Per-namespace and total hit counters for this process, with hit ratios"""
+        with self._stats_lock:
+            per_namespace = {namespace: dict(counts) for namespace, counts in self._stats.items()}
+        invalidations = per_namespace.pop('invalidation', {}).get('tags', 0)
+
+        total = Counter()
+        for counts in per_namespace.values():
+            total.update(counts)
+        for counts in list(per_namespace.values()) + [total]:
+            lookups = counts.get('l1_hits', 0) + counts.get('l2_hits', 0) + counts.get('misses', 0)
+            counts['hit_ratio'] = round((lookups - counts.get('misses', 0)) / lookups, 4) if lookups else None
+        return {
+            'total': dict(total),
+            'namespaces': per_namespace,
+            'tag_invalidations': invalidations,
+            'local_entries': len(self.local),
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+
+response_cache = TieredCache()
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching list/retrieve response data in the tiered cache.
+    cache_tag names the model's tag; cache_depends_on lists the tags of other
+    models whose data the serializer embeds.
+    """
+    cache_tag = None
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        tags = (self.cache_tag,) + tuple(self.cache_depends_on)
+        return self._cached_response(request, tags, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        tags = (f'{self.cache_tag}:{lookup}',) + tuple(self.cache_depends_on)
+        return self._cached_response(request, tags, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, tags, handler, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+        if self._pinned_to_primary(request):
+            # Read-your-writes: cached entries may have been filled from a lagging replica
+            return handler(request, *args, **kwargs)
+
+        namespace = f'{self.cache_tag}-{self.action}'
+        key = response_cache.make_key(namespace, request, tags)
+        tier, data = response_cache.get(namespace, key)
+        if tier:
+            response = Response(data)
+            response['X-Cache'] = f'HIT-{tier}'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(namespace, key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def _pinned_to_primary(request):
+        from .db_router import is_pinned, replica_aliases
+
+        return bool(replica_aliases()) and is_pinned(request)
+
+
+def tags_for_instance(instance):
+    """Response cache tags made stale by a write to instance (None if not cached)"""
+    from .models import Course, Department, Institution, Organization, Review, Skill, TrainingOpportunity
+
+    if isinstance(instance, Institution):
+        return ['institution', f'institution:{instance.pk}']
+    if isinstance(instance, Department):
+        # Institutions embed their department count
+        return ['department', f'department:{instance.pk}', 'institution', f'institution:{instance.institution_id}']
+    if isinstance(instance, Course):
+        return ['course', f'course:{instance.pk}']
+    if isinstance(instance, Skill):
+        return ['skill', f'skill:{instance.pk}']
+    if isinstance(instance, Organization):
+        return ['organization', f'organization:{instance.pk}']
+    if isinstance(instance, (TrainingOpportunity, Review)):
+        # Opportunity count / rating shown on the organization
+        return ['organization', f'organization:{instance.organization_id}']
+    return None
@@ -17,15 +17,18 @@ def header_notifications(request):
     if request.user and request.user.is_authenticated:
         try:
             from tracker.models import Notification
+            from tracker.notifications import get_unread_count
             
-            # Get unread notifications for the user
-            notifications = Notification.objects.filter(
-                user=request.user,
-                is_read=False
-            ).order_by('-created_at')[:5]
+            # Unread count comes from the cached per-user counter
+            unread_count = get_unread_count(request.user)
+            context['unread_count'] = unread_count
             
-            context['notifications'] = notifications
-            context['unread_count'] = notifications.count()
+            # Get unread notifications for the user (lazy; only queried if rendered)
+            if unread_count:
+                context['notifications'] = Notification.objects.filter(
+                    user=request.user,
+                    is_read=False
+                ).order_by('-created_at')[:5]
         except Exception:
             # Model doesn't exist yet, return empty context
             pass
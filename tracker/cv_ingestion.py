@@ -0,0 +1,405 @@
+"""
+CV ingestion: text from uploaded PDF CVs, and the Skills it mentions.
+Extraction runs in a pool of CV_WORKERS forked processes, in two calls per CV.
+scan_document() hashes every page (content streams and
+embedded images) and returns the text layer of the pages that have one. The
+driver thread looks the hashes up in the CVPageText cache, then ocr_pages()
+renders only the image-only pages that were not cached and runs tesseract on
+them. Re-uploads and pages shared across CVs (an institution's cover page or
+template) are never read twice.
+
+Each CV has CV_DOCUMENT_TIMEOUT seconds of extraction. A call is handed to the
+pool only when one of its processes is free, and the clock runs from when that
+process starts it, so time spent behind other CVs does not count. The pool
+process enforces the deadline with SIGALRM, and tesseract gets what remains as
+its own timeout. A call still running past the deadline is stuck in one C call,
+where SIGALRM cannot land: the pool's processes are killed and a fresh pool is
+forked. CVs whose pool broke under them (a crash, or that recycling) go back
+to pending, up to CV_MAX_ATTEMPTS tries.
+The extracted text is matched against the active Skill names, and the skills
+the student does not have yet become SkillSuggestions for them to accept.
+
+Uploads are queued with schedule() after commit, except on web workers
+(PROCESS_ROLE 'web'): they never fork the pool and leave the CV pending for the
+process_pending_cvs task in the worker role, which also picks up anything left
+over. Bulk imports (manage.py import_cvs) call process_many().
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import LocalLRU
+from .lazy import lazy_import
+from .models import CVDocument, CVPageText, Notification, Skill, SkillSuggestion
+
+logger = logging.getLogger(__name__)
+
+pymupdf = lazy_import('pymupdf', 'PyMuPDF')
+pytesseract = lazy_import('pytesseract')
+Image = lazy_import('PIL.Image', 'Pillow')
+
+MIN_TEXT_CHARS = 20  # A page with images and less text than this is treated as a scan
+RESULT_GRACE_SECONDS = 5  # Extra wait for a pool call past the CV deadline before giving up on it
+EVIDENCE_CHARS = 60  # Context kept on each side of a skill's first mention
+
+# The compiled pattern of active skill names, shared by the driver threads
+_skill_patterns = LocalLRU(max_entries=1, timeout=300)
+
+_pool = None
+_executor = None
+_lock = threading.Lock()
+
+
+class DocumentTimeout(Exception):
+    pass
+
+
+# ============================================================================
+# EXTRACTION (pool processes)
+# ============================================================================
+
+@contextmanager
+def _deadline(deadline):
+    """Raise DocumentTimeout in this process once the wall clock passes deadline (main thread only)"""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise DocumentTimeout('CV_DOCUMENT_TIMEOUT reached before extraction started')
+    if threading.current_thread() is not threading.main_thread():
+        # In-thread extraction (CV_WORKERS = 0): only the driver's wait is bounded
+        yield
+        return
+
+    def expire(signum, frame):
+        raise DocumentTimeout(f'Extraction exceeded CV_DOCUMENT_TIMEOUT ({settings.CV_DOCUMENT_TIMEOUT}s)')
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _page_hash(document, page):
+    digest = hashlib.sha256(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(document.xref_stream_raw(image[0]) or b'')
+    return digest.hexdigest()
+
+
+def scan_document(path, max_pages, deadline):
+    """(page count, [(page hash, text, or None if the page needs OCR)]) for the first max_pages pages"""
+    with _deadline(deadline), pymupdf.open(path) as document:
+        pages = []
+        for page in document.pages(0, min(max_pages, document.page_count)):
+            text = page.get_text('text', sort=True).strip()
+            needs_ocr = len(text) < MIN_TEXT_CHARS and bool(page.get_images())
+            pages.append((_page_hash(document, page), None if needs_ocr else text))
+        return document.page_count, pages
+
+
+def ocr_pages(path, page_numbers, deadline):
+    """{page number: OCR text} of image-only pages; None per page when tesseract is not installed"""
+    results = {}
+    with _deadline(deadline), pymupdf.open(path) as document:
+        for number in page_numbers:
+            pixmap = document[number].get_pixmap(dpi=settings.CV_OCR_DPI, colorspace=pymupdf.csGRAY)
+            image = Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+            try:
+                # tesseract's own timeout fires first, so the subprocess is killed rather than orphaned
+                results[number] = pytesseract.image_to_string(
+                    image, lang=settings.CV_OCR_LANGUAGES, timeout=max(1, deadline - time.time() - 1),
+                ).strip()
+            except pytesseract.TesseractNotFoundError:
+                return {number: None for number in page_numbers}
+    return results
+
+
+def _reset_pools():
+    global _pool, _executor
+    _pool = None
+    _executor = None
+
+
+# Neither pool survives a fork (gunicorn --preload, or the pool's own workers)
+os.register_at_fork(after_in_child=_reset_pools)
+
+
+class _Pool:
+    """The extraction processes, and a slot per process: a call is only submitted once one is free"""
+
+    def __init__(self, workers):
+        # Forked, not spawned: workers only need PyMuPDF and tesseract, never Django setup
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+        self.free = threading.BoundedSemaphore(workers)
+        self.discarded = False
+
+    def discard(self, kill=False):
+        """Stop using this pool; kill=True also stops processes busy with a call"""
+        global _pool
+        with _lock:
+            self.discarded = True
+            if _pool is self:
+                _pool = None
+        if kill:
+            # ProcessPoolExecutor has no public way to stop a busy process before Python 3.14
+            for process in list((self.executor._processes or {}).values()):
+                process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_pool():
+    """The extraction process pool, or None when CV_WORKERS is 0 (extract on the driver thread)"""
+    global _pool
+    if settings.CV_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = _Pool(settings.CV_WORKERS)
+    return _pool
+
+
+def _run(func, args, budget):
+    # The deadline starts here, in the pool process, not when the driver submitted the call
+    return func(*args, time.time() + budget)
+
+
+def _call(func, *args, budget):
+    """func(*args, deadline) with budget seconds from when it starts; returns (result, seconds it took)"""
+    while True:
+        pool = _get_pool()
+        if pool is None:
+            started = time.time()
+            return func(*args, started + budget), time.time() - started
+        with pool.free:
+            if pool.discarded:
+                continue  # Replaced while this call waited for a free process
+            started = time.time()
+            try:
+                future = pool.executor.submit(_run, func, args, budget)
+            except RuntimeError:
+                # Broke before taking this call, or discarded since the check above
+                pool.discard()
+                continue
+            try:
+                result = future.result(timeout=max(0, budget) + RESULT_GRACE_SECONDS)
+            except FutureTimeout:
+                # Stuck inside one C call: kill the process rather than let it hold a slot
+                pool.discard(kill=True)
+                raise DocumentTimeout(f'No result within CV_DOCUMENT_TIMEOUT ({settings.CV_DOCUMENT_TIMEOUT}s)')
+            except BrokenProcessPool:
+                pool.discard()
+                raise
+        return result, time.time() - started
+
+
+# ============================================================================
+# SKILL MATCHING
+# ============================================================================
+
+def _normalize(name):
+    return ' '.join(name.lower().split())
+
+
+def _skill_matcher():
+    """(pattern, {normalized name: skill id}) for the active skills; longest names match first"""
+    matcher = _skill_patterns.get('skills')
+    if matcher is None:
+        names = {_normalize(name): pk for pk, name in Skill.objects.filter(is_active=True).values_list('pk', 'name')}
+        pattern = None
+        if names:
+            alternatives = (
+                r'\s+'.join(re.escape(part) for part in name.split())
+                for name in sorted(names, key=len, reverse=True)
+            )
+            # Word edges that also hold for names like C++, C# or .NET
+            pattern = re.compile(rf"(?<![\w+#])(?:{'|'.join(alternatives)})(?![\w+#])", re.IGNORECASE)
+        matcher = (pattern, names)
+        _skill_patterns.set('skills', matcher)
+    return matcher
+
+
+def find_skills(text):
+    """{skill id: (mentions, text around the first mention)} of active skills named in text"""
+    pattern, names = _skill_matcher()
+    if pattern is None:
+        return {}
+    mentions, evidence = Counter(), {}
+    for match in pattern.finditer(text):
+        skill_id = names.get(_normalize(match.group(0)))
+        if skill_id is None:
+            continue
+        mentions[skill_id] += 1
+        if skill_id not in evidence:
+            context = text[max(0, match.start() - EVIDENCE_CHARS):match.end() + EVIDENCE_CHARS]
+            evidence[skill_id] = ' '.join(context.split())[:255]
+    return {skill_id: (count, evidence[skill_id]) for skill_id, count in mentions.items()}
+
+
+def propose_skills(cv):
+    """Replace the CV's open suggestions with the skills its text names that the student lacks"""
+    found = find_skills(cv.text)
+    have = set(cv.student.skills.values_list('pk', flat=True))
+    decided = set(cv.skill_suggestions.exclude(status='proposed').values_list('skill_id', flat=True))
+    cv.skill_suggestions.filter(status='proposed').delete()
+    SkillSuggestion.objects.bulk_create([
+        SkillSuggestion(cv=cv, skill_id=skill_id, mentions=mentions, evidence=evidence)
+        for skill_id, (mentions, evidence) in found.items() if skill_id not in have and skill_id not in decided
+    ])
+    return cv.skill_suggestions.filter(status='proposed').count()
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def _claimable():
+    stale = timezone.now() - timedelta(seconds=settings.CV_DOCUMENT_TIMEOUT * 2)
+    return Q(status='pending') | Q(status='processing', started_at__lt=stale, attempts__lt=settings.CV_MAX_ATTEMPTS)
+
+
+def process(cv_id):
+    """
+    Extract, cache and match one CV; returns it, or None if another worker has
+    claimed it. A CV whose pool broke under it is returned pending.
+    """
+    if not CVDocument.objects.filter(_claimable(), pk=cv_id).update(
+        status='processing', started_at=timezone.now(), attempts=F('attempts') + 1,
+    ):
+        return None
+    cv = CVDocument.objects.select_related('student').get(pk=cv_id)
+    budget = settings.CV_DOCUMENT_TIMEOUT
+    try:
+        path = cv.file.path
+        (page_count, pages), took = _call(scan_document, path, settings.CV_MAX_PAGES, budget=budget)
+        cached = dict(
+            CVPageText.objects.filter(content_hash__in={page_hash for page_hash, _ in pages})
+            .values_list('content_hash', 'text')
+        )
+        scanned = [number for number, (page_hash, text) in enumerate(pages) if text is None and page_hash not in cached]
+        ocr = _call(ocr_pages, path, scanned, budget=budget - took)[0] if scanned else {}
+
+        texts, new_pages, unavailable = [], {}, 0
+        for number, (page_hash, text) in enumerate(pages):
+            if page_hash in cached:
+                texts.append(cached[page_hash])
+                continue
+            method = 'text' if text else 'empty'
+            if text is None:
+                text, method = ocr.get(number), 'ocr'
+                if text is None:
+                    # Not cached: OCR it once tesseract is installed
+                    unavailable += 1
+                    continue
+            new_pages[page_hash] = CVPageText(content_hash=page_hash, method=method, text=text)
+            texts.append(text)
+        CVPageText.objects.bulk_create(new_pages.values(), ignore_conflicts=True)
+
+        cv.page_count = page_count
+        cv.ocr_pages = len(scanned) - unavailable
+        cv.cached_pages = sum(1 for page_hash, _ in pages if page_hash in cached)
+        cv.text = '\n\n'.join(text for text in texts if text)
+        cv.error = f'{unavailable} image-only pages skipped: tesseract is not installed' if unavailable else ''
+        cv.status = 'done'
+    except DocumentTimeout as e:
+        cv.status, cv.error = 'timeout', str(e)
+    except BrokenProcessPool as e:
+        # A pool process died under this CV: crashed on some PDF, or killed after another CV's timeout
+        retry = cv.attempts < settings.CV_MAX_ATTEMPTS
+        logger.warning(f"CV {cv_id} lost its pool process (attempt {cv.attempts}): {e}")
+        cv.status, cv.error = 'pending' if retry else 'failed', str(e)
+    except Exception as e:
+        logger.warning(f"CV {cv_id} failed: {e}")
+        cv.status, cv.error = 'failed', str(e)
+    cv.processed_at = timezone.now()
+    cv.save(update_fields=[
+        'status', 'error', 'page_count', 'ocr_pages', 'cached_pages', 'text', 'processed_at',
+    ])
+
+    if cv.status == 'done':
+        proposed = propose_skills(cv)
+        if proposed:
+            Notification.objects.create(
+                user=cv.student.user,
+                notification_type='system_message',
+                title='Skills found in your CV',
+                message=f'We found {proposed} skill{"s" if proposed != 1 else ""} in your CV. '
+                        f'Review them to add them to your profile.',
+            )
+    return cv
+
+
+def _process_in_background(cv_id):
+    try:
+        return process(cv_id)
+    except Exception as e:
+        # Left pending or processing; the process_pending_cvs task retries it
+        logger.error(f"CV {cv_id} failed: {e}")
+        return None
+    finally:
+        # This thread's connections; the executor keeps the thread alive between CVs
+        connections.close_all()
+
+
+def _get_executor():
+    """Driver threads: each waits on the process pool for one CV at a time"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, settings.CV_WORKERS), thread_name_prefix='cvs')
+    return _executor
+
+
+def schedule(cv_id):
+    """Process a CV in the background (call after commit); a no-op in the web role"""
+    if settings.PROCESS_ROLE == 'web':
+        return
+    _get_executor().submit(_process_in_background, cv_id)
+
+
+def process_many(cv_ids, on_done=None):
+    """Process CVs on CV_WORKERS driver threads and pool processes; on_done(cv) as each finishes"""
+    executor = _get_executor()
+    results = Counter()
+    while cv_ids:
+        futures = [executor.submit(_process_in_background, cv_id) for cv_id in cv_ids]
+        cv_ids = []
+        for future in futures:
+            cv = future.result()
+            if cv is None:
+                results['skipped'] += 1
+                continue
+            if cv.status == 'pending':
+                # Its pool broke under it; again on a fresh pool (attempts are capped, so this ends)
+                cv_ids.append(cv.pk)
+                continue
+            results[cv.status] += 1
+            if on_done:
+                on_done(cv)
+    return dict(results)
+
+
+def pending(limit=None, grace_seconds=60):
+    """Ids of CVs waiting for extraction, including ones whose worker died mid-way"""
+    queued_before = timezone.now() - timedelta(seconds=grace_seconds)
+    ids = CVDocument.objects.filter(_claimable(), created_at__lt=queued_before).order_by('created_at')
+    return list(ids.values_list('pk', flat=True)[:limit])
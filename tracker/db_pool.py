@@ -0,0 +1,193 @@
+"""
+Bounded database connection pool.
+Django keeps one connection per thread, which ASGI deployments (a fresh thread
+per request) cannot reuse. When a database sets POOL, the tracker backends take
+raw connections from a per-process pool shared by all threads, and give them
+back when Django closes the connection at the end of a request.
+
+    'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 5, 'RECYCLE': 1800, 'CHECK_AFTER': 30}
+"""
+import threading
+import time
+
+from django.db import DatabaseError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolExhausted(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """At most max_size connections; idle ones are reused most-recently-used first"""
+
+    def __init__(self, alias, max_size=10, timeout=5, recycle=1800, check_after=30):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout          # Seconds to wait for a free connection
+        self.recycle = recycle          # Close connections older than this
+        self.check_after = check_after  # Health-check connections idle longer than this
+        self._idle = []                 # [(connection, created_at, released_at)]
+        self._created = {}              # id(connection) -> created_at
+        self._size = 0
+        self._cond = threading.Condition()
+        self.opened = self.reused = self.discarded = self.waits = 0
+
+    def acquire(self, connect, is_alive):
+        """
+        Return (connection, reused): an idle connection that still works, or a new
+        one if fewer than max_size are open, waiting up to timeout for either.
+        """
+        deadline = time.monotonic() + self.timeout
+        stale, reusable, reserved = [], None, False
+        with self._cond:
+            while reusable is None and not reserved:
+                while self._idle:
+                    connection, created_at, released_at = self._idle.pop()
+                    now = time.monotonic()
+                    if now - created_at > self.recycle or (
+                        now - released_at > self.check_after and not is_alive(connection)
+                    ):
+                        stale.append(connection)
+                        self._forget(connection)
+                        continue
+                    self.reused += 1
+                    reusable = connection
+                    break
+                if reusable is None and self._size < self.max_size:
+                    self._size += 1
+                    reserved = True
+                elif reusable is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.waits += 1
+                    self._cond.wait(remaining)
+
+        # Close outside the lock; a network round trip must not stall other threads
+        self._close_all(stale)
+        if reusable is not None:
+            return reusable, True
+        if not reserved:
+            raise PoolExhausted(f"No free '{self.alias}' connection after {self.timeout}s ({self.max_size} in use)")
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created[id(connection)] = time.monotonic()
+            self.opened += 1
+        return connection, False
+
+    def release(self, connection, discard=False):
+        with self._cond:
+            discard = discard or id(connection) not in self._created
+            if discard:
+                self._forget(connection)
+            else:
+                self._idle.append((connection, self._created[id(connection)], time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close_all([connection])
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size,
+                'opened': self.opened, 'reused': self.reused, 'discarded': self.discarded, 'waits': self.waits,
+            }
+
+    def _forget(self, connection):
+        # Caller holds the lock
+        if self._created.pop(id(connection), None) is not None:
+            self._size -= 1
+            self.discarded += 1
+
+    @staticmethod
+    def _close_all(connections):
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def get_pool(alias, settings_dict):
+    """The process-wide pool for a database alias, or None if it has no POOL setting"""
+    options = settings_dict.get('POOL')
+    if not options:
+        return None
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(
+                    alias,
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 5),
+                    recycle=options.get('RECYCLE', 1800),
+                    check_after=options.get('CHECK_AFTER', 30),
+                )
+    return pool
+
+
+def pool_stats():
+    return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    DatabaseWrapper mixin: get_new_connection() takes from the alias's pool and
+    closing returns the raw connection to it. Also times every connect for the
+    per-request DB stats.
+    """
+
+    def _connection_pool(self):
+        if self.vendor == 'sqlite' and self.is_in_memory_db():
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def connect(self):
+        from .db_stats import record_connect
+
+        self._from_pool = False
+        started = time.perf_counter()
+        super().connect()
+        record_connect(self.alias, (time.perf_counter() - started) * 1000, from_pool=self._from_pool)
+
+    def get_new_connection(self, conn_params):
+        pool = self._connection_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection, self._from_pool = pool.acquire(
+            connect=lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params),
+            is_alive=self._raw_connection_alive,
+        )
+        return connection
+
+    def _close(self):
+        pool = self._connection_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        try:
+            # Never hand the next request an open transaction
+            connection.rollback()
+        except Exception:
+            pool.release(connection, discard=True)
+        else:
+            pool.release(connection)
+
+    def _raw_connection_alive(self, connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+            return True
+        except Exception:
+            return False
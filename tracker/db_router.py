@@ -0,0 +1,130 @@
+"""
+Read-replica routing.
+Every query goes to the primary ('default') unless the code running it opted in
+to replica reads: safe methods on the catalog viewsets, the organization and
+opportunity lists (ReplicaReadMixin) and MatchingAnalytics (replica_reads()).
+Any write pins the client to the primary for REPLICA_PIN_SECONDS, so the next
+requests read the client's own writes (see ReplicaPinMiddleware).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import shared_cache as cache
+from .db_stats import query_counts
+
+PIN_CACHE_KEY = 'db:pin:user:{user_id}'
+PIN_COOKIE = 'db_pin'
+
+# Per request/task; ContextVar so it also follows async views through sync_to_async
+_replica_reads = ContextVar('replica_reads', default=False)
+_wrote_primary = ContextVar('wrote_primary', default=False)
+_in_request = ContextVar('in_request', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Let reads inside the block use a replica (also usable as a decorator).
+    Reads still go to the primary once the current request, or the block
+    itself when outside a request, has written.
+    """
+    tokens = (_replica_reads.set(enabled), _wrote_primary.set(_in_request.get() and _wrote_primary.get()))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(tokens[0])
+        _wrote_primary.reset(tokens[1])
+
+
+@contextmanager
+def request_scope():
+    """Fresh routing state for one request"""
+    tokens = (_replica_reads.set(False), _wrote_primary.set(False), _in_request.set(True))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(tokens[0])
+        _wrote_primary.reset(tokens[1])
+        _in_request.reset(tokens[2])
+
+
+def wrote_primary():
+    return _wrote_primary.get()
+
+
+# ============================================================================
+# PINNING
+# ============================================================================
+
+def is_pinned(request):
+    """True if this client wrote within the last REPLICA_PIN_SECONDS"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        if cache.get(PIN_CACHE_KEY.format(user_id=user.pk)):
+            return True
+    return PIN_COOKIE in request.COOKIES
+
+
+def pin_to_primary(request, response):
+    """Remember a write by this client (cache for token clients, cookie for browsers)"""
+    seconds = settings.REPLICA_PIN_SECONDS
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(PIN_CACHE_KEY.format(user_id=user.pk), 1, seconds)
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin: serve safe requests for replica_actions from a replica,
+    unless the client is pinned to the primary.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and self.action in self.replica_actions and not is_pinned(request):
+            _replica_reads.set(True)
+
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+class ReplicaRouter:
+    """Sends opted-in reads to a random replica alias and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _wrote_primary.get():
+            aliases = replica_aliases()
+            if aliases:
+                return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication (or sync_replica locally)
+        if db in replica_aliases():
+            return False
+        return None
+
+    @staticmethod
+    def query_counts():
+        """Queries executed per alias in this process (see tracker.db_stats)"""
+        return query_counts()
@@ -0,0 +1,126 @@
+"""
+Database usage statistics.
+Every connection gets an execute wrapper that counts queries per alias for the
+process, and adds query count/time to the current request's RequestDBStats
+(a ContextVar, so queries run by async views through sync_to_async count too).
+DBStatsMiddleware rolls the per-request numbers up into process totals:
+connection reuse rate, connect time and query totals.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_request_stats = ContextVar('db_request_stats', default=None)
+
+_lock = threading.Lock()
+_query_counts = Counter()
+_totals = Counter()
+
+
+class RequestDBStats:
+    """DB work done while handling one request"""
+    __slots__ = ('queries', 'query_ms', 'connects', 'connect_ms', 'pool_checkouts', 'statements')
+
+    def __init__(self):
+        self.queries = self.connects = self.pool_checkouts = 0
+        self.query_ms = self.connect_ms = 0.0
+        self.statements = None  # SQL text -> (distinct params, ms), for N+1 detection (tracker.slow_queries)
+
+    @property
+    def reused_connection(self):
+        """Ran queries without opening a new database connection"""
+        return self.queries > 0 and self.connects == 0
+
+    def as_dict(self):
+        return {
+            'queries': self.queries, 'query_ms': round(self.query_ms, 2),
+            'connects': self.connects, 'connect_ms': round(self.connect_ms, 2),
+            'pool_checkouts': self.pool_checkouts,
+        }
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+@contextmanager
+def track_request():
+    stats = RequestDBStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def install_query_counter(connection):
+    """Count and time every query executed on this connection"""
+    if getattr(connection, '_query_counter_installed', False):
+        return
+
+    def count_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with _lock:
+                _query_counts[connection.alias] += 1
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.query_ms += elapsed
+
+    connection.execute_wrappers.append(count_query)
+    connection._query_counter_installed = True
+
+
+def record_connect(alias, elapsed_ms, from_pool=False):
+    """Called by the tracker backends after opening a connection or taking one from the pool"""
+    key = 'pool_checkouts' if from_pool else 'connects'
+    stats = _request_stats.get()
+    if stats is not None:
+        setattr(stats, key, getattr(stats, key) + 1)
+        stats.connect_ms += elapsed_ms
+    with _lock:
+        _totals[key] += 1
+        _totals['connect_ms'] += elapsed_ms
+
+
+def record_request(stats):
+    with _lock:
+        _totals['requests'] += 1
+        if stats.queries:
+            _totals['requests_with_queries'] += 1
+            _totals['requests_reusing_connection'] += stats.reused_connection
+        _totals['queries'] += stats.queries
+        _totals['query_ms'] += stats.query_ms
+
+
+def query_counts():
+    """Queries executed per database alias in this process since start/reset"""
+    with _lock:
+        return dict(_query_counts)
+
+
+def reset_query_counts():
+    with _lock:
+        _query_counts.clear()
+
+
+def totals():
+    """Process-wide request/connection totals, with the derived reuse rate and averages"""
+    with _lock:
+        result = dict(_totals)
+    with_queries = result.get('requests_with_queries', 0)
+    connects = result.get('connects', 0) + result.get('pool_checkouts', 0)
+    result['connection_reuse_rate'] = (
+        round(result.get('requests_reusing_connection', 0) / with_queries, 4) if with_queries else None
+    )
+    result['avg_connect_ms'] = round(result.get('connect_ms', 0) / connects, 3) if connects else None
+    result['avg_queries_per_request'] = (
+        round(result.get('queries', 0) / result['requests'], 2) if result.get('requests') else None
+    )
+    return result
@@ -0,0 +1,59 @@
+"""
+Lazy imports for heavy optional dependencies.
+Web workers are started and stopped by the autoscaler, so tracker/ never imports
+image, PDF, OCR or data-frame libraries at module level: bind them with
+lazy_import() and the import happens on first attribute access, in the process
+and request that needs it. `manage.py benchmark_startup` fails if any of
+HEAVY_MODULES is loaded by a cold web worker.
+"""
+import importlib
+import importlib.util
+import threading
+
+# Top-level packages a web worker must not import at startup
+HEAVY_MODULES = (
+    'pandas', 'numpy', 'reportlab', 'fitz', 'pymupdf', 'pytesseract', 'lxml', 'premailer', 'PIL', 'PyPDF2',
+)
+# Only loaded in the worker role (see PROCESS_ROLE in settings)
+SCHEDULER_MODULES = ('apscheduler', 'django_apscheduler')
+
+
+class LazyModule:
+    """Stands in for a module until an attribute is first read"""
+
+    def __init__(self, name, requirement=None):
+        self._name = name
+        self._requirement = requirement or name.split('.')[0]
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                try:
+                    self._module = importlib.import_module(self._name)
+                except ImportError as e:
+                    raise ImportError(f"{self._name} is not installed (pip install {self._requirement})") from e
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._module or self._load(), attribute)
+
+    def available(self):
+        """True if the module can be imported; does not import it"""
+        if self._module is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except ImportError:
+            # Parent package missing
+            return False
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<LazyModule {self._name} ({state})>'
+
+
+def lazy_import(name, requirement=None):
+    """A module proxy that imports name on first use; requirement is the pip name shown if it is missing"""
+    return LazyModule(name, requirement)
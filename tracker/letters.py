@@ -0,0 +1,462 @@
+"""
+Acceptance letters as PDFs.
+letter_data() turns an accepted Application into plain strings, with the body
+paragraphs rendered from the tracker/letters/acceptance.txt template, and
+render_pdf() draws them with reportlab's canvas in the standard Helvetica
+fonts (nothing embedded: a letter is a few KB and takes milliseconds).
+render_pdf() only takes and returns plain data, so batches run it in a pool of
+LETTER_WORKERS processes.
+
+Rendered letters are cached as AcceptanceLetter rows, one per (application,
+template version), with the PDF in STORAGES['letters'] outside MEDIA_ROOT:
+letters are private and only downloaded through the API. The template version
+hashes the template source with LAYOUT_VERSION, so editing either re-renders;
+a cached letter whose data hash no longer matches the application (new dates
+or text) is re-rendered as well.
+
+A LetterBatch renders the letters of every accepted application of an
+opportunity in one background job. Web workers (PROCESS_ROLE 'web') only queue
+it, so they never fork the pool; the resume_letter_batches task renders it in
+the worker role. Applications are read in chunks and at most
+LETTER_MAX_IN_FLIGHT letters are queued on the pool, so memory stays flat
+however large the batch; stream_zip() builds the download while it is being
+sent.
+"""
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import connections, transaction
+from django.db.models import Q
+from django.template.loader import get_template, render_to_string
+from django.utils import dateformat, timezone
+
+from .lazy import lazy_import
+from .models import AcceptanceLetter, Application, LetterBatch
+
+logger = logging.getLogger(__name__)
+
+canvas = lazy_import('reportlab.pdfgen.canvas', 'reportlab')
+pagesizes = lazy_import('reportlab.lib.pagesizes', 'reportlab')
+pdf_utils = lazy_import('reportlab.lib.utils', 'reportlab')
+
+TEMPLATE_NAME = 'tracker/letters/acceptance.txt'
+LAYOUT_VERSION = 1  # Bump when render_pdf() draws differently
+LETTER_STATUSES = ('accepted', 'completed')
+STORAGE_ALIAS = 'letters'
+CHUNK_SIZE = 200  # Applications per query in a batch
+PROGRESS_EVERY = 50  # Letters between progress writes
+
+_pool = None
+_executor = None
+_lock = threading.Lock()
+
+
+def letter_storage():
+    return storages[STORAGE_ALIAS]
+
+
+@lru_cache(maxsize=None)
+def template_version():
+    """Hash of the letter template and LAYOUT_VERSION; cached letters are keyed by it"""
+    source = get_template(TEMPLATE_NAME).template.source
+    return hashlib.sha256(f'{LAYOUT_VERSION}\n{source}'.encode()).hexdigest()[:16]
+
+
+def letter_applications(**filters):
+    """Applications that get a letter, with everything letter_data() reads"""
+    return Application.objects.filter(status__in=LETTER_STATUSES, **filters).select_related(
+        'student__user', 'student__institution', 'student__course', 'organization', 'training_opportunity',
+    ).order_by('pk')
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def letter_data(application):
+    """Everything render_pdf() draws, as plain strings; cached letters are checked against its hash"""
+    student = application.student
+    organization = application.organization
+    opportunity = application.training_opportunity
+    body = render_to_string(TEMPLATE_NAME, {
+        'application': application, 'student': student, 'organization': organization, 'opportunity': opportunity,
+    })
+    issued = application.responded_at or application.updated_at
+    return {
+        'organization': organization.name,
+        'letterhead': [line for line in (organization.location, organization.email, organization.phone,
+                                         organization.website) if line],
+        'reference': f'SITMS/{opportunity.pk}/{application.pk}',
+        'date': dateformat.format(timezone.localtime(issued), 'F j, Y'),
+        'recipient': [line for line in (student.full_name, student.registration_number,
+                                        student.institution and student.institution.name,
+                                        student.course and student.course.name) if line],
+        'subject': f'ACCEPTANCE FOR TRAINING: {opportunity.title.upper()}',
+        'paragraphs': [
+            ' '.join(paragraph.split()) for paragraph in re.split(r'\n\s*\n', body) if paragraph.strip()
+        ],
+        'signatory': organization.name,
+    }
+
+
+def data_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class _PageWriter:
+    """Lines top to bottom on A4, starting a new page when one fills up"""
+
+    def __init__(self, pdf, margin):
+        self.pdf = pdf
+        self.margin = margin
+        self.width, self.height = pagesizes.A4
+        self.y = self.height - margin
+
+    def space(self, points):
+        self.y -= points
+
+    def text(self, text, font='Helvetica', size=11, leading=15, align='left'):
+        for line in pdf_utils.simpleSplit(text, font, size, self.width - 2 * self.margin) or ['']:
+            if self.y < self.margin + leading:
+                self.pdf.showPage()
+                self.y = self.height - self.margin
+            self.y -= leading
+            self.pdf.setFont(font, size)
+            if align == 'right':
+                self.pdf.drawRightString(self.width - self.margin, self.y, line)
+            else:
+                self.pdf.drawString(self.margin, self.y, line)
+
+    def rule(self):
+        self.y -= 8
+        self.pdf.setLineWidth(0.75)
+        self.pdf.line(self.margin, self.y, self.width - self.margin, self.y)
+
+
+def render_pdf(data):
+    """One letter as PDF bytes; plain data in and out, so it can run in a pool process"""
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=pagesizes.A4, invariant=1, pageCompression=1)
+    pdf.setTitle(data['subject'])
+    pdf.setAuthor(data['organization'])
+    page = _PageWriter(pdf, margin=64)
+
+    page.text(data['organization'], font='Helvetica-Bold', size=16, leading=20)
+    for line in data['letterhead']:
+        page.text(line, size=9, leading=12)
+    page.rule()
+    page.space(12)
+    page.text(f"Ref: {data['reference']}", size=10, leading=14)
+    page.text(data['date'], size=10, leading=14, align='right')
+    page.space(10)
+    for line in data['recipient']:
+        page.text(line, leading=14)
+    page.space(14)
+    page.text(data['subject'], font='Helvetica-Bold')
+    for paragraph in data['paragraphs']:
+        page.space(8)
+        page.text(paragraph)
+    page.space(40)
+    page.text('______________________________', size=10)
+    page.text(f"For {data['signatory']}", size=10, leading=14)
+
+    pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+def _reset_pools():
+    global _pool, _executor
+    _pool = None
+    _executor = None
+
+
+# Neither pool survives a fork (gunicorn --preload, or the pool's own workers)
+os.register_at_fork(after_in_child=_reset_pools)
+
+
+def _get_pool():
+    """The render process pool, or None when LETTER_WORKERS is 0 (render on the calling thread)"""
+    global _pool
+    if settings.LETTER_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # Forked, not spawned: workers only import reportlab, never set up Django again
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.LETTER_WORKERS, mp_context=multiprocessing.get_context('fork'),
+                )
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool (a process was killed or crashed) so the next _get_pool() forks a fresh one"""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_chunk(chunk):
+    return [(key, render_pdf(data)) for key, data in chunk]
+
+
+def render_bounded(jobs, pool=None):
+    """
+    Yield (key, PDF bytes) for each (key, data) job. On a pool, letters go in
+    chunks of LETTER_POOL_CHUNK (one round trip each) with at most
+    LETTER_MAX_IN_FLIGHT letters queued at once.
+    """
+    if pool is None:
+        for key, data in jobs:
+            yield key, render_pdf(data)
+        return
+
+    max_chunks = max(1, settings.LETTER_MAX_IN_FLIGHT // settings.LETTER_POOL_CHUNK)
+    in_flight = set()
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) < settings.LETTER_POOL_CHUNK:
+            continue
+        in_flight.add(pool.submit(_render_chunk, chunk))
+        chunk = []
+        if len(in_flight) >= max_chunks:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    if chunk:
+        in_flight.add(pool.submit(_render_chunk, chunk))
+    for future in as_completed(in_flight):
+        yield from future.result()
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def _store(application_id, version, digest, content, previous_name):
+    storage = letter_storage()
+    name = f'{application_id}/{version}-{digest[:12]}.pdf'
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+    AcceptanceLetter.objects.update_or_create(
+        application_id=application_id, template_version=version,
+        defaults={'data_hash': digest, 'name': name, 'file_size': len(content)},
+    )
+    if previous_name and previous_name != name:
+        storage.delete(previous_name)
+
+
+def render_letters(applications, pool=None, progress=None):
+    """
+    Bring the cached letters of an Application queryset up to date; returns
+    {'total', 'rendered', 'reused'}. progress(stats) is called as letters land.
+    """
+    version = template_version()
+    cached = {
+        application_id: (digest, name) for application_id, digest, name in AcceptanceLetter.objects.filter(
+            application__in=applications.values('pk'), template_version=version,
+        ).values_list('application_id', 'data_hash', 'name')
+    }
+    stats = {'total': 0, 'rendered': 0, 'reused': 0}
+
+    def jobs():
+        for application in applications.iterator(chunk_size=CHUNK_SIZE):
+            stats['total'] += 1
+            data = letter_data(application)
+            digest = data_hash(data)
+            previous_digest, previous_name = cached.get(application.pk, (None, None))
+            if previous_digest == digest:
+                stats['reused'] += 1
+                continue
+            yield (application.pk, digest, previous_name), data
+
+    for (application_id, digest, previous_name), content in render_bounded(jobs(), pool):
+        _store(application_id, version, digest, content, previous_name)
+        stats['rendered'] += 1
+        if progress and stats['rendered'] % PROGRESS_EVERY == 0:
+            progress(stats)
+    return stats
+
+
+def get_letter(application):
+    """The application's current letter, rendered on this thread if missing or stale"""
+    render_letters(letter_applications(pk=application.pk))
+    return AcceptanceLetter.objects.get(application=application, template_version=template_version())
+
+
+def prune():
+    """Delete letters of older template versions or of applications no longer accepted"""
+    stale = AcceptanceLetter.objects.filter(
+        ~Q(template_version=template_version()) | ~Q(application__status__in=LETTER_STATUSES)
+    )
+    deleted, _ = stale.delete()  # Files go with the rows (signals.acceptance_letter_deleted)
+    return deleted
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='letters')
+    return _executor
+
+
+def _in_background(func, *args):
+    try:
+        func(*args)
+    except Exception as e:
+        # Batches are picked up again by the resume_letter_batches task
+        logger.error(f"Acceptance letters {func.__name__}{args} failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def _render_application(application_id):
+    render_letters(letter_applications(pk=application_id))
+
+
+def schedule_letter(application_id):
+    """Render one application's letter in the background (call after commit)"""
+    _get_executor().submit(_in_background, _render_application, application_id)
+
+
+def start_batch(opportunity, user=None):
+    """
+    The opportunity's unfinished batch for the current template, or a new one;
+    outside the web role a new batch starts rendering after commit.
+    """
+    version = template_version()
+    batch = LetterBatch.objects.filter(
+        opportunity=opportunity, template_version=version, status__in=('pending', 'running'),
+    ).first()
+    if batch is None:
+        batch = LetterBatch.objects.create(opportunity=opportunity, requested_by=user, template_version=version)
+        if settings.PROCESS_ROLE != 'web':
+            # Web workers only queue it: the pool is forked in the worker role (resume_letter_batches)
+            transaction.on_commit(lambda: _get_executor().submit(_in_background, run_batch, batch.pk))
+    return batch
+
+
+def _claimable():
+    stale = timezone.now() - timedelta(seconds=settings.LETTER_BATCH_STALE_SECONDS)
+    return Q(status='pending') | Q(status='running', heartbeat_at__lt=stale)
+
+
+def run_batch(batch_id):
+    """Render a batch's letters on the process pool; returns the batch, or None if another worker has it"""
+    now = timezone.now()
+    if not LetterBatch.objects.filter(_claimable(), pk=batch_id).update(
+        status='running', started_at=now, heartbeat_at=now, error='',
+    ):
+        return None
+    batch = LetterBatch.objects.get(pk=batch_id)
+
+    def progress(stats):
+        LetterBatch.objects.filter(pk=batch_id).update(heartbeat_at=timezone.now(), **stats)
+
+    pool = _get_pool()
+    try:
+        stats = render_letters(
+            letter_applications(training_opportunity_id=batch.opportunity_id), pool=pool, progress=progress,
+        )
+    except BrokenProcessPool as e:
+        # Not the batch's fault: leave it to resume_stalled() on a fresh pool (letters done so far are kept)
+        _discard_pool(pool)
+        LetterBatch.objects.filter(pk=batch_id).update(status='pending', error=str(e))
+        raise
+    except Exception as e:
+        LetterBatch.objects.filter(pk=batch_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+    LetterBatch.objects.filter(pk=batch_id).update(status='done', finished_at=timezone.now(), **stats)
+    batch.refresh_from_db()
+    logger.info(
+        f"Letter batch {batch_id}: {stats['rendered']} rendered, {stats['reused']} reused "
+        f"in {(batch.finished_at - batch.started_at).total_seconds():.1f}s"
+    )
+    return batch
+
+
+def resume_stalled(grace_seconds=60):
+    """
+    Run batches not started yet (queued by a web worker, or their process
+    exited) or whose worker stopped sending progress.
+    """
+    started_before = timezone.now() - timedelta(seconds=grace_seconds)
+    batch_ids = list(
+        LetterBatch.objects.filter(_claimable(), created_at__lt=started_before).values_list('pk', flat=True)
+    )
+    return sum(1 for batch_id in batch_ids if run_batch(batch_id) is not None)
+
+
+# ============================================================================
+# DOWNLOADS
+# ============================================================================
+
+def batch_members(opportunity):
+    """(file name in the ZIP, storage name) of the opportunity's current letters"""
+    rows = AcceptanceLetter.objects.filter(
+        application__training_opportunity=opportunity, application__status__in=LETTER_STATUSES,
+        template_version=template_version(),
+    ).order_by('application_id').values_list('application_id', 'application__student__registration_number', 'name')
+    return [
+        (f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', registration_number)}-{application_id}.pdf", name)
+        for application_id, registration_number, name in rows
+    ]
+
+
+class _ZipOutput:
+    """Write-only sink for ZipFile; the generator drains it after each chunk"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(members):
+    """Yield a ZIP of (file name, storage name) members as it is built; holds one chunk at a time"""
+    storage = letter_storage()
+    output = _ZipOutput()
+    # Stored, not deflated: the PDFs are already compressed
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for arcname, name in members:
+            with storage.open(name, 'rb') as source, archive.open(arcname, 'w') as member:
+                for chunk in source.chunks():
+                    member.write(chunk)
+                    yield output.drain()
+            yield output.drain()
+    yield output.drain()
@@ -0,0 +1,118 @@
+"""
+Lifecycle sweeps for opportunities and placements.
+Registered as a maintenance task and run by the scheduler worker: each step is
+a set-based UPDATE or bulk_create rather than a per-row loop.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Application, ApplicationStatusHistory, Notification, Student, SystemConfig, TrainingOpportunity
+from .notifications import increment_unread_counts
+from .streaming import broadcaster
+from .tasks import register_task
+
+DEFAULT_REMINDER_HOURS = 24
+
+
+def close_expired_opportunities(now=None):
+    """Close open opportunities whose deadline has passed"""
+    now = now or timezone.now()
+    return TrainingOpportunity.objects.filter(is_open=True, deadline__lte=now).update(is_open=False, updated_at=now)
+
+
+def send_deadline_reminders(hours=None, now=None):
+    """
+    Remind organizations and eligible students (matching course, not placed,
+    not yet applied) about opportunities closing within the next `hours`.
+    Each opportunity is reminded about once. Returns the number of notifications sent.
+    """
+    now = now or timezone.now()
+    if hours is None:
+        hours = SystemConfig.get_value('deadline_reminder_hours', DEFAULT_REMINDER_HOURS, int)
+
+    already_reminded = Notification.objects.filter(
+        notification_type='deadline_reminder', training_opportunity__isnull=False
+    ).values('training_opportunity_id')
+    closing = (
+        TrainingOpportunity.objects.filter(
+            is_active=True, is_open=True, deadline__gt=now, deadline__lte=now + timedelta(hours=hours)
+        )
+        .exclude(id__in=already_reminded)
+        .select_related('organization')
+        .annotate(pending_count=Count('applications', filter=Q(applications__status='pending')))
+    )
+
+    sent = 0
+    for opp in closing:
+        closes_at = timezone.localtime(opp.deadline).strftime('%b %d, %Y %H:%M')
+        student_user_ids = list(
+            Student.objects.filter(
+                is_active=True, is_placed=False, course__in=opp.supported_courses.all()
+            ).exclude(applications__training_opportunity=opp).values_list('user_id', flat=True).distinct()
+        )
+        reminders = [
+            Notification(
+                user_id=opp.organization.user_id,
+                notification_type='deadline_reminder',
+                title=f'Deadline approaching: {opp.title}',
+                message=f'Applications close on {closes_at}. {opp.pending_count} application(s) are awaiting review.',
+                training_opportunity=opp,
+            )
+        ] + [
+            Notification(
+                user_id=user_id,
+                notification_type='deadline_reminder',
+                title=f'Apply soon: {opp.title}',
+                message=f'{opp.organization.name} stops accepting applications on {closes_at}.',
+                training_opportunity=opp,
+            )
+            for user_id in student_user_ids
+        ]
+        with transaction.atomic():
+            Notification.objects.bulk_create(reminders, batch_size=500)
+            increment_unread_counts(n.user_id for n in reminders)
+            transaction.on_commit(lambda reminders=reminders: broadcaster.publish_notifications(reminders))
+        sent += len(reminders)
+    return sent
+
+
+def complete_finished_placements(today=None):
+    """Move accepted applications whose training has ended to 'completed'"""
+    today = today or timezone.localdate()
+    now = timezone.now()
+    finished = Application.objects.filter(status='accepted', end_date__lt=today)
+
+    with transaction.atomic():
+        # Locked until commit: a row whose status changes in between would get a false history entry
+        ids = list(finished.select_for_update().values_list('id', flat=True))
+        if not ids:
+            return 0
+        updated = Application.objects.filter(id__in=ids, status='accepted').update(status='completed', updated_at=now)
+        ApplicationStatusHistory.objects.bulk_create(
+            [
+                ApplicationStatusHistory(
+                    application_id=app_id,
+                    old_status='accepted',
+                    new_status='completed',
+                    notes='Training period ended',
+                )
+                for app_id in ids
+            ],
+            batch_size=500,
+        )
+    return updated
+
+
+@register_task('lifecycle_sweep', interval=settings.LIFECYCLE_SWEEP_INTERVAL_MINUTES * 60)
+def run_lifecycle_sweep():
+    """Run all lifecycle steps; returns row counts"""
+    now = timezone.now()
+    return {
+        'closed_opportunities': close_expired_opportunities(now),
+        'deadline_reminders': send_deadline_reminders(now=now),
+        'completed_placements': complete_finished_placements(),
+    }
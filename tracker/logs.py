@@ -0,0 +1,209 @@
+"""
+Non-blocking structured logging.
+QueuedHandler is the only handler on the root logger: it tags each record with
+the current request id and user id (RequestContextFilter), drops most records
+from high-volume loggers (SamplingFilter) and puts the record on a queue. A
+QueueListener thread does the file and console I/O, writing JSON lines to a
+size-rotated file, so request threads never block on disk.
+
+Loaded by LOGGING in settings before the apps are ready: no model imports here.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.utils.functional import SimpleLazyObject, empty
+
+_current_request = ContextVar('log_current_request', default=None)
+_request_id = ContextVar('log_request_id', default=None)
+
+REQUEST_ID_HEADER = 'HTTP_X_REQUEST_ID'
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+# ============================================================================
+# REQUEST CONTEXT
+# ============================================================================
+
+def start_request(request):
+    """Bind request (and its id: X-Request-ID if well-formed, else a new one) to log records; returns reset tokens"""
+    request_id = request.META.get(REQUEST_ID_HEADER, '')
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        # Client ids end up in file names and log lines
+        request_id = uuid.uuid4().hex
+    request.request_id = request_id
+    return _current_request.set(request), _request_id.set(request_id)
+
+
+def end_request(tokens):
+    request_token, id_token = tokens
+    _current_request.reset(request_token)
+    _request_id.reset(id_token)
+
+
+def current_request():
+    return _current_request.get()
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def current_user_id(request=None):
+    """Id of the authenticated user, without forcing a lazy session lookup"""
+    request = request or _current_request.get()
+    if request is None:
+        return None
+    user = request.__dict__.get('user')
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request_id and user_id to every record"""
+
+    def filter(self, record):
+        # django.request logs the response after the middleware has returned, but passes the request
+        request = getattr(record, 'request', None)
+        if request is not None and hasattr(request, 'request_id'):
+            record.request_id = request.request_id
+            record.user_id = current_user_id(request)
+        else:
+            record.request_id = _request_id.get()
+            record.user_id = current_user_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records below WARNING from the loggers in rates
+    ({logger prefix: fraction}). Sampling is per request, so a kept request keeps
+    all of its lines.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def rate_for(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1:
+            return True
+        request_id = _request_id.get()
+        if request_id:
+            return zlib.crc32(request_id.encode()) % 10000 < rate * 10000
+        return random.random() < rate
+
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'user_id': getattr(record, 'user_id', None),
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# ============================================================================
+# QUEUED HANDLER
+# ============================================================================
+
+class QueuedHandler(QueueHandler):
+    """
+    Enqueues records for a QueueListener thread that writes them to a rotating
+    JSON-lines file and, if console_level is set, to stderr. With raw=True the
+    file gets each message as is (for messages that are already JSON).
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, console_level=None, raw=False):
+        super().__init__(queue.SimpleQueue())
+        self.filename = str(filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.console_level = console_level
+        self.raw = raw
+        self.listener = None
+        self._start_listener()
+        # The listener thread does not survive a fork (gunicorn --preload); start a fresh one in the child
+        os.register_at_fork(after_in_child=self._restart_in_child)
+        atexit.register(self.close)
+
+    def _build_handlers(self):
+        file_handler = RotatingFileHandler(
+            self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count, delay=True, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter('%(message)s') if self.raw else JSONFormatter())
+        handlers = [file_handler]
+        if self.console_level:
+            console = logging.StreamHandler(sys.stderr)
+            console.setLevel(self.console_level)
+            console.setFormatter(logging.Formatter('{levelname} {message}', style='{'))
+            handlers.append(console)
+        return handlers
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, *self._build_handlers(), respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_in_child(self):
+        if self.listener is None:
+            # Closed (e.g. replaced by a later logging config)
+            return
+        self.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def prepare(self, record):
+        # Format the message and traceback here, where the args are still live, but
+        # keep them separate so the listener can emit structured JSON
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            # Drains the queue before returning
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        super().close()
@@ -0,0 +1,103 @@
+"""
+SITMS housekeeping tasks for the background task runner (see tracker.tasks).
+"""
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import cv_ingestion, letters
+from .notifications import reconcile_all_unread_counts
+from .ratings import recompute_ratings
+from .sqlite import optimize_database
+from . import storage
+from .tasks import register_task
+from . import thumbnails
+from .throttling import get_store
+
+
+@register_task('clear_expired_sessions', interval=60 * 60)
+def clear_expired_sessions():
+    """Delete expired DB sessions"""
+    deleted, _ = Session.objects.filter(expire_date__lt=timezone.now()).delete()
+    return {'sessions_deleted': deleted}
+
+
+@register_task('clear_inactive_tokens', interval=60 * 60)
+def clear_inactive_tokens():
+    """Delete API tokens belonging to deactivated users"""
+    deleted, _ = Token.objects.filter(user__is_active=False).delete()
+    return {'tokens_deleted': deleted}
+
+
+@register_task('prune_throttle_counters', interval=60 * 60)
+def prune_throttle_counters():
+    """Drop throttle counters whose window has ended"""
+    return {'counters_deleted': get_store().prune()}
+
+
+@register_task('reconcile_notification_counters', interval=6 * 60 * 60)
+def reconcile_notification_counters():
+    """Repair drift between NotificationCounter rows and the Notification table"""
+    return {'counters_fixed': reconcile_all_unread_counts()}
+
+
+@register_task('generate_missing_thumbnails', interval=60)
+def generate_missing_thumbnails(batch_size=200):
+    """Render variants for images uploaded through web workers or missed by the upload path (failures, new sizes, old uploads)"""
+    generated = failed = 0
+    for name in thumbnails.missing_sources(limit=batch_size):
+        try:
+            thumbnails.render(name)
+            generated += 1
+        except Exception as e:
+            failed += 1
+            thumbnails.logger.warning(f"Thumbnails for {name} failed: {e}")
+    return {'images_rendered': generated, 'images_failed': failed}
+
+
+@register_task('collect_unreferenced_media', interval=6 * 60 * 60)
+def collect_unreferenced_media():
+    """Delete uploaded blobs no student or organization has used for MEDIA_BLOB_GRACE_SECONDS"""
+    deleted, freed = storage.collect_unreferenced()
+    return {'blobs_deleted': deleted, 'bytes_freed': freed}
+
+
+@register_task('recount_media_references', interval=24 * 60 * 60)
+def recount_media_references():
+    """Repair blob refcounts after bulk updates that bypassed the model signals"""
+    return {'blobs_fixed': storage.recount()}
+
+
+@register_task('resume_letter_batches', interval=60, lease_seconds=60 * 60)
+def resume_letter_batches():
+    """Render acceptance letter batches queued by web workers, and finish ones whose process exited"""
+    # No grace: web workers never start their batches, and claiming a batch is atomic anyway
+    return {'batches_resumed': letters.resume_stalled(grace_seconds=0)}
+
+
+@register_task('prune_acceptance_letters', interval=24 * 60 * 60)
+def prune_acceptance_letters():
+    """Delete cached letters of old templates or of applications no longer accepted"""
+    return {'letters_deleted': letters.prune()}
+
+
+@register_task('process_pending_cvs', interval=60, lease_seconds=60 * 60)
+def process_pending_cvs(batch_size=500):
+    """Extract CVs uploaded through web workers, or whose upload process exited before it got to them"""
+    # No grace: web workers never start their CVs, and claiming a CV is atomic anyway
+    return cv_ingestion.process_many(cv_ingestion.pending(limit=batch_size, grace_seconds=0))
+
+
+@register_task('recompute_organization_ratings', interval=24 * 60 * 60)
+def recompute_organization_ratings():
+    """Repair drift in the incremental organization rating aggregates"""
+    return {'organizations_fixed': recompute_ratings()}
+
+
+@register_task('sqlite_optimize', interval=24 * 60 * 60)
+def sqlite_optimize():
+    """Refresh SQLite planner statistics and truncate the WAL"""
+    if connection.vendor != 'sqlite':
+        return {'skipped': connection.vendor}
+    return optimize_database(connection)
@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from tracker.sqlite import backup_database, quick_check
+
+
+class Command(BaseCommand):
+    help = 'Online backup of the SQLite database with the backup API, a few pages per step'
+
+    def add_arguments(self, parser):
+        parser.add_argument('destination', nargs='?',
+                            help='Backup file or directory (default: backups/<name>-<timestamp>.sqlite3)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--pages', type=int, default=256, help='Pages copied per step (-1 copies everything at once)')
+        parser.add_argument('--sleep', type=float, default=0.01, help='Seconds to pause between steps')
+        parser.add_argument('--verify', action='store_true', help='Run PRAGMA quick_check on the copy')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('backup_db only handles SQLite; use the database server\'s backup tooling')
+
+        source = Path(connection.settings_dict['NAME'])
+        destination = Path(options['destination'] or source.parent / 'backups')
+        if destination.is_dir() or not destination.suffix:
+            destination.mkdir(parents=True, exist_ok=True)
+            destination = destination / f'{source.stem}-{timezone.localtime():%Y%m%d-%H%M%S}.sqlite3'
+        if destination.resolve() == source.resolve():
+            raise CommandError('Destination is the live database')
+
+        self.stdout.write(f'Backing up {source} -> {destination} ({options["pages"]} pages per step)')
+        started = time.perf_counter()
+        total, restarts = backup_database(source, destination, pages=options['pages'], sleep=options['sleep'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} pages in {elapsed:.2f}s'
+            + (f' ({restarts} restarts after concurrent writes)' if restarts else '')
+        ))
+        if options['verify']:
+            result = quick_check(destination)
+            if result != 'ok':
+                raise CommandError(f'quick_check failed on {destination}: {result}')
+            self.stdout.write(self.style.SUCCESS('quick_check: ok'))
@@ -0,0 +1,81 @@
+import resource
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from tracker import letters
+
+
+def _sample_data(index):
+    """letter_data() output for a made-up application"""
+    return {
+        'organization': 'Tanzania Ports Authority',
+        'letterhead': ['Dar es Salaam', 'careers@ports.go.tz', '+255 22 211 0401', 'https://www.ports.go.tz'],
+        'reference': f'SITMS/42/{index}',
+        'date': 'October 19, 2026',
+        'recipient': [f'Student {index}', f'T21-03-{index:05d}', 'University of Dar es Salaam',
+                      'BSc Computer Science'],
+        'subject': 'ACCEPTANCE FOR TRAINING: ICT INDUSTRIAL ATTACHMENT',
+        'paragraphs': [
+            f'Dear Student {index},',
+            'We are pleased to inform you that your application for the ICT Industrial Attachment training '
+            'opportunity at Tanzania Ports Authority has been accepted.',
+            'Your training will run from July 1, 2026 to September 30, 2026 at our Dar es Salaam office.',
+            'Please confirm your acceptance by replying to careers@ports.go.tz or calling +255 22 211 0401, and '
+            "bring this letter and your institution's introduction letter on your first day.",
+            'We look forward to working with you.',
+            'Yours sincerely,',
+        ],
+        'signatory': 'Tanzania Ports Authority',
+    }
+
+
+def _max_rss_mb(who):
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Letters per second and peak memory of acceptance letter rendering, in-thread and on the '
+        'LETTER_WORKERS process pool (render only: no database or storage writes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Letters to render (default 1000)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Pool processes (default LETTER_WORKERS; 0 renders in-thread only)')
+
+    def handle(self, *args, **options):
+        if not letters.canvas.available():
+            raise CommandError('reportlab is not installed (pip install reportlab)')
+        count = options['count']
+        workers = settings.LETTER_WORKERS if options['workers'] is None else options['workers']
+
+        letters.render_pdf(_sample_data(0))  # Import reportlab and warm its font metrics
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{count} letters, at most {settings.LETTER_MAX_IN_FLIGHT} in flight'
+        ))
+        runs = [('in-thread', 0)] + ([(f'{workers} processes', workers)] if workers > 0 else [])
+        for label, run_workers in runs:
+            with override_settings(LETTER_WORKERS=run_workers):
+                pool = letters._get_pool()
+                started = time.perf_counter()
+                total_bytes = sum(
+                    len(content) for _, content in
+                    letters.render_bounded(((index, _sample_data(index)) for index in range(count)), pool)
+                )
+                elapsed = time.perf_counter() - started
+                if pool is not None:
+                    pool.shutdown()
+                    letters._reset_pools()
+            self.stdout.write(
+                f'  {label:14s} {elapsed:6.2f} s  {count / elapsed:7.0f} letters/s  '
+                f'{total_bytes / count / 1024:5.1f} KiB/letter'
+            )
+        self.stdout.write(
+            f'  peak RSS: this process {_max_rss_mb(resource.RUSAGE_SELF):.0f} MB, '
+            f'largest pool process {_max_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB'
+        )
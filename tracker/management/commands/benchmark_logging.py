@@ -0,0 +1,108 @@
+import logging
+import logging.config
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+
+def _config(name, path):
+    """The previous synchronous handlers, or the queued pipeline with or without sampling"""
+    if name == 'sync':
+        handler = {
+            'level': 'DEBUG',
+            'class': 'logging.FileHandler',
+            'filename': path,
+            'formatter': 'verbose',
+        }
+    else:
+        handler = {
+            '()': 'tracker.logs.QueuedHandler',
+            'level': 'DEBUG',
+            'filters': ['sampling', 'request_context'],
+            'filename': path,
+        }
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'verbose': {'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}', 'style': '{'},
+        },
+        'filters': {
+            'request_context': {'()': 'tracker.logs.RequestContextFilter'},
+            'sampling': {
+                '()': 'tracker.logs.SamplingFilter',
+                'rates': settings.LOG_SAMPLE_RATES if name == 'queued' else {},
+            },
+        },
+        'handlers': {'bench': handler},
+        'root': {'handlers': ['bench'], 'level': 'DEBUG'},
+        # Django's default config caps the 'django' logger at INFO
+        'loggers': {'django.db.backends': {'level': 'DEBUG'}},
+    }
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Request latency with SQL logging on, under the previous synchronous FileHandler and '
+        'the queued JSON pipeline (unsampled and sampled). Console output is left out of all runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/v1/training-opportunities/', help='Path to request')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per configuration (default 500)')
+        parser.add_argument('--configs', default='sync,queued-unsampled,queued',
+                            help='Comma-separated subset of sync, queued-unsampled, queued')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configs'].split(',') if name.strip()]
+        unknown = set(names) - {'sync', 'queued-unsampled', 'queued'}
+        if unknown:
+            raise CommandError(f'Unknown configurations: {", ".join(sorted(unknown))}')
+
+        self.stdout.write(f'{options["requests"]} x GET {options["url"]} with django.db.backends at DEBUG')
+        # SQL is only logged through the debug cursor
+        connection.force_debug_cursor = True
+        try:
+            with tempfile.TemporaryDirectory() as directory, override_settings(ALLOWED_HOSTS=['*']):
+                for name in names:
+                    self._run(name, os.path.join(directory, f'{name}.log'), options)
+        finally:
+            connection.force_debug_cursor = False
+            logging.config.dictConfig(settings.LOGGING)
+
+    def _run(self, name, path, options):
+        logging.config.dictConfig(_config(name, path))
+        client = Client()
+        client.get(options['url'], REMOTE_ADDR='10.9.9.9')  # Warm up connections and caches
+
+        latencies = []
+        for i in range(options['requests']):
+            started = time.perf_counter()
+            response = client.get(options['url'], REMOTE_ADDR=f'10.8.{i >> 8 & 255}.{i & 255}')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'GET {options["url"]} returned {response.status_code}')
+
+        # Closing drains the queue, so the line count covers everything logged
+        for handler in logging.getLogger().handlers:
+            handler.close()
+        with open(path, encoding='utf-8') as log_file:
+            lines = sum(1 for _ in log_file)
+
+        self.stdout.write(
+            f'  {name:17s} mean {statistics.mean(latencies) * 1000:6.2f} ms  '
+            f'p50 {_percentile(latencies, 50):6.2f} ms  p95 {_percentile(latencies, 95):6.2f} ms  '
+            f'p99 {_percentile(latencies, 99):6.2f} ms  {lines} lines'
+        )
@@ -0,0 +1,68 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from tracker.cache import response_cache
+
+ENDPOINTS = ['institution', 'department', 'course', 'skill', 'organization']
+
+
+class Command(BaseCommand):
+    help = (
+        'In-process benchmark of the cached catalog/organization endpoints: '
+        'requests per second with the response cache off vs on (warm), and the hit ratio'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per run (default 2000)')
+
+    def handle(self, *args, **options):
+        urls = self._urls()
+        if not urls:
+            raise CommandError('No catalog data to request; run seed_data first')
+
+        self.stdout.write(f'{len(urls)} URLs, {options["requests"]} requests per run')
+        results = {}
+        for enabled in (False, True):
+            with override_settings(RESPONSE_CACHE_ENABLED=enabled, ALLOWED_HOSTS=['*']):
+                if enabled:
+                    self._run(urls, len(urls))  # Warm both tiers
+                    response_cache.reset_stats()
+                results[enabled] = self._run(urls, options['requests'])
+
+        for enabled, (rate, elapsed) in results.items():
+            label = 'cache on ' if enabled else 'cache off'
+            self.stdout.write(f'  {label}: {rate:9.1f} req/s  ({elapsed:.2f}s)')
+        stats = response_cache.stats()['total']
+        self.stdout.write(self.style.SUCCESS(
+            f'speedup x{results[True][0] / results[False][0]:.1f}, hit ratio {stats.get("hit_ratio")} '
+            f'(L1 {stats.get("l1_hits", 0)}, L2 {stats.get("l2_hits", 0)}, misses {stats.get("misses", 0)})'
+        ))
+
+    @staticmethod
+    def _urls():
+        from tracker.models import Course, Department, Institution, Organization, Skill
+
+        urls = []
+        for basename, model in zip(ENDPOINTS, [Institution, Department, Course, Skill, Organization]):
+            urls.append(reverse(f'{basename}-list'))
+            first = model.objects.order_by('pk').values_list('pk', flat=True).first()
+            if first is not None:
+                urls.append(reverse(f'{basename}-detail', args=[first]))
+        return urls
+
+    @staticmethod
+    def _run(urls, count):
+        client = Client()
+        started = time.perf_counter()
+        for i, url in zip(range(count), itertools.cycle(urls)):
+            # A different client address per request keeps the anon throttle out of the numbers
+            response = client.get(url, REMOTE_ADDR=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}')
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+        elapsed = time.perf_counter() - started
+        return count / elapsed, elapsed
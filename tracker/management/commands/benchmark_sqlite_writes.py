@@ -0,0 +1,160 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SCHEMA = '''
+CREATE TABLE opportunity (id INTEGER PRIMARY KEY, title TEXT, remaining_slots INTEGER, is_open INTEGER);
+CREATE TABLE application (
+    id INTEGER PRIMARY KEY, student_id INTEGER, opportunity_id INTEGER, status TEXT,
+    match_score INTEGER, cover_letter TEXT, applied_at REAL, UNIQUE (student_id, opportunity_id)
+);
+CREATE INDEX application_opportunity ON application (opportunity_id, status);
+CREATE TABLE notification (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, message TEXT,
+                           is_read INTEGER, created_at REAL);
+CREATE INDEX notification_user ON notification (user_id, is_read, created_at);
+'''
+OPPORTUNITIES = 50
+
+
+def _connect(path, pragmas):
+    # isolation_level=None + explicit BEGIN is how Django's atomic() drives sqlite3
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def _writer(path, pragmas, begin, duration, worker):
+    """Submit applications the way ApplicationViewSet.create does: read, insert, update, notify"""
+    conn = _connect(path, pragmas)
+    rng = random.Random(worker)
+    latencies, errors = [], 0
+    student = worker * 1_000_000
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        student += 1
+        opportunity = rng.randint(1, OPPORTUNITIES)
+        started = time.perf_counter()
+        try:
+            conn.execute(begin)
+            conn.execute('SELECT remaining_slots FROM opportunity WHERE id = ?', (opportunity,)).fetchone()
+            conn.execute(
+                'INSERT INTO application (student_id, opportunity_id, status, match_score, cover_letter, applied_at) '
+                "VALUES (?, ?, 'pending', ?, ?, ?)", (student, opportunity, rng.randint(0, 100), 'x' * 500, time.time())
+            )
+            conn.execute('UPDATE opportunity SET remaining_slots = remaining_slots - 1 WHERE id = ?', (opportunity,))
+            conn.execute(
+                'INSERT INTO notification (user_id, title, message, is_read, created_at) VALUES (?, ?, ?, 0, ?)',
+                (opportunity, 'New application', 'x' * 200, time.time())
+            )
+            conn.execute('COMMIT')
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            # "database is locked": Django would return a 500 here
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+    return latencies, errors
+
+
+def _reader(path, pragmas, duration, worker):
+    """List pending applications and unread notifications, like the dashboards do"""
+    conn = _connect(path, pragmas)
+    rng = random.Random(-worker)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        opportunity = rng.randint(1, OPPORTUNITIES)
+        started = time.perf_counter()
+        try:
+            conn.execute(
+                "SELECT * FROM application WHERE opportunity_id = ? AND status = 'pending' "
+                'ORDER BY applied_at DESC LIMIT 20', (opportunity,)
+            ).fetchall()
+            conn.execute(
+                'SELECT count(*) FROM notification WHERE user_id = ? AND is_read = 0', (opportunity,)
+            ).fetchone()
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    return latencies, errors
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+class Command(BaseCommand):
+    help = 'Concurrent write benchmark on a scratch database: SQLite defaults vs the tuned profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Writer processes')
+        parser.add_argument('--readers', type=int, default=4, help='Reader processes')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per profile')
+        parser.add_argument('--profile', choices=['default', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        if not settings.SQLITE_PRAGMAS and options['profile'] != 'default':
+            raise CommandError('SQLITE_PRAGMAS is empty (SQLITE_TUNED is off); nothing to compare')
+        # (pragmas, how the backend opens transactions)
+        profiles = {
+            'default': ({'journal_mode': 'DELETE'}, 'BEGIN'),
+            'tuned': (settings.SQLITE_PRAGMAS, 'BEGIN IMMEDIATE'),
+        }
+        names = list(profiles) if options['profile'] == 'both' else [options['profile']]
+
+        self.stdout.write(
+            f'{options["writers"]} writers, {options["readers"]} readers, {options["duration"]:.0f}s per profile'
+        )
+        for name in names:
+            self._run_profile(name, *profiles[name], options)
+
+    def _run_profile(self, name, pragmas, begin, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            conn = _connect(path, pragmas)
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                'INSERT INTO opportunity (id, title, remaining_slots, is_open) VALUES (?, ?, ?, 1)',
+                [(i, f'Opportunity {i}', 10 ** 9) for i in range(1, OPPORTUNITIES + 1)]
+            )
+            conn.close()
+
+            duration = options['duration']
+            with ProcessPoolExecutor(max_workers=options['writers'] + options['readers']) as pool:
+                writes = [pool.submit(_writer, path, pragmas, begin, duration, i) for i in range(1, options['writers'] + 1)]
+                reads = [pool.submit(_reader, path, pragmas, duration, i) for i in range(1, options['readers'] + 1)]
+                write_latencies, write_errors = self._collect(writes)
+                read_latencies, read_errors = self._collect(reads)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}: {begin}, {pragmas}'))
+        self.stdout.write(
+            f'  writes: {len(write_latencies) / duration:8.1f} tx/s  '
+            f'p50 {_percentile(write_latencies, 50):7.2f} ms  p95 {_percentile(write_latencies, 95):7.2f} ms  '
+            f'p99 {_percentile(write_latencies, 99):7.2f} ms  locked errors {write_errors}'
+        )
+        self.stdout.write(
+            f'  reads:  {len(read_latencies) / duration:8.1f} q/s   '
+            f'p50 {_percentile(read_latencies, 50):7.2f} ms  p95 {_percentile(read_latencies, 95):7.2f} ms  '
+            f'p99 {_percentile(read_latencies, 99):7.2f} ms  locked errors {read_errors}'
+        )
+
+    @staticmethod
+    def _collect(futures):
+        latencies, errors = [], 0
+        for future in futures:
+            worker_latencies, worker_errors = future.result()
+            latencies.extend(worker_latencies)
+            errors += worker_errors
+        return latencies, errors
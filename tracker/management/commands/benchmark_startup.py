@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.lazy import HEAVY_MODULES, SCHEDULER_MODULES
+
+# Runs in a fresh interpreter: import the entry point, serve one request, report
+CHILD = r'''
+import asyncio, importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+path, host = sys.argv[2], sys.argv[3]
+status = []
+if sys.argv[1].endswith('asgi'):
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', host.encode())], 'client': ('127.0.0.1', 50000), 'server': (host, 80),
+    }
+    asyncio.run(module.application(scope, receive, send))
+else:
+    from io import BytesIO
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': host, 'SERVER_PORT': '80',
+        'HTTP_HOST': host, 'REMOTE_ADDR': '127.0.0.1', 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False, 'SERVER_PROTOCOL': 'HTTP/1.1',
+    }
+    response = module.application(environ, lambda line, headers, exc_info=None: status.append(int(line[:3])))
+    b''.join(response)
+    response.close()
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000, 'request_ms': (served - imported) * 1000,
+    'status': status[0] if status else None, 'modules': sorted({name.split('.')[0] for name in sys.modules}),
+}), flush=True)
+'''
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Cold start of pos_tracker.wsgi / asgi in fresh interpreters (spawn to first response), an '
+        '-X importtime audit of the heaviest packages, and a check that no heavy optional module is '
+        'loaded. Fails above STARTUP_BUDGET_MS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modules', default='pos_tracker.wsgi,pos_tracker.asgi',
+                            help='Comma-separated entry points (default: wsgi and asgi)')
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts per entry point (default 5)')
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Median cold start budget (default STARTUP_BUDGET_MS)')
+        parser.add_argument('--path', default='/api/v1/', help='First request path (default /api/v1/)')
+        parser.add_argument('--role', default='web', choices=['web', 'worker', 'all'], help='PROCESS_ROLE of the worker')
+        parser.add_argument('--audit', type=int, default=15, help='Packages to list by import time (0 skips the audit)')
+
+    def handle(self, *args, **options):
+        budget = options['budget_ms'] or settings.STARTUP_BUDGET_MS
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')),
+                    'localhost')
+        env = {**os.environ, 'PROCESS_ROLE': options['role'], 'PYTHONDONTWRITEBYTECODE': '1'}
+        forbidden = set(HEAVY_MODULES) | (set(SCHEDULER_MODULES) if options['role'] == 'web' else set())
+
+        failures = []
+        for module in [name.strip() for name in options['modules'].split(',') if name.strip()]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{module} (PROCESS_ROLE={options["role"]}, GET {options["path"]}, {options["runs"]} runs)'
+            ))
+            totals, imports, requests, loaded = [], [], [], set()
+            for _ in range(options['runs']):
+                total_ms, report = self._cold_start(module, options['path'], host, env)
+                totals.append(total_ms)
+                imports.append(report['import_ms'])
+                requests.append(report['request_ms'])
+                loaded |= forbidden & set(report['modules'])
+            median = statistics.median(totals)
+            self.stdout.write(
+                f'  cold start median {median:7.1f} ms  p90 {_percentile(totals, 90):7.1f} ms  '
+                f'(import {statistics.median(imports):.1f} ms, first request {statistics.median(requests):.1f} ms '
+                f'-> {report["status"]}; budget {budget:.0f} ms)'
+            )
+            if median > budget:
+                failures.append(f'{module}: median cold start {median:.1f} ms exceeds {budget:.0f} ms')
+            if loaded:
+                failures.append(f'{module}: loads {", ".join(sorted(loaded))} at startup; bind them with tracker.lazy')
+
+            if options['audit']:
+                self._audit(module, options['path'], host, env, options['audit'])
+
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget'))
+
+    def _cold_start(self, module, path, host, env, *flags):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, *flags, '-c', CHILD, module, path, host], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        # Ready once the report line arrives; interpreter shutdown is not part of a cold start
+        line = process.stdout.readline()
+        total_ms = (time.perf_counter() - started) * 1000
+        _, stderr = process.communicate()
+        if process.returncode != 0 or not line:
+            raise CommandError(f'{module} failed to start:\n{stderr[-3000:]}')
+        return total_ms, {**json.loads(line), 'stderr': stderr}
+
+    def _audit(self, module, path, host, env, limit):
+        """Self import time summed per top-level package, from one -X importtime run"""
+        _, report = self._cold_start(module, path, host, env, '-X', 'importtime')
+        packages, counts = Counter(), Counter()
+        for line in report['stderr'].splitlines():
+            match = IMPORT_TIME.match(line)
+            if match:
+                package = match.group(4).split('.')[0]
+                packages[package] += int(match.group(1))
+                counts[package] += 1
+        total = sum(packages.values())
+        self.stdout.write(f'  import audit: {total / 1000:.1f} ms in {sum(counts.values())} modules')
+        for package, micros in packages.most_common(limit):
+            self.stdout.write(f'    {micros / 1000:7.1f} ms {micros * 100 / total:5.1f}%  {package} ({counts[package]})')
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from tracker.throttling import (
+    CacheThrottleStore, LocalThrottleStore, SharedAnonRateThrottle, SQLiteThrottleStore
+)
+
+
+def _throttle_class(store_name, rate, path):
+    """A fresh throttle class for this process (stores must not cross a fork)"""
+    if store_name == 'drf':
+        return type('BenchDRFThrottle', (AnonRateThrottle,), {'rate': rate})
+    store = {
+        'sqlite': lambda: SQLiteThrottleStore(path),
+        'cache': CacheThrottleStore,
+        'local': LocalThrottleStore,
+    }[store_name]()
+    return type('BenchSharedThrottle', (SharedAnonRateThrottle,), {'rate': rate, 'store': store})
+
+
+def _requests(clients, network):
+    factory = APIRequestFactory()
+    requests = []
+    for i in range(clients):
+        request = factory.get('/api/v1/skills/', REMOTE_ADDR=f'10.{network}.{i >> 8 & 255}.{i & 255}')
+        request.user = AnonymousUser()
+        requests.append(request)
+    return requests
+
+
+def _overhead(store_name, path, checks, clients, network):
+    throttle_class = _throttle_class(store_name, '1000000000/hour', path)
+    requests = _requests(clients, network)
+    started = time.perf_counter()
+    for i in range(checks):
+        throttle_class().allow_request(requests[i % clients], None)
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def _shared_limit_worker(store_name, path, rate, checks, network):
+    throttle_class = _throttle_class(store_name, rate, path)
+    request = _requests(1, network)[0]
+    return sum(throttle_class().allow_request(request, None) for _ in range(checks))
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark of the throttle stores: microseconds per check, and how many requests '
+        'several processes hitting one client key let through against a single limit'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=20000, help='Checks per store (default 20000)')
+        parser.add_argument('--clients', type=int, default=1000, help='Distinct client addresses (default 1000)')
+        parser.add_argument('--processes', type=int, default=4, help='Processes in the shared-limit run')
+        parser.add_argument('--limit', type=int, default=100, help='Requests per hour in the shared-limit run')
+        parser.add_argument('--stores', default='drf,local,sqlite,cache',
+                            help='Comma-separated subset of drf (SimpleRateThrottle), local, sqlite, cache')
+
+    def handle(self, *args, **options):
+        stores = [name.strip() for name in options['stores'].split(',') if name.strip()]
+        # Fresh client addresses per run, so counters left in the shared cache by earlier runs don't count
+        overhead_network, limit_network = int(time.time()) % 127 * 2, int(time.time()) % 127 * 2 + 1
+        with tempfile.TemporaryDirectory() as directory:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'Per-check overhead ({options["checks"]} checks over {options["clients"]} clients)'
+            ))
+            for name in stores:
+                path = os.path.join(directory, f'overhead-{name}.sqlite3')
+                micros = _overhead(name, path, options['checks'], options['clients'], overhead_network)
+                self.stdout.write(f'  {name:7s} {micros:8.1f} us/check')
+
+            processes, limit = options['processes'], options['limit']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\nShared limit: {processes} processes x {limit * 2} requests, limit {limit}/hour'
+            ))
+            for name in stores:
+                path = os.path.join(directory, f'limit-{name}.sqlite3')
+                with ProcessPoolExecutor(max_workers=processes) as pool:
+                    futures = [
+                        pool.submit(_shared_limit_worker, name, path, f'{limit}/hour', limit * 2, limit_network)
+                        for _ in range(processes)
+                    ]
+                    allowed = sum(future.result() for future in futures)
+                self.stdout.write(f'  {name:7s} allowed {allowed:5d} (limit {limit})')
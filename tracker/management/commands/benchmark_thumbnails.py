@@ -0,0 +1,95 @@
+import glob
+import io
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import thumbnails
+
+
+def _synthetic_photo(width, height, seed):
+    """A noisy gradient JPEG: compresses like a photo, unlike a flat test card"""
+    Image = thumbnails.Image
+    noise = Image.effect_noise((width, height), 64 + seed % 32).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    output = io.BytesIO()
+    Image.blend(noise, gradient, 0.5).save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def _decoded_size(data, box, draft):
+    with thumbnails.Image.open(io.BytesIO(data)) as image:
+        if draft:
+            image.draft('RGB', (box, box))
+        return image.size
+
+
+class Command(BaseCommand):
+    help = (
+        'Bytes served and decode time for a list page of avatars/logos: originals vs each '
+        'THUMBNAIL_SIZES variant, and thumbnail rendering with and without JPEG draft decoding'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=settings.REST_FRAMEWORK.get('PAGE_SIZE', 20),
+                            help='Images per list page (default: the API page size)')
+        parser.add_argument('--images', help='Glob of real images to use instead of synthetic photos')
+        parser.add_argument('--width', type=int, default=3000, help='Synthetic photo width (default 3000)')
+        parser.add_argument('--height', type=int, default=2000, help='Synthetic photo height (default 2000)')
+        parser.add_argument('--size', default='small', help='Variant used for the decode timing (default small)')
+
+    def handle(self, *args, **options):
+        sizes = settings.THUMBNAIL_SIZES
+        if options['size'] not in sizes:
+            raise CommandError(f'Unknown size {options["size"]}; THUMBNAIL_SIZES has {", ".join(sizes)}')
+
+        if options['images']:
+            paths = sorted(path for path in glob.glob(options['images'], recursive=True) if os.path.isfile(path))
+            paths = paths[:options['page_size']]
+            if not paths:
+                raise CommandError(f'No files match {options["images"]}')
+            sources = []
+            for path in paths:
+                with open(path, 'rb') as image_file:
+                    sources.append(image_file.read())
+        else:
+            sources = [
+                _synthetic_photo(options['width'], options['height'], seed) for seed in range(options['page_size'])
+            ]
+
+        image_format, extension = thumbnails.output_format()
+        self.stdout.write(f'{len(sources)} images per page, variants as {extension} (quality {settings.THUMBNAIL_QUALITY})')
+
+        # Bytes a list page downloads
+        original_bytes = sum(len(data) for data in sources)
+        variant_bytes = {size: 0 for size in sizes}
+        for data in sources:
+            for size, (content, _, _) in thumbnails.render_variants(
+                io.BytesIO(data), list(sizes.items()), image_format
+            ).items():
+                variant_bytes[size] += len(content)
+        self.stdout.write(self.style.MIGRATE_HEADING('Bytes per list page'))
+        self.stdout.write(f'  {"original":10s} {original_bytes / 1024:10.1f} KiB')
+        for size, box in sizes.items():
+            self.stdout.write(
+                f'  {size:10s} {variant_bytes[size] / 1024:10.1f} KiB  ({box}px, '
+                f'{original_bytes / max(variant_bytes[size], 1):.0f}x smaller)'
+            )
+
+        # Time to produce one variant per image
+        size, box = options['size'], sizes[options['size']]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Rendering the {size} variant ({box}px) for the page'))
+        for label, draft in (('full decode', False), ('draft decode', True)):
+            timings = []
+            for data in sources:
+                started = time.perf_counter()
+                thumbnails.render_variants(io.BytesIO(data), [(size, box)], image_format, draft=draft)
+                timings.append(time.perf_counter() - started)
+            width, height = _decoded_size(sources[0], box, draft)
+            self.stdout.write(
+                f'  {label:12s} total {sum(timings) * 1000:8.1f} ms  median {statistics.median(timings) * 1000:7.1f} ms'
+                f'/image  decodes {width}x{height} ({width * height / 1e6:.2f} MP)'
+            )
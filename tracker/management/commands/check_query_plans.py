@@ -0,0 +1,108 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from tracker.models import Application, Notification, Student, TrainingOpportunity
+
+# SQLite: "SCAN tracker_application" is a full table scan,
+# "SCAN tracker_application USING INDEX ..." walks an index instead
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)(?: AS \S+)?$')
+
+
+def hot_queries():
+    """(label, queryset) for the query shapes the API and background tasks run most"""
+    now = timezone.now()
+    return [
+        # ApplicationViewSet (student) / MatchingAnalytics.get_student_matches
+        ('applications by student and status',
+         Application.objects.filter(student_id=1, status='pending')),
+        # ApplicationViewSet (organization) ?status=
+        ('applications by organization and status',
+         Application.objects.filter(organization_id=1, status='pending').order_by('-applied_at')),
+        # SmartMatcher.calculate_match_score duplicate check
+        ('application for student and opportunity',
+         Application.objects.filter(student_id=1, training_opportunity_id=1)),
+        # Lifecycle sweep: finished placements
+        ('accepted placements past end date',
+         Application.objects.filter(status='accepted', end_date__lt=now.date())),
+        # NotificationViewSet ?is_read=false / unread_count reconcile
+        ('unread notifications for user',
+         Notification.objects.filter(user_id=1, is_read=False).order_by('-created_at')),
+        ('notifications for user',
+         Notification.objects.filter(user_id=1).order_by('-created_at')),
+        # Retention sweep
+        ('read notifications older than cutoff',
+         Notification.objects.filter(is_read=True, created_at__lt=now - timedelta(days=90)).order_by('created_at')),
+        # SmartMatcher.find_matched_opportunities / ?available_only=true
+        ('open opportunities with slots',
+         TrainingOpportunity.objects.filter(is_open=True, is_active=True, remaining_slots__gt=0, deadline__gt=now)),
+        # Lifecycle sweep: expired opportunities
+        ('open opportunities past deadline',
+         TrainingOpportunity.objects.filter(is_open=True, deadline__lte=now)),
+        # StudentViewSet filterset
+        ('students by institution, course, level and placement',
+         Student.objects.filter(institution_id=1, course_id=1, academic_level='degree', is_placed=False)),
+        # Deadline reminders
+        ('unplaced students of a course',
+         Student.objects.filter(course_id=1, is_placed=False, is_active=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries and fail if any of them needs a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failures')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor == 'sqlite':
+            explain = self._explain_sqlite
+        elif connection.vendor == 'mysql':
+            explain = self._explain_mysql
+        else:
+            raise CommandError(f'Unsupported database vendor: {connection.vendor}')
+
+        failures = []
+        for label, queryset in hot_queries():
+            sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+            plan, full_scans = explain(connection, sql, params)
+
+            if full_scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}: {", ".join(full_scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {label}'))
+            if full_scans or options['verbose_plans']:
+                for line in plan:
+                    self.stdout.write(f'           {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries fall back to a full table scan')
+
+    @staticmethod
+    def _explain_sqlite(connection, sql, params):
+        """Returns (plan lines, scanned tables)"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[-1] for row in cursor.fetchall()]
+        full_scans = [match.group(1) for match in map(SQLITE_FULL_SCAN.match, details) if match]
+        return details, full_scans
+
+    @staticmethod
+    def _explain_mysql(connection, sql, params):
+        """Returns (plan lines, tables accessed with type ALL)"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        plan = [
+            f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row.get('Extra') or ''}".rstrip()
+            for row in rows
+        ]
+        full_scans = [row['table'] for row in rows if row['type'] == 'ALL']
+        return plan, full_scans
@@ -0,0 +1,78 @@
+import os
+import re
+import time
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import cv_ingestion
+from tracker.models import CVDocument, Institution, Student
+
+
+def _key(registration_number):
+    """T21/03/0001, t21-03-0001 and T21_03_0001 are the same student"""
+    return re.sub(r'[^A-Z0-9]', '', registration_number.upper())
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import PDF CVs named after students' registration numbers (T21-03-0001.pdf), extract "
+        'their text on the CV_WORKERS pool and propose skills'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory searched recursively for *.pdf')
+        parser.add_argument('--institution', type=int, help='Only match students of this institution id')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without importing')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['directory']):
+            raise CommandError(f'{options["directory"]} is not a directory')
+        students = Student.objects.all()
+        if options['institution']:
+            if not Institution.objects.filter(pk=options['institution']).exists():
+                raise CommandError(f'No institution {options["institution"]}')
+            students = students.filter(institution_id=options['institution'])
+        by_key = {_key(number): pk for pk, number in students.values_list('pk', 'registration_number')}
+
+        matched, unmatched = [], []
+        for root, _, files in os.walk(options['directory']):
+            for filename in sorted(files):
+                stem, extension = os.path.splitext(filename)
+                if extension.lower() != '.pdf':
+                    continue
+                student_id = by_key.get(_key(stem))
+                path = os.path.join(root, filename)
+                (matched if student_id else unmatched).append((path, student_id))
+        for path, _ in unmatched:
+            self.stderr.write(f'  no student for {path}')
+        self.stdout.write(f'{len(matched)} CVs matched, {len(unmatched)} without a student')
+        if options['dry_run'] or not matched:
+            return
+
+        cv_ids = []
+        for path, student_id in matched:
+            with open(path, 'rb') as source:
+                cv = CVDocument.objects.create(
+                    student_id=student_id, file=File(source, name=os.path.basename(path)),
+                    original_name=os.path.basename(path)[:255], file_size=os.path.getsize(path),
+                )
+            cv_ids.append(cv.pk)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Extracting {len(cv_ids)} CVs'))
+        started = time.perf_counter()
+        done = [0]
+
+        def on_done(cv):
+            done[0] += 1
+            if cv.status != 'done':
+                self.stderr.write(f'  {cv.original_name}: {cv.status} ({cv.error})')
+            if done[0] % 100 == 0:
+                self.stdout.write(f'  {done[0]}/{len(cv_ids)} in {time.perf_counter() - started:.1f}s')
+
+        results = cv_ingestion.process_many(cv_ids, on_done=on_done)
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(results.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary} in {elapsed:.1f}s ({len(cv_ids) / max(elapsed, 0.001):.1f} CVs/s)'
+        ))
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'HTTP load test against a running server: N concurrent keep-alive clients issue GETs '
+        'for a fixed duration and report throughput and tail latency. Compare e.g. '
+        '"gunicorn pos_tracker.wsgi" against "ASYNC_READ_VIEWS=true uvicorn pos_tracker.asgi:application".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Absolute URLs; clients cycle through them')
+        parser.add_argument('--concurrency', type=int, default=500, help='Concurrent clients (default 500)')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds to run (default 20)')
+        parser.add_argument('--warmup', type=float, default=2, help='Seconds excluded from the results (default 2)')
+        parser.add_argument('--token', help='DRF token sent as "Authorization: Token <token>"')
+        parser.add_argument('--header', action='append', default=[], help='Extra "Name: value" header (repeatable)')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        targets = []
+        for url in options['urls']:
+            parts = urlsplit(url)
+            if parts.scheme != 'http' or not parts.hostname:
+                raise CommandError(f'Only absolute http:// URLs are supported: {url}')
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            targets.append((parts.hostname, parts.port or 80, path))
+
+        headers = list(options['header'])
+        if options['token']:
+            headers.append(f"Authorization: Token {options['token']}")
+
+        summary = asyncio.run(self._run(targets, headers, options))
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(f"Clients: {summary['concurrency']}  Duration: {summary['duration']}s")
+        self.stdout.write(f"Requests: {summary['requests']}  Errors: {summary['errors']}  Statuses: {summary['statuses']}")
+        self.stdout.write(self.style.SUCCESS(f"Throughput: {summary['rps']} req/s"))
+        self.stdout.write(
+            f"Latency ms  p50={summary['p50_ms']}  p90={summary['p90_ms']}  "
+            f"p99={summary['p99_ms']}  max={summary['max_ms']}"
+        )
+
+    async def _run(self, targets, headers, options):
+        latencies = []
+        statuses = Counter()
+        errors = [0]
+        start = time.perf_counter()
+        record_from = start + options['warmup']
+        stop_at = record_from + options['duration']
+
+        async def client(index):
+            reader = writer = None
+            n = index
+            while time.perf_counter() < stop_at:
+                host, port, path = targets[n % len(targets)]
+                n += 1
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    began = time.perf_counter()
+                    request = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: keep-alive'] + headers
+                    writer.write(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+                    code, keep_alive = await self._read_response(reader)
+                    ended = time.perf_counter()
+                    if began >= record_from:
+                        latencies.append(ended - began)
+                        statuses[code] += 1
+                    if not keep_alive:
+                        writer.close()
+                        reader = writer = None
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    errors[0] += 1
+                    if writer is not None:
+                        writer.close()
+                    reader = writer = None
+                    await asyncio.sleep(0.05)
+            if writer is not None:
+                writer.close()
+
+        await asyncio.gather(*(client(i) for i in range(options['concurrency'])))
+
+        latencies.sort()
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+        return {
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'requests': len(latencies),
+            'errors': errors[0],
+            'statuses': dict(statuses),
+            'rps': round(len(latencies) / options['duration'], 1),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+            'p50_ms': pct(0.50),
+            'p90_ms': pct(0.90),
+            'p99_ms': pct(0.99),
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+
+    @staticmethod
+    async def _read_response(reader):
+        """Read one HTTP/1.1 response; returns (status code, keep-alive)"""
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        code = int(lines[0].split()[1])
+        fields = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                fields[name.strip().lower()] = value.strip().lower()
+
+        if fields.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in fields:
+            await reader.readexactly(int(fields['content-length']))
+        else:
+            await reader.read()
+            return code, False
+        return code, fields.get('connection') != 'close'
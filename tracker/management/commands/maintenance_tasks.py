@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.tasks import autodiscover, run_task, task_status
+
+
+class Command(BaseCommand):
+    help = 'List registered background tasks with their last run, or run one now'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', metavar='TASK', help='Run a task now (still takes the lease)')
+        parser.add_argument('--force', action='store_true', help='Run even if the task is not due yet')
+
+    def handle(self, *args, **options):
+        registry = autodiscover()
+
+        if options['run']:
+            if options['run'] not in registry:
+                raise CommandError(f"Unknown task '{options['run']}'. Available: {', '.join(registry)}")
+            stats = run_task(options['run'], force=options['force'])
+            if stats is None:
+                self.stdout.write(self.style.WARNING('Not run: not due, leased by another node, or failed (see TaskRun)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{options["run"]}: {stats}'))
+            return
+
+        for task, lease in task_status():
+            if lease is None:
+                self.stdout.write(f'{task.name:<35} every {task.interval:>6}s  never run')
+                continue
+            last_success = timezone.localtime(lease.last_success_at).strftime('%Y-%m-%d %H:%M:%S') if lease.last_success_at else '-'
+            self.stdout.write(
+                f'{task.name:<35} every {task.interval:>6}s  last success {last_success}  '
+                f'{lease.last_duration_ms} ms  owner {lease.owner or "-"}'
+                + (f'  error: {lease.last_error}' if lease.last_error else '')
+            )
@@ -0,0 +1,110 @@
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+
+from tracker import storage
+from tracker.models import MediaBlob, Thumbnail
+from tracker.thumbnails import IMAGE_FIELDS
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(storage.CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Content-addressed upload storage: blob and deduplication totals, moving legacy '
+        'upload_to files into blobs/, and reference count repair and collection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--migrate', action='store_true',
+                            help='Move images still stored under their upload_to name into blobs/')
+        parser.add_argument('--scan', metavar='DIR',
+                            help='Report duplicate files in a directory of loose images (e.g. avatars/)')
+        parser.add_argument('--recount', action='store_true', help='Recompute refcounts from the image fields')
+        parser.add_argument('--collect', action='store_true',
+                            help='Delete blobs unreferenced for MEDIA_BLOB_GRACE_SECONDS now')
+
+    def handle(self, *args, **options):
+        if options['scan']:
+            self._scan(options['scan'])
+        if options['migrate']:
+            self._migrate()
+        if options['recount']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {storage.recount()} refcounts'))
+        if options['collect']:
+            deleted, freed = storage.collect_unreferenced(limit=None)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} blobs ({freed / 1024:.1f} KiB)'))
+        self._summary()
+
+    def _summary(self):
+        self.stdout.write(self.style.MIGRATE_HEADING('Blobs'))
+        blobs = MediaBlob.objects.aggregate(stored=Sum('file_size'), used=Sum(F('file_size') * F('refcount')))
+        stored, used = blobs['stored'] or 0, blobs['used'] or 0
+        referenced = MediaBlob.objects.filter(refcount__gt=0).count()
+        self.stdout.write(
+            f'  {MediaBlob.objects.count()} blobs ({referenced} referenced), {stored / 1024:.1f} KiB stored for '
+            f'{used / 1024:.1f} KiB of references ({max(used - stored, 0) / 1024:.1f} KiB saved by deduplication)'
+        )
+        for model, field in IMAGE_FIELDS.items():
+            images = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            legacy = images.exclude(**{f'{field}__startswith': f'{storage.BLOB_DIR}/'}).count()
+            self.stdout.write(f'  {model.__name__}.{field}: {images.count()} images, {legacy} not yet in blobs/')
+
+    def _migrate(self):
+        upload_storage = storage.get_upload_storage()
+        moved = missing = 0
+        for model, field in IMAGE_FIELDS.items():
+            rows = (
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .exclude(**{f'{field}__startswith': f'{storage.BLOB_DIR}/'}).values_list('pk', field)
+            )
+            for pk, old_name in rows.iterator():
+                if not upload_storage.exists(old_name):
+                    self.stderr.write(f'  {model.__name__} {pk}: {old_name} is missing')
+                    missing += 1
+                    continue
+                with upload_storage.open(old_name, 'rb') as source:
+                    new_name = upload_storage.save(old_name, source)
+                with transaction.atomic():
+                    # update() skips the model signals, so the reference is taken here
+                    if model.objects.filter(pk=pk, **{field: old_name}).update(**{field: new_name}):
+                        storage.acquire(new_name)
+                    # Variants are named by content hash, so they carry over unchanged
+                    Thumbnail.objects.filter(source=old_name).exclude(
+                        size__in=Thumbnail.objects.filter(source=new_name).values('size')
+                    ).update(source=new_name)
+                if not any(m.objects.filter(**{f: old_name}).exists() for m, f in IMAGE_FIELDS.items()):
+                    Thumbnail.objects.filter(source=old_name).delete()
+                    upload_storage.delete(old_name)
+                moved += 1
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} images into blobs/ ({missing} missing files skipped)'))
+
+    def _scan(self, directory):
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} is not a directory')
+        by_hash = {}
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                by_hash.setdefault(_file_hash(path), []).append(path)
+
+        stored = set()
+        for name in MediaBlob.objects.values_list('name', flat=True).iterator():
+            stored.add(storage.blob_digest(name))
+        total = sum(len(paths) for paths in by_hash.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{directory}: {total} files, {len(by_hash)} distinct contents'
+        ))
+        for digest, paths in sorted(by_hash.items(), key=lambda item: -len(item[1])):
+            if len(paths) > 1 or digest in stored:
+                note = ' (already a blob)' if digest in stored else ''
+                self.stdout.write(f'  {digest[:12]}{note}: {", ".join(sorted(paths))}')
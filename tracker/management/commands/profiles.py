@@ -0,0 +1,85 @@
+import shutil
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.profiling import list_profiles, spool_dir
+
+
+def _frame_totals(folded_lines):
+    """(self, inclusive) weight per frame from collapsed stacks"""
+    self_weight, inclusive = Counter(), Counter()
+    for line in folded_lines:
+        stack, _, weight = line.rpartition(' ')
+        if not stack:
+            continue
+        frames = stack.split(';')
+        self_weight[frames[-1]] += int(weight)
+        # A recursive frame counts once per stack
+        for frame in set(frames):
+            inclusive[frame] += int(weight)
+    return self_weight, inclusive
+
+
+class Command(BaseCommand):
+    help = 'List spooled request profiles, or render one (top frames and allocations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to render; lists all when omitted')
+        parser.add_argument('--top', type=int, default=25, help='Frames to show per table (default 25)')
+        parser.add_argument('--folded', action='store_true',
+                            help='Print the raw collapsed stacks (pipe into flamegraph.pl or speedscope)')
+        parser.add_argument('--route', help='Only list profiles of this route')
+        parser.add_argument('--clear', action='store_true', help='Delete every spooled profile')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            count = len(list_profiles())
+            shutil.rmtree(spool_dir(), ignore_errors=True)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {count} profiles'))
+            return
+        if options['profile_id']:
+            self._show(options['profile_id'], options)
+            return
+
+        profiles = [
+            meta for meta in list_profiles() if not options['route'] or meta['route'] == options['route']
+        ]
+        if not profiles:
+            self.stdout.write(f'No profiles in {spool_dir()}')
+            return
+        for meta in profiles:
+            created = timezone.localtime(datetime.fromtimestamp(meta['created'], dt_timezone.utc))
+            self.stdout.write(
+                f"{meta['id']}  {created:%Y-%m-%d %H:%M:%S}  {meta['mode']:8s} {meta['status']} "
+                f"{meta['duration_ms']:8.1f} ms  {meta['method']} {meta['route'] or meta['path']}"
+            )
+
+    def _show(self, profile_id, options):
+        directory = spool_dir()
+        folded = directory / f'{profile_id}.folded'
+        if not folded.exists():
+            raise CommandError(f'No profile {profile_id} in {directory}')
+        lines = folded.read_text().splitlines()
+        if options['folded']:
+            self.stdout.write('\n'.join(lines))
+            return
+
+        meta = next((meta for meta in list_profiles() if meta['id'] == profile_id), {})
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{profile_id}: {meta.get('method')} {meta.get('path')} -> {meta.get('status')} "
+            f"in {meta.get('duration_ms')} ms ({meta.get('mode')}, peak traced {meta.get('peak_traced_kib')} KiB)"
+        ))
+        unit = 'us' if meta.get('mode') == 'cprofile' else 'samples'
+        self_weight, inclusive = _frame_totals(lines)
+        total = sum(self_weight.values()) or 1
+        for title, counts in (('Self', self_weight), ('Inclusive', inclusive)):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{title} ({unit}, {total} total)'))
+            for frame, weight in counts.most_common(options['top']):
+                self.stdout.write(f'  {weight:9d} {weight * 100 / total:5.1f}%  {frame}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Top allocations'))
+        allocations = directory / f'{profile_id}.alloc.txt'
+        self.stdout.write(allocations.read_text().rstrip() if allocations.exists() else '  (none)')
@@ -0,0 +1,77 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from tracker.models import Notification
+from tracker.retention import (
+    DEFAULT_BATCH_SIZE, compact_unread_notifications, get_retention_policy, purge_read_notifications
+)
+
+
+class Command(BaseCommand):
+    help = 'Archive/delete old read notifications and collapse repetitive unread ones (policy from SystemConfig)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Override notification_retention_days')
+        parser.add_argument('--threshold', type=int, help='Override notification_compaction_threshold (0 disables)')
+        parser.add_argument('--no-archive', action='store_true', help='Delete without archiving')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Time the notification list query for the heaviest users before and after')
+
+    def handle(self, *args, **options):
+        policy = get_retention_policy()
+        days = options['days'] if options['days'] is not None else policy['retention_days']
+        threshold = options['threshold'] if options['threshold'] is not None else policy['compaction_threshold']
+        archive = policy['archive'] and not options['no_archive']
+
+        self.stdout.write(f'Retention: {days} days, compaction threshold: {threshold}, archive: {archive}')
+
+        if options['dry_run']:
+            cutoff = timezone.now() - timedelta(days=days)
+            stale = Notification.objects.filter(is_read=True, created_at__lt=cutoff).count()
+            self.stdout.write(f'Would remove {stale} read notifications older than {cutoff:%Y-%m-%d}')
+            return
+
+        heavy_users = []
+        if options['benchmark']:
+            heavy_users = list(
+                Notification.objects.values('user_id').annotate(total=Count('id'))
+                .order_by('-total').values_list('user_id', flat=True)[:10]
+            )
+            before = self._time_list_queries(heavy_users)
+
+        purged = purge_read_notifications(days, archive=archive, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {purged} read notifications'))
+
+        if threshold > 0:
+            groups, compacted = compact_unread_notifications(threshold, archive=archive, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Collapsed {compacted} unread notifications into {groups} summaries'))
+
+        if heavy_users:
+            after = self._time_list_queries(heavy_users)
+            self.stdout.write(f'Notification list latency for {len(heavy_users)} heaviest users (ms, median of 5):')
+            for user_id in heavy_users:
+                self.stdout.write(f'  user {user_id}: {before[user_id]:.2f} -> {after[user_id]:.2f}')
+
+    @staticmethod
+    def _time_list_queries(user_ids, repeat=5):
+        """Median time of the NotificationViewSet list query shape (count + first page)"""
+        results = {}
+        for user_id in user_ids:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                queryset = Notification.objects.filter(user_id=user_id).order_by('-created_at')
+                queryset.count()
+                list(queryset[:20])
+                unread = queryset.filter(is_read=False)
+                unread.count()
+                list(unread[:20])
+                timings.append((time.perf_counter() - started) * 1000)
+            results[user_id] = sorted(timings)[len(timings) // 2]
+        return results
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tracker.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild organization rating aggregates from verified reviews (drift repair)'
+
+    def handle(self, *args, **options):
+        fixed = recompute_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed ratings; {fixed} organizations corrected'))
@@ -0,0 +1,72 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+if 'django_apscheduler' not in settings.INSTALLED_APPS:
+    raise ImproperlyConfigured(
+        f"run_scheduler needs the scheduler apps, which PROCESS_ROLE={settings.PROCESS_ROLE} leaves out; "
+        f"start it with PROCESS_ROLE=worker"
+    )
+
+from apscheduler.schedulers.blocking import BlockingScheduler  # noqa: E402
+from apscheduler.triggers.cron import CronTrigger  # noqa: E402
+from apscheduler.triggers.interval import IntervalTrigger  # noqa: E402
+from django.core.management.base import BaseCommand  # noqa: E402
+from django_apscheduler import util  # noqa: E402
+from django_apscheduler.jobstores import DjangoJobStore  # noqa: E402
+from django_apscheduler.models import DjangoJobExecution  # noqa: E402
+
+from tracker.tasks import autodiscover, run_task  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+@util.close_old_connections
+def run_maintenance_task(name):
+    """Run a registered task; the DB lease makes this a no-op on all but one node"""
+    run_task(name)
+
+
+@util.close_old_connections
+def delete_old_job_executions(max_age=604_800):
+    """Delete APScheduler job execution entries older than max_age seconds (default 1 week)"""
+    DjangoJobExecution.objects.delete_old_job_executions(max_age)
+
+
+class Command(BaseCommand):
+    help = 'Run the background task worker (lifecycle sweeps, notification retention, housekeeping)'
+
+    def handle(self, *args, **options):
+        scheduler = BlockingScheduler(timezone=settings.TIME_ZONE)
+        scheduler.add_jobstore(DjangoJobStore(), 'default')
+
+        # Every node polls each task at most once a tick; the lease decides who runs it
+        tick = settings.MAINTENANCE_TASK_TICK_SECONDS
+        for name, task in autodiscover().items():
+            scheduler.add_job(
+                run_maintenance_task,
+                trigger=IntervalTrigger(seconds=min(task.interval, tick)),
+                args=[name],
+                id=f'maintenance:{name}',
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True,
+            )
+            self.stdout.write(f'Registered task {name} (every {task.interval}s)')
+
+        scheduler.add_job(
+            delete_old_job_executions,
+            trigger=CronTrigger(day_of_week='mon', hour='00', minute='00'),
+            id='delete_old_job_executions',
+            max_instances=1,
+            replace_existing=True,
+        )
+
+        try:
+            self.stdout.write('Starting scheduler...')
+            scheduler.start()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping scheduler...')
+            scheduler.shutdown()
+            self.stdout.write(self.style.SUCCESS('Scheduler shut down successfully!'))
@@ -0,0 +1,40 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tracker.slow_queries import SlowQueryStore, get_store
+
+
+class Command(BaseCommand):
+    help = 'Slow and N+1 queries aggregated by SQL fingerprint, with the tracker/ code and routes that ran them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['slow', 'n+1'], help='Only one kind of report')
+        parser.add_argument('--sort', choices=sorted(SlowQueryStore.ORDERINGS), default='total_ms')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--hours', type=float, help='Only fingerprints seen in the last N hours')
+        parser.add_argument('--clear', action='store_true', help='Delete all collected reports')
+
+    def handle(self, *args, **options):
+        store = get_store()
+        if options['clear']:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {store.clear()} report rows'))
+            return
+
+        since = time.time() - options['hours'] * 3600 if options['hours'] else None
+        rows = store.report(kind=options['kind'], since=since, order_by=options['sort'], limit=options['limit'])
+        if not rows:
+            self.stdout.write('No slow or N+1 queries recorded')
+            return
+
+        for row in rows:
+            last_seen = timezone.localtime(datetime.fromtimestamp(row['last_seen'], dt_timezone.utc))
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"[{row['fingerprint']}] {row['kind']}  x{row['count']}  total {row['total_ms']:.1f} ms  "
+                f"max {row['max_ms']:.1f} ms  last {last_seen:%Y-%m-%d %H:%M:%S}"
+            ))
+            self.stdout.write(f"  {row['sql'][:300]}")
+            for site in sorted(row['sites'].split('\n')):
+                self.stdout.write(f'    {site}')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from tracker.db_router import replica_aliases
+from tracker.sqlite import backup_database
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the local SQLite replica(s) (stand-in for replication)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replica aliases (default: all of DATABASE_REPLICAS)')
+        parser.add_argument('--every', type=float, default=0,
+                            help='Keep syncing every N seconds, to simulate replication lag')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas configured (set DB_REPLICA_SQLITE)')
+
+        for alias in [DEFAULT_DB_ALIAS] + aliases:
+            if alias not in connections.databases:
+                raise CommandError(f"Unknown database alias '{alias}'")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"'{alias}' is not SQLite; use the database's own replication")
+
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                backup_database(primary, connections[alias].settings_dict['NAME'], pages=-1, sleep=0)
+                self.stdout.write(f'{alias}: synced in {(time.perf_counter() - started) * 1000:.1f} ms')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -1,4 +1,7 @@
-from django.db.models import Q, Count, Case, When, IntegerField
+from django.db.models import Q, Count, Case, When, IntegerField, Avg, Max
+from django.utils import timezone
+from .db_router import replica_reads
+from .tracing import span, traced
 from .models import Student, TrainingOpportunity, Application
 
 
@@ -14,6 +17,7 @@ class SmartMatcher:
         'location_match': 10,    # 10% - Location preference
     }
     
+    @traced('SmartMatcher.calculate_match_score')
     def calculate_match_score(self, student, training_opportunity):
         """
         Calculate match score between a student and a training opportunity
@@ -36,27 +40,32 @@ class SmartMatcher:
         details = {}
         
         # 1. Course Match (35%)
-        course_match = self._calculate_course_match(student, training_opportunity)
+        with span('match.course'):
+            course_match = self._calculate_course_match(student, training_opportunity)
         scores['course_match'] = course_match['score']
         details['course_match'] = course_match
         
         # 2. Level Match (20%)
-        level_match = self._calculate_level_match(student, training_opportunity)
+        with span('match.level'):
+            level_match = self._calculate_level_match(student, training_opportunity)
         scores['level_match'] = level_match['score']
         details['level_match'] = level_match
         
         # 3. Skill Match (25%)
-        skill_match = self._calculate_skill_match(student, training_opportunity)
+        with span('match.skill'):
+            skill_match = self._calculate_skill_match(student, training_opportunity)
         scores['skill_match'] = skill_match['score']
         details['skill_match'] = skill_match
         
         # 4. GPA Match (10%)
-        gpa_match = self._calculate_gpa_match(student, training_opportunity)
+        with span('match.gpa'):
+            gpa_match = self._calculate_gpa_match(student, training_opportunity)
         scores['gpa_match'] = gpa_match['score']
         details['gpa_match'] = gpa_match
         
         # 5. Location Match (10%)
-        location_match = self._calculate_location_match(student, training_opportunity)
+        with span('match.location'):
+            location_match = self._calculate_location_match(student, training_opportunity)
         scores['location_match'] = location_match['score']
         details['location_match'] = location_match
         
@@ -70,6 +79,7 @@ class SmartMatcher:
             'match_details': details
         }
     
+    @traced('SmartMatcher.find_matched_opportunities')
     def find_matched_opportunities(self, student, min_score=0):
         """
         Find all matching opportunities for a student
@@ -78,7 +88,8 @@ class SmartMatcher:
         opportunities = TrainingOpportunity.objects.filter(
             is_open=True,
             is_active=True,
-            remaining_slots__gt=0
+            remaining_slots__gt=0,
+            deadline__gt=timezone.now()
         )
         
         matched = {}
@@ -259,9 +270,10 @@ class SmartMatcher:
 
 
 class MatchingAnalytics:
-    """Analytics for matching quality and placement"""
+    """Analytics for matching quality and placement (read from a replica when configured)"""
     
     @staticmethod
+    @replica_reads()
     def get_placement_statistics():
         """Get overall placement statistics"""
         from .models import Student, Application
@@ -284,6 +296,7 @@ class MatchingAnalytics:
         }
     
     @staticmethod
+    @replica_reads()
     def get_match_quality_distribution():
         """Get distribution of match qualities"""
         from .models import Application
@@ -303,6 +316,7 @@ class MatchingAnalytics:
         return result
     
     @staticmethod
+    @replica_reads()
     def get_student_matches(student):
         """Get match quality statistics for a student"""
         from .models import Application
@@ -315,6 +329,6 @@ class MatchingAnalytics:
             'accepted': applications.filter(status='accepted').count(),
             'rejected': applications.filter(status='rejected').count(),
             'withdrawn': applications.filter(status='withdrawn').count(),
-            'average_match_score': applications.aggregate(avg=models.Avg('match_score'))['avg'] or 0,
-            'highest_match': applications.aggregate(max=models.Max('match_score'))['max'] or 0,
+            'average_match_score': applications.aggregate(avg=Avg('match_score'))['avg'] or 0,
+            'highest_match': applications.aggregate(max=Max('match_score'))['max'] or 0,
         }
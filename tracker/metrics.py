@@ -0,0 +1,250 @@
+"""
+Per-route request metrics in Prometheus text format.
+MetricsMiddleware records, per resolved route (URL name) and method: request
+counts by status, a latency histogram, DB query count and time (from
+tracker.db_stats) and response bytes. Each process keeps cumulative counters in
+memory and writes them to METRICS_DIR/<pid>-<start>.json at most every
+METRICS_FLUSH_SECONDS; /metrics merges every worker's file with the serving
+process's live numbers. Files of exited workers are kept so counters never go
+backwards; clear METRICS_DIR on deploy.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'sitms'
+PROCESS_METRICS_HELP = {
+    'db_connects_total': 'New database connections opened',
+    'db_pool_checkouts_total': 'Connections taken from the pool',
+    'db_connect_seconds_total': 'Time spent opening or checking out connections',
+    'response_cache_l1_hits_total': 'Response cache hits in the per-process tier',
+    'response_cache_l2_hits_total': 'Response cache hits in the shared tier',
+    'response_cache_misses_total': 'Response cache misses',
+    'db_pool_connections': 'Open pooled connections in the serving process',
+    'db_pool_idle_connections': 'Idle pooled connections in the serving process',
+}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # One writer of the process file (and its .tmp) at a time
+_routes = {}  # (route, method) -> RouteStats
+_process_file = (None, None)  # (pid, file name); re-derived after a fork
+_last_flush = 0.0
+
+
+class RouteStats:
+    """Cumulative counters for one (route, method)"""
+    __slots__ = ('statuses', 'buckets', 'duration_sum', 'count', 'db_queries', 'db_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.statuses = {}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+
+    def observe(self, status, seconds, db_queries, db_seconds, response_bytes):
+        status = str(status)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.duration_sum += seconds
+        self.count += 1
+        self.db_queries += db_queries
+        self.db_seconds += db_seconds
+        self.response_bytes += response_bytes
+
+    def as_dict(self):
+        return {
+            'statuses': dict(self.statuses), 'buckets': list(self.buckets), 'duration_sum': self.duration_sum,
+            'count': self.count, 'db_queries': self.db_queries, 'db_seconds': self.db_seconds,
+            'response_bytes': self.response_bytes,
+        }
+
+
+def observe(route, method, status, seconds, db_queries=0, db_seconds=0.0, response_bytes=0):
+    with _lock:
+        stats = _routes.get((route, method))
+        if stats is None:
+            stats = _routes[(route, method)] = RouteStats()
+        stats.observe(status, seconds, db_queries, db_seconds, response_bytes)
+
+
+# ============================================================================
+# PER-PROCESS SNAPSHOTS
+# ============================================================================
+
+def snapshot():
+    """This process's counters: routes plus the DB, pool and response cache totals"""
+    from .cache import response_cache
+    from .db_pool import pool_stats
+    from .db_stats import totals
+
+    with _lock:
+        routes = {f'{route} {method}': stats.as_dict() for (route, method), stats in _routes.items()}
+    db_totals = totals()
+    cache_totals = response_cache.stats()['total']
+    return {
+        'routes': routes,
+        'counters': {
+            'db_connects_total': db_totals.get('connects', 0),
+            'db_pool_checkouts_total': db_totals.get('pool_checkouts', 0),
+            'db_connect_seconds_total': db_totals.get('connect_ms', 0) / 1000,
+            'response_cache_l1_hits_total': cache_totals.get('l1_hits', 0),
+            'response_cache_l2_hits_total': cache_totals.get('l2_hits', 0),
+            'response_cache_misses_total': cache_totals.get('misses', 0),
+        },
+        'gauges': {
+            'db_pool_connections': sum(pool['size'] for pool in pool_stats().values()),
+            'db_pool_idle_connections': sum(pool['idle'] for pool in pool_stats().values()),
+        },
+    }
+
+
+def metrics_dir():
+    return Path(settings.METRICS_DIR)
+
+
+def process_file_name():
+    global _process_file
+    pid, name = _process_file
+    if pid != os.getpid():
+        pid = os.getpid()
+        name = f'{pid}-{int(time.time())}.json'
+        _process_file = (pid, name)
+    return name
+
+
+def flush(force=False):
+    """Write this process's snapshot for the other workers (rate-limited unless forced)"""
+    global _last_flush
+    # Request threads never wait: another thread writing the file right now makes it fresh enough
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        now = time.monotonic()
+        if not force and now - _last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        _last_flush = now
+        directory = metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / process_file_name()
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(snapshot()))
+        os.replace(temporary, path)
+    finally:
+        _flush_lock.release()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _routes:
+        flush(force=True)
+
+
+def _merge(target, source):
+    for name, route in source['routes'].items():
+        merged = target['routes'].setdefault(name, {
+            'statuses': {}, 'buckets': [0] * len(LATENCY_BUCKETS), 'duration_sum': 0.0, 'count': 0,
+            'db_queries': 0, 'db_seconds': 0.0, 'response_bytes': 0,
+        })
+        for status, count in route['statuses'].items():
+            merged['statuses'][status] = merged['statuses'].get(status, 0) + count
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], route['buckets'])]
+        for field in ('duration_sum', 'count', 'db_queries', 'db_seconds', 'response_bytes'):
+            merged[field] += route[field]
+    for section in ('counters', 'gauges'):
+        for name, value in source[section].items():
+            target[section][name] = target[section].get(name, 0) + value
+
+
+def collect():
+    """All workers' snapshots merged; this process contributes its live numbers"""
+    merged = {'routes': {}, 'counters': {}, 'gauges': {}}
+    directory = metrics_dir()
+    if directory.is_dir():
+        for path in directory.glob('*.json'):
+            if path.name == process_file_name():
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Being replaced by its worker right now
+                continue
+            # Gauges describe the serving process only; files may belong to exited workers
+            data['gauges'] = {}
+            _merge(merged, data)
+    _merge(merged, snapshot())
+    return merged
+
+
+# ============================================================================
+# PROMETHEUS TEXT FORMAT
+# ============================================================================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render(data=None):
+    data = data or collect()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+    routes = sorted((name.rsplit(' ', 1), route) for name, route in data['routes'].items())
+
+    family('http_requests_total', 'counter', 'Requests by route, method and status')
+    for (route, method), stats in routes:
+        for status, count in sorted(stats['statuses'].items()):
+            lines.append(f'{PREFIX}_http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+    family('http_request_duration_seconds', 'histogram', 'Request latency by route and method')
+    for (route, method), stats in routes:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+            cumulative += count
+            lines.append(
+                f'{PREFIX}_http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}'
+            )
+        lines.append(
+            f'{PREFIX}_http_request_duration_seconds_bucket{_labels(route=route, method=method, le="+Inf")} {stats["count"]}'
+        )
+        lines.append(f'{PREFIX}_http_request_duration_seconds_sum{_labels(route=route, method=method)} {stats["duration_sum"]:.6f}')
+        lines.append(f'{PREFIX}_http_request_duration_seconds_count{_labels(route=route, method=method)} {stats["count"]}')
+
+    for name, field, help_text in (
+        ('http_db_queries_total', 'db_queries', 'DB queries run by requests to the route'),
+        ('http_db_query_seconds_total', 'db_seconds', 'DB query time spent by requests to the route'),
+        ('http_response_bytes_total', 'response_bytes', 'Response body bytes sent by the route'),
+    ):
+        family(name, 'counter', help_text)
+        for (route, method), stats in routes:
+            value = stats[field]
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'{PREFIX}_{name}{_labels(route=route, method=method)} {value}')
+
+    for section, kind in (('counters', 'counter'), ('gauges', 'gauge')):
+        for name, value in sorted(data[section].items()):
+            family(name, kind, PROCESS_METRICS_HELP.get(name, name))
+            lines.append(f'{PREFIX}_{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing(seconds, db_queries, db_seconds):
+    return f'app;dur={seconds * 1000:.1f}, db;dur={db_seconds * 1000:.1f};desc="{db_queries} queries"'
@@ -1,16 +1,95 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
-from datetime import timedelta
+from django.utils.decorators import sync_and_async_middleware
+
+from .db_router import pin_to_primary, request_scope, wrote_primary
+from .db_stats import current_request_stats, record_request, track_request
+from .logs import end_request, start_request
+from . import metrics
+from .profiling import aprofile_request, profile_request
+from .throttling import charge_request
+from .tracing import atrace_request, trace_request
 
+logger = logging.getLogger('tracker.db_stats')
 
-class TimezoneMiddleware:
+
+@sync_and_async_middleware
+class RequestMiddleware:
     """
-    Middleware to set timezone based on user preferences or default timezone.
+    Base of the tracker middleware: call() under WSGI, acall() under ASGI. A
+    sync-only middleware would be wrapped in sync_to_async(thread_sensitive=True)
+    by the ASGI handler, putting every request through one shared thread on its
+    way to the async views. Subclasses must define both.
     """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in ('call', 'acall') if not callable(getattr(cls, name, None))]
+        if missing:
+            raise TypeError(f"{cls.__name__} must define {' and '.join(missing)}()")
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        return self.call(request)
+
+
+class RequestLogContextMiddleware(RequestMiddleware):
+    """
+    Give each request an id (the client's X-Request-ID or a new one), tag log
+    records with it and the user id (tracker.logs), and echo it in the response.
+    """
+    def call(self, request):
+        tokens = start_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(tokens)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    async def acall(self, request):
+        tokens = start_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(tokens)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+
+class TracingMiddleware(RequestMiddleware):
+    """Trace the request with nested spans and export it if slow or failed (tracker.tracing)"""
+    def call(self, request):
+        return trace_request(request, self.get_response)
+
+    async def acall(self, request):
+        return await atrace_request(request, self.get_response)
+
+
+class ProfilerMiddleware(RequestMiddleware):
+    """Profile requests selected by a staff X-Profile header or the sampled routes (tracker.profiling)"""
+    def call(self, request):
+        return profile_request(request, self.get_response)
+
+    async def acall(self, request):
+        return await aprofile_request(request, self.get_response)
+
+
+class TimezoneMiddleware(RequestMiddleware):
+    """
+    Middleware to set timezone based on user preferences or default timezone.
+    """
+    def call(self, request):
         # Set timezone based on user preference if authenticated
         if request.user and not isinstance(request.user, AnonymousUser):
             # You can add user timezone preference later
@@ -20,62 +99,108 @@ class TimezoneMiddleware:
         response = self.get_response(request)
         return response
 
+    async def acall(self, request):
+        # No user preference yet, so request.user (a sync session lookup) is not touched here
+        return await self.get_response(request)
 
-class AutoProgressOrdersMiddleware:
+
+class ReplicaPinMiddleware(RequestMiddleware):
     """
-    Middleware to automatically progress orders based on time elapsed.
-    This runs on every request to check if any orders need status updates.
+    Scope read-replica routing to the request and, if the request wrote to
+    the primary, pin the client to the primary for REPLICA_PIN_SECONDS.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-        self.last_check = None
-        self.check_interval = 60  # Check every 60 seconds
+    def call(self, request):
+        with request_scope():
+            response = self.get_response(request)
+            if wrote_primary():
+                pin_to_primary(request, response)
+        return response
 
-    def __call__(self, request):
-        # Import here to avoid circular imports
-        from tracker.models import Order
-        from django.utils import timezone as django_timezone
-        
-        now = django_timezone.now()
-        
-        # Only check periodically, not on every request
-        if self.last_check is None or (now - self.last_check).total_seconds() >= self.check_interval:
-            try:
-                self._auto_progress_orders()
-                self.last_check = now
-            except Exception as e:
-                # Log error but don't fail the request
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Error auto-progressing orders: {str(e)}")
-        
-        response = self.get_response(request)
+    async def acall(self, request):
+        with request_scope():
+            response = await self.get_response(request)
+            if wrote_primary():
+                # Reads request.user and writes the cache; only requests that wrote pay for the thread hop
+                await sync_to_async(pin_to_primary)(request, response)
         return response
 
-    def _auto_progress_orders(self):
-        """
-        Auto-progress orders based on elapsed time.
-        For example: pending -> in_progress after 5 minutes, etc.
-        """
-        try:
-            from tracker.models import Order
-            from django.utils import timezone as django_timezone
-            
-            now = django_timezone.now()
-            
-            # Example: Auto-progress pending orders to in_progress after 5 minutes
-            five_minutes_ago = now - timedelta(minutes=5)
-            
-            pending_orders = Order.objects.filter(
-                status='pending',
-                created_at__lte=five_minutes_ago
+
+class DBStatsMiddleware(RequestMiddleware):
+    """
+    Record per-request DB work (queries, query time, connects, connect time) and
+    add it to the process totals behind the connection reuse rate.
+    """
+    def call(self, request):
+        with track_request() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def acall(self, request):
+        # sync_to_async copies the context, so queries in the view's thread still count on stats
+        with track_request() as stats:
+            response = await self.get_response(request)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        record_request(stats)
+
+        if settings.DEBUG:
+            response['X-DB-Stats'] = (
+                f'queries={stats.queries}; query_ms={stats.query_ms:.1f}; '
+                f'connects={stats.connects}; pool_checkouts={stats.pool_checkouts}; connect_ms={stats.connect_ms:.1f}'
             )
-            
-            # Update orders to next status
-            for order in pending_orders:
-                if hasattr(order, 'auto_progress_status'):
-                    order.auto_progress_status()
-                    order.save()
-        except Exception as e:
-            # Silently fail if Order model doesn't exist or has issues
-            pass
+        logger.debug(f"{request.method} {request.path} db={stats.as_dict()}")
+        return response
+
+
+class MetricsMiddleware(RequestMiddleware):
+    """
+    Record latency, status, DB queries/time and response size per resolved route
+    (tracker.metrics) and, if SERVER_TIMING is on, add a Server-Timing header.
+    Must sit inside DBStatsMiddleware.
+    """
+    def call(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - started)
+
+    async def acall(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        # Inline on the event loop: flush() writes a few KB at most every METRICS_FLUSH_SECONDS
+        return self.record(request, response, time.perf_counter() - started)
+
+    def record(self, request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name if match else None) or 'unmatched'
+        stats = current_request_stats()
+        queries, query_seconds = (stats.queries, stats.query_ms / 1000) if stats is not None else (0, 0.0)
+        size = 0 if response.streaming else len(response.content)
+        metrics.observe(route, request.method, response.status_code, elapsed, queries, query_seconds, size)
+        metrics.flush()
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing(elapsed, queries, query_seconds)
+        return response
+
+
+class CostBudgetMiddleware(RequestMiddleware):
+    """
+    Charge each request throttled by CostBudgetThrottle its DB query time and
+    report the client's remaining budget in X-Cost-Budget-* headers. Must sit
+    inside DBStatsMiddleware, which measures the query time.
+    """
+    def call(self, request):
+        response = self.get_response(request)
+        for header, value in charge_request(request).items():
+            response[header] = value
+        return response
+
+    async def acall(self, request):
+        response = await self.get_response(request)
+        if getattr(request, 'cost_budget', None) is not None:
+            # The store hit is blocking I/O on its own (thread-local) connection, not the ORM's
+            headers = await sync_to_async(charge_request, thread_sensitive=False)(request)
+            for header, value in headers.items():
+                response[header] = value
+        return response
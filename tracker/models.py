@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .storage import get_cv_storage, get_upload_storage
+
 # ============================================================================
 # INSTITUTIONS & DEPARTMENTS
 # ============================================================================
@@ -125,7 +127,9 @@ class Student(models.Model):
     
     # Profile information
     phone = models.CharField(max_length=20)
-    profile_photo = models.ImageField(upload_to='student_profiles/', blank=True, null=True)
+    profile_photo = models.ImageField(
+        upload_to='student_profiles/', storage=get_upload_storage, blank=True, null=True
+    )
     bio = models.TextField(blank=True)
     preferred_location = models.CharField(max_length=255, blank=True)
     
@@ -143,6 +147,12 @@ class Student(models.Model):
     
     class Meta:
         ordering = ['-registered_at']
+        indexes = [
+            # StudentViewSet filterset (institution, course, academic_level, is_placed)
+            models.Index(fields=['institution', 'course', 'academic_level', 'is_placed'], name='student_inst_course_idx'),
+            # Deadline reminders: unplaced students of a course
+            models.Index(fields=['course', 'is_placed', 'is_active'], name='student_course_placed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.registration_number})"
@@ -156,6 +166,87 @@ class Student(models.Model):
         return self.user.email
 
 
+# ============================================================================
+# CV INGESTION
+# ============================================================================
+
+class CVDocument(models.Model):
+    """An uploaded CV and what tracker.cv_ingestion extracted from it"""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('timeout', 'Timed Out'),
+    )
+    
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='cvs')
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    file = models.FileField(upload_to='cvs/%Y/%m/', storage=get_cv_storage)
+    original_name = models.CharField(max_length=255, blank=True)
+    file_size = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    
+    # Extraction results
+    page_count = models.PositiveIntegerField(default=0)
+    ocr_pages = models.PositiveIntegerField(default=0)  # Image-only pages run through OCR
+    cached_pages = models.PositiveIntegerField(default=0)  # Pages found in the CVPageText cache
+    text = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # Claims so far; capped by CV_MAX_ATTEMPTS
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'], name='cv_status_created_idx')]
+    
+    def __str__(self):
+        return f"CV of {self.student} ({self.status})"
+
+
+class CVPageText(models.Model):
+    """Text of one PDF page, keyed by a hash of the page's content streams and images"""
+    METHODS = (
+        ('text', 'Text layer'),
+        ('ocr', 'OCR'),
+        ('empty', 'Empty'),
+    )
+    
+    content_hash = models.CharField(max_length=64, unique=True)
+    method = models.CharField(max_length=10, choices=METHODS)
+    text = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.method})"
+
+
+class SkillSuggestion(models.Model):
+    """A skill found in a CV, proposed to the student"""
+    STATUSES = (
+        ('proposed', 'Proposed'),
+        ('accepted', 'Accepted'),
+        ('rejected', 'Rejected'),
+    )
+    
+    cv = models.ForeignKey(CVDocument, on_delete=models.CASCADE, related_name='skill_suggestions')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    mentions = models.PositiveIntegerField(default=1)
+    evidence = models.CharField(max_length=255, blank=True)  # Text around the first mention
+    status = models.CharField(max_length=20, choices=STATUSES, default='proposed')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('cv', 'skill')
+        ordering = ['-mentions', 'skill__name']
+    
+    def __str__(self):
+        return f"{self.skill} in CV {self.cv_id} ({self.status})"
+
+
 # ============================================================================
 # ORGANIZATION & TRAINING OPPORTUNITIES
 # ============================================================================
@@ -174,7 +265,9 @@ class Organization(models.Model):
     website = models.URLField(blank=True)
     
     # Logo/branding
-    logo = models.ImageField(upload_to='organization_logos/', blank=True, null=True)
+    logo = models.ImageField(
+        upload_to='organization_logos/', storage=get_upload_storage, blank=True, null=True
+    )
     
     # Requirements & supported courses
     supported_courses = models.ManyToManyField(Course, related_name='organizations')
@@ -189,19 +282,43 @@ class Organization(models.Model):
     # Status
     is_active = models.BooleanField(default=True)
     
-    # Ratings (auto-calculated)
+    # Ratings (auto-calculated from verified reviews, see tracker/ratings.py)
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0)
     review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    RATING_FIELDS = (
+        'rating', 'review_count', 'rating_total',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+    
     class Meta:
         ordering = ['-rating', 'name']
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        # Rating columns are maintained with F() updates; never write back stale in-memory values
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
 
 
 class OrganizationCourseLevel(models.Model):
@@ -247,6 +364,12 @@ class TrainingOpportunity(models.Model):
     
     class Meta:
         ordering = ['-posted_at']
+        indexes = [
+            # SmartMatcher.find_matched_opportunities / available_only listing
+            models.Index(fields=['is_active', 'is_open', 'remaining_slots', 'deadline'], name='opp_open_slots_deadline_idx'),
+            # Lifecycle sweep: open opportunities by deadline
+            models.Index(fields=['deadline'], condition=models.Q(is_open=True), name='opp_open_deadline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.organization.name}"
@@ -315,6 +438,12 @@ class Application(models.Model):
     class Meta:
         unique_together = ('student', 'training_opportunity')
         ordering = ['-applied_at']
+        indexes = [
+            models.Index(fields=['student', 'status'], name='app_student_status_idx'),
+            models.Index(fields=['organization', 'status', '-applied_at'], name='app_org_status_applied_idx'),
+            # Lifecycle sweep: accepted placements past end_date
+            models.Index(fields=['status', 'end_date'], name='app_status_end_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.full_name} - {self.training_opportunity.title}"
@@ -377,6 +506,58 @@ class ApplicationStatusHistory(models.Model):
         return f"{self.application} - {self.old_status} → {self.new_status}"
 
 
+# ============================================================================
+# ACCEPTANCE LETTERS
+# ============================================================================
+
+class AcceptanceLetter(models.Model):
+    """A rendered acceptance letter PDF, cached per template version (tracker.letters)"""
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='letters')
+    template_version = models.CharField(max_length=16)
+    data_hash = models.CharField(max_length=64)  # Hash of the letter data the PDF was rendered from
+    name = models.CharField(max_length=255)  # Name in STORAGES['letters']
+    file_size = models.PositiveIntegerField()
+    rendered_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('application', 'template_version')
+    
+    def __str__(self):
+        return f"Letter for application {self.application_id} ({self.template_version})"
+
+
+class LetterBatch(models.Model):
+    """One job rendering the letters of every accepted application of an opportunity"""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    opportunity = models.ForeignKey(TrainingOpportunity, on_delete=models.CASCADE, related_name='letter_batches')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    template_version = models.CharField(max_length=16)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    
+    # Progress
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    reused = models.PositiveIntegerField(default=0)  # Still current in the cache
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Progress writes; stale means the worker died
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Letters for {self.opportunity_id} ({self.status})"
+
+
 # ============================================================================
 # NOTIFICATIONS
 # ============================================================================
@@ -410,6 +591,14 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            # SQLite cannot seek on a boolean column (Django filters it as a bare "is_read"),
+            # so the unread badge/list path also gets a partial index
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False), name='notif_unread_user_idx'),
+            # Retention sweep: read notifications by age
+            models.Index(fields=['created_at'], condition=models.Q(is_read=True), name='notif_read_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -419,7 +608,57 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            self.save(update_fields=['is_read', 'read_at'])
+            
+            # Import here to avoid circular imports
+            from .notifications import decrement_unread_count
+            decrement_unread_count(self.user_id)
+
+
+class NotificationArchive(models.Model):
+    """Notifications moved out of the live table by the retention sweep"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    original_id = models.BigIntegerField()
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    application_id = models.BigIntegerField(blank=True, null=True)
+    training_opportunity_id = models.BigIntegerField(blank=True, null=True)
+    was_read = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.title} - {self.user_id} (archived)"
+    
+    @classmethod
+    def from_notification(cls, notification):
+        return cls(
+            user_id=notification.user_id,
+            original_id=notification.id,
+            notification_type=notification.notification_type,
+            title=notification.title,
+            message=notification.message,
+            application_id=notification.application_id,
+            training_opportunity_id=notification.training_opportunity_id,
+            was_read=notification.is_read,
+            created_at=notification.created_at,
+            read_at=notification.read_at,
+        )
+
+
+class NotificationCounter(models.Model):
+    """Denormalized per-user unread notification counter"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.unread_count} unread"
 
 
 # ============================================================================
@@ -434,6 +673,11 @@ class SystemConfig(models.Model):
         ('application_deadline', 'Application Deadline'),
         ('max_applications_per_student', 'Max Applications Per Student'),
         ('notification_enabled', 'Enable Notifications'),
+        ('notification_retention_days', 'Days to Keep Read Notifications'),
+        ('notification_archive_enabled', 'Archive Notifications Before Deleting'),
+        ('notification_compaction_threshold', 'Unread Notifications Before Collapsing Into a Summary'),
+        ('deadline_reminder_hours', 'Hours Before Deadline to Send Reminders'),
+        ('profiler_sample_rates', 'Percent of Requests to Profile per Route (route=percent, ...)'),
     )
     
     key = models.CharField(max_length=100, unique=True, choices=CONFIG_KEYS)
@@ -447,6 +691,93 @@ class SystemConfig(models.Model):
     
     def __str__(self):
         return self.key
+    
+    @classmethod
+    def get_value(cls, key, default=None, cast=str):
+        """Return an active config value converted with cast, or default"""
+        value = cls.objects.filter(key=key, is_active=True).values_list('value', flat=True).first()
+        if value is None:
+            return default
+        if cast is bool:
+            return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+
+
+# ============================================================================
+# BACKGROUND TASKS
+# ============================================================================
+
+class TaskRun(models.Model):
+    """Timing and row counts of one background maintenance task run"""
+    task_name = models.CharField(max_length=100, db_index=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_ms = models.PositiveIntegerField(default=0)
+    stats = models.JSONField(default=dict, blank=True)
+    succeeded = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.task_name} @ {self.started_at:%Y-%m-%d %H:%M} ({'ok' if self.succeeded else 'failed'})"
+
+
+class TaskLease(models.Model):
+    """Per-task DB lease so only one node runs a background task at a time"""
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    last_success_at = models.DateTimeField(blank=True, null=True)
+    last_duration_ms = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+# ============================================================================
+# MEDIA
+# ============================================================================
+
+class Thumbnail(models.Model):
+    """A resized variant of an uploaded image (tracker.thumbnails)"""
+    source = models.CharField(max_length=255, db_index=True)  # Storage name of the original
+    size = models.CharField(max_length=20)  # Key of THUMBNAIL_SIZES
+    name = models.CharField(max_length=255)  # Storage name of the variant (content-hashed)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('source', 'size')
+    
+    def __str__(self):
+        return f"{self.source} [{self.size}]"
+
+
+class MediaBlob(models.Model):
+    """An uploaded file stored once under its content hash (tracker.storage)"""
+    name = models.CharField(max_length=255, unique=True)  # blobs/<sha256[:2]>/<sha256>.<ext>
+    file_size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)  # Rows whose image field holds this name
+    released_at = models.DateTimeField(null=True, blank=True)  # When refcount last dropped to zero
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['refcount', 'released_at'], name='mediablob_unreferenced_idx')]
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
 
 
 # ============================================================================
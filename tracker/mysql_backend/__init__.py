@@ -0,0 +1 @@
+# Django database backend: MySQL with an optional shared connection pool (see base.py)
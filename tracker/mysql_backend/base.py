@@ -0,0 +1,16 @@
+"""
+MySQL backend with the optional POOL setting (tracker.db_pool), for ASGI
+deployments where Django's per-thread persistent connections are not reused.
+"""
+from django.db.backends.mysql import base
+
+from tracker.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def _raw_connection_alive(self, connection):
+        try:
+            connection.ping()
+            return True
+        except Exception:
+            return False
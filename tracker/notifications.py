@@ -0,0 +1,126 @@
+"""
+Unread notification counters.
+Keeps the denormalized NotificationCounter rows in step with Notification writes
+and fronts them with the shared cache, so badge lookups cost a single cache read
+and every process sees an invalidation.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .cache import shared_cache as cache
+
+UNREAD_COUNT_CACHE_KEY = 'notifications:unread:{user_id}'
+UNREAD_COUNT_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+_state = threading.local()
+
+
+def _cache_key(user_id):
+    return UNREAD_COUNT_CACHE_KEY.format(user_id=user_id)
+
+
+def _invalidate(user_id):
+    """Drop the cached count once the surrounding transaction commits"""
+    key = _cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def counter_updates_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+@contextmanager
+def suspend_counter_updates():
+    """
+    Skip per-row counter maintenance from signals during bulk operations.
+    Callers reconcile the affected users' counters afterwards.
+    """
+    previous = counter_updates_suspended()
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def get_unread_count(user):
+    """Return the unread notification count for a user (or user id)"""
+    user_id = getattr(user, 'pk', user)
+    key = _cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        from .models import NotificationCounter
+        count = NotificationCounter.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        if count is None:
+            # First lookup for this user: build the counter from the table
+            return reconcile_unread_count(user_id)
+        cache.set(key, count, UNREAD_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def increment_unread_count(user_id, amount=1):
+    """Add newly created unread notifications to the counter"""
+    from .models import NotificationCounter
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=F('unread_count') + amount
+    )
+    if not updated:
+        reconcile_unread_count(user_id)
+        return
+    _invalidate(user_id)
+
+
+def increment_unread_counts(user_ids):
+    """Add one unread notification for each user after a bulk_create (which skips signals)"""
+    from .models import NotificationCounter
+    user_ids = list(user_ids)
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + 1)
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def decrement_unread_count(user_id, amount=1):
+    """Remove notifications that were read or deleted from the counter"""
+    from .models import NotificationCounter
+    NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=Greatest(F('unread_count') - amount, 0)
+    )
+    _invalidate(user_id)
+
+
+def reset_unread_count(user_id):
+    """Zero the counter after all of a user's notifications were marked read"""
+    from .models import NotificationCounter
+    NotificationCounter.objects.update_or_create(user_id=user_id, defaults={'unread_count': 0})
+    _invalidate(user_id)
+
+
+def reconcile_unread_count(user_id):
+    """Rebuild a user's counter from the Notification table (drift repair)"""
+    from .models import Notification, NotificationCounter
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    NotificationCounter.objects.update_or_create(user_id=user_id, defaults={'unread_count': count})
+    _invalidate(user_id)
+    return count
+
+
+def reconcile_all_unread_counts():
+    """Repair drift in every stored counter with one grouped count; returns users fixed"""
+    from .models import Notification, NotificationCounter
+    actual = dict(
+        Notification.objects.filter(is_read=False).values('user_id')
+        .annotate(total=Count('id')).order_by().values_list('user_id', 'total')
+    )
+    drifted = [
+        (user_id, actual.get(user_id, 0))
+        for user_id, stored in NotificationCounter.objects.values_list('user_id', 'unread_count')
+        if stored != actual.get(user_id, 0)
+    ]
+    for user_id, count in drifted:
+        NotificationCounter.objects.filter(user_id=user_id).update(unread_count=count)
+    cache.delete_many([_cache_key(user_id) for user_id, _ in drifted])
+    return len(drifted)
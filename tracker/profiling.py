@@ -0,0 +1,351 @@
+"""
+On-demand request profiler.
+A request is profiled when a staff user sends "X-Profile: 1" (or "cprofile"), or
+when its route is sampled by the 'profiler_sample_rates' SystemConfig entry
+("training-opportunity-matched-opportunities=5, application-detail=100", percent
+per URL name). A profiled request runs under a stack sampler (a thread reading
+the request thread's frames every PROFILER_INTERVAL_MS; or cProfile) plus
+tracemalloc, and leaves three files in PROFILER_SPOOL_DIR:
+
+    <id>.folded     collapsed stacks ("frame;frame;frame count"), for flame graphs
+    <id>.alloc.txt  top allocations made during the request
+    <id>.json       route, path, user, status, duration and summary
+
+At most one request per process is profiled at a time, and the spool keeps the
+newest PROFILER_SPOOL_MAX_PROFILES. See `manage.py profiles`.
+
+Under ASGI the profiler follows the event loop thread: async views and
+middleware show up in full, sync_to_async calls as the await that waits for
+them, and cProfile also sees any other request running on the loop meanwhile.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .logs import current_user_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+CONFIG_KEY = 'profiler_sample_rates'
+RATES_TTL = 10  # Seconds a process trusts its copy of the SystemConfig rates
+
+_busy = threading.Lock()
+_rates = (0.0, {})  # (expires_at, {route: percent})
+_site_dirs = sorted({p for p in sys.path if p.endswith('-packages')}, key=len, reverse=True)
+
+
+# ============================================================================
+# TRIGGERS
+# ============================================================================
+
+def parse_rates(value):
+    """'route=5, other-route=100' -> {'route': 5.0, 'other-route': 100.0}"""
+    rates = {}
+    for item in (value or '').replace('\n', ',').split(','):
+        route, _, percent = item.partition('=')
+        try:
+            rates[route.strip()] = float(percent)
+        except ValueError:
+            continue
+    return {route: percent for route, percent in rates.items() if route and percent > 0}
+
+
+def sample_rates():
+    global _rates
+    expires_at, rates = _rates
+    if time.monotonic() >= expires_at:
+        from .models import SystemConfig
+        rates = parse_rates(SystemConfig.get_value(CONFIG_KEY, ''))
+        _rates = (time.monotonic() + RATES_TTL, rates)
+    return rates
+
+
+def reset_sample_rates():
+    global _rates
+    _rates = (0.0, {})
+
+
+def _staff_user(request):
+    """The staff user behind the session (set by AuthenticationMiddleware) or the Authorization token, else None"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return user
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) == 2 and auth[0].lower() == 'token':
+        from rest_framework.exceptions import AuthenticationFailed
+        from .authentication import CachedTokenAuthentication
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(auth[1])
+        except AuthenticationFailed:
+            return None
+        return user if user.is_staff else None
+    return None
+
+
+def profile_mode(request):
+    """'sample' or 'cprofile' if this request should be profiled, else None"""
+    if not settings.PROFILER_ENABLED:
+        return None
+    header = request.META.get(PROFILE_HEADER, '').strip().lower()
+    if header and header not in ('0', 'false', 'no'):
+        if _staff_user(request) is None:
+            return None
+        return 'cprofile' if header == 'cprofile' else 'sample'
+
+    rates = sample_rates()
+    if not rates:
+        return None
+    try:
+        route = resolve(request.path_info).view_name
+    except Resolver404:
+        return None
+    percent = rates.get(route)
+    if percent and random.random() * 100 < percent:
+        return 'sample'
+    return None
+
+
+async def aprofile_mode(request):
+    """profile_mode() for the async path; hops to a thread only when it may query the database"""
+    if not settings.PROFILER_ENABLED:
+        return None
+    if request.META.get(PROFILE_HEADER) or time.monotonic() >= _rates[0]:
+        # The staff check (session or token) or a SystemConfig reload
+        return await sync_to_async(profile_mode)(request)
+    return profile_mode(request)
+
+
+# ============================================================================
+# PROFILERS
+# ============================================================================
+
+def short_path(filename):
+    for prefix in (str(settings.BASE_DIR),) + tuple(_site_dirs):
+        if filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+def frame_label(code):
+    return f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Samples one thread's call stack from a background thread"""
+
+    def __init__(self, thread_id, interval, max_depth=128):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+
+def cprofile_stacks(profiler):
+    """
+    cProfile has no full stacks; fold each caller -> callee edge into a two-frame
+    stack weighted by microseconds, which flame graph tools still render usefully.
+    """
+    import pstats
+    stats = pstats.Stats(profiler)
+    stacks = Counter()
+    for (filename, line, name), (_, _, tottime, _, callers) in stats.stats.items():
+        callee = f'{name} ({short_path(filename)}:{line})'
+        if not callers:
+            stacks[callee] += int(tottime * 1e6)
+        for (caller_file, caller_line, caller_name), caller_stats in callers.items():
+            stacks[f'{caller_name} ({short_path(caller_file)}:{caller_line});{callee}'] += int(caller_stats[2] * 1e6)
+    return Counter({stack: weight for stack, weight in stacks.items() if weight > 0})
+
+
+class RequestProfile:
+    """Profiles the current thread between start() and finish()"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.sampler = None
+        self.profiler = None
+        self.started_tracemalloc = False
+        self.before = None
+
+    def start(self):
+        # Imported on first use: only profiled requests pay for these
+        import cProfile
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PROFILER_TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        self.before = tracemalloc.take_snapshot()
+        if self.mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL_MS / 1000)
+            self.sampler.start()
+        self.started = time.perf_counter()
+
+    def finish(self):
+        """Stop profiling; returns (collapsed stacks, allocation report lines, peak traced bytes)"""
+        import tracemalloc
+        elapsed = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+        else:
+            stacks = self.sampler.stop()
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+        if self.profiler is not None:
+            stacks = cprofile_stacks(self.profiler)
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(self.before.filter_traces(filters), 'traceback')
+        allocations = []
+        for stat in diff[:settings.PROFILER_TOP_ALLOCATIONS]:
+            if stat.size_diff <= 0:
+                continue
+            allocations.append(f'{stat.size_diff / 1024:10.1f} KiB  {stat.count_diff:+7d} blocks')
+            allocations.extend(f'    {line}' for line in stat.traceback.format(most_recent_first=True)[:8])
+        return elapsed, stacks, allocations, peak
+
+
+# ============================================================================
+# SPOOL
+# ============================================================================
+
+def spool_dir():
+    return Path(settings.PROFILER_SPOOL_DIR)
+
+
+def write_profile(profile_id, meta, stacks, allocations):
+    directory = spool_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f'{profile_id}.folded').write_text(
+        ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+    )
+    (directory / f'{profile_id}.alloc.txt').write_text('\n'.join(allocations) + '\n')
+    # Written last: a profile is listed once its metadata exists
+    (directory / f'{profile_id}.json').write_text(json.dumps(meta, indent=2, default=str))
+    prune_spool()
+
+
+def list_profiles():
+    """Metadata of spooled profiles, newest first"""
+    directory = spool_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.glob('*.json'):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: meta['created'], reverse=True)
+
+
+def prune_spool():
+    """Keep the newest PROFILER_SPOOL_MAX_PROFILES profiles"""
+    directory = spool_dir()
+    profiles = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in profiles[settings.PROFILER_SPOOL_MAX_PROFILES:]:
+        profile_id = path.name[:-len('.json')]
+        for suffix in ('.json', '.folded', '.alloc.txt'):
+            (directory / f'{profile_id}{suffix}').unlink(missing_ok=True)
+
+
+def profile_request(request, get_response):
+    """Run get_response under the profiler if this request is selected; returns the response"""
+    mode = profile_mode(request)
+    if mode is None or not _busy.acquire(blocking=False):
+        return get_response(request)
+
+    try:
+        profile = RequestProfile(mode)
+        profile.start()
+        try:
+            response = get_response(request)
+        finally:
+            result = profile.finish()
+        return save_profile(request, response, mode, *result)
+    finally:
+        _busy.release()
+
+
+async def aprofile_request(request, get_response):
+    """profile_request() for the async path"""
+    mode = await aprofile_mode(request)
+    if mode is None or not _busy.acquire(blocking=False):
+        return await get_response(request)
+
+    try:
+        profile = RequestProfile(mode)
+        profile.start()
+        try:
+            response = await get_response(request)
+        finally:
+            result = profile.finish()
+        return await sync_to_async(save_profile, thread_sensitive=False)(request, response, mode, *result)
+    finally:
+        _busy.release()
+
+
+def save_profile(request, response, mode, elapsed, stacks, allocations, peak):
+    """Spool a finished profile; returns the response, with X-Profile-Id if the client asked for it"""
+    match = getattr(request, 'resolver_match', None)
+    profile_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:12]}'
+    meta = {
+        'id': profile_id,
+        'request_id': getattr(request, 'request_id', None),
+        'created': time.time(),
+        'mode': mode,
+        'route': match.view_name if match else None,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user_id': current_user_id(request),
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2),
+        'samples': sum(stacks.values()),
+        'peak_traced_kib': round(peak / 1024, 1),
+        'pid': os.getpid(),
+    }
+    try:
+        write_profile(profile_id, meta, stacks, allocations)
+    except OSError as e:
+        # The profiled request itself succeeded
+        logger.error(f"Could not spool profile {profile_id}: {str(e)}")
+        return response
+    if request.META.get(PROFILE_HEADER):
+        response['X-Profile-Id'] = profile_id
+    return response
@@ -0,0 +1,103 @@
+"""
+Incremental organization rating aggregation.
+Every verified Review insert, update or delete adjusts the organization's
+rating_total, review_count and star histogram with F() expressions, then
+recomputes the average from those columns, so organization lists never
+aggregate reviews at read time. recompute_ratings() rebuilds everything from
+the Review table in one grouped query for drift repair; each process runs it in
+place of its first incremental change, so aggregates of reviews written before
+the columns existed are backfilled before anything is added to them.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Round
+
+from .cache import response_cache
+from .models import Organization
+
+STARS = range(1, 6)
+
+_backfilled = False
+
+
+def review_contribution(review):
+    """(organization_id, rating) a review adds to the aggregate, or None if it doesn't count"""
+    if review is None or not review.is_verified or review.rating not in STARS:
+        return None
+    return review.organization_id, review.rating
+
+
+def _average_expression():
+    return Case(
+        When(review_count__gt=0, then=Round(Cast('rating_total', FloatField()) / F('review_count'), 1)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_change(organization_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from an organization's aggregate"""
+    with transaction.atomic():
+        Organization.objects.filter(pk=organization_id).update(**{
+            # Clamped: the columns are unsigned, and drift is left to recompute_ratings()
+            'review_count': Greatest(F('review_count') + sign, 0),
+            'rating_total': Greatest(F('rating_total') + sign * rating, 0),
+            f'rating_{rating}_count': Greatest(F(f'rating_{rating}_count') + sign, 0),
+        })
+        # Separate statement: MySQL evaluates SET assignments left to right
+        Organization.objects.filter(pk=organization_id).update(rating=_average_expression())
+
+
+def apply_review_change(old, new):
+    """Apply the difference between a review's previous and current contribution"""
+    global _backfilled
+    if old == new:
+        return
+    if not _backfilled:
+        # The review is already written, so the rebuild includes this change
+        _backfilled = True
+        recompute_ratings()
+        return
+    if old is not None:
+        apply_rating_change(*old, sign=-1)
+    if new is not None:
+        apply_rating_change(*new, sign=1)
+
+
+def _rounded_average(total, count):
+    if not count:
+        return Decimal('0')
+    return (Decimal(total) / Decimal(count)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+
+def recompute_ratings():
+    """Rebuild all organization rating aggregates from verified reviews; returns rows fixed"""
+    verified = Q(reviews__is_verified=True)
+    annotations = {
+        'actual_count': Count('reviews', filter=verified),
+        'actual_total': Coalesce(Sum('reviews__rating', filter=verified), 0),
+    }
+    for stars in STARS:
+        annotations[f'actual_{stars}'] = Count('reviews', filter=verified & Q(reviews__rating=stars))
+
+    changed = []
+    for org in Organization.objects.annotate(**annotations).only('id', *Organization.RATING_FIELDS):
+        values = {
+            'review_count': org.actual_count,
+            'rating_total': org.actual_total,
+            'rating': _rounded_average(org.actual_total, org.actual_count),
+        }
+        for stars in STARS:
+            values[f'rating_{stars}_count'] = getattr(org, f'actual_{stars}')
+        if any(getattr(org, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(org, field, value)
+            changed.append(org)
+
+    Organization.objects.bulk_update(changed, Organization.RATING_FIELDS, batch_size=500)
+    if changed:
+        # bulk_update skips signals
+        response_cache.invalidate_on_commit(['organization'] + [f'organization:{org.pk}' for org in changed])
+    return len(changed)
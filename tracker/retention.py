@@ -0,0 +1,120 @@
+"""
+Notification retention.
+Read notifications older than the retention window are archived (optional) and
+deleted in short, bounded batches so the live table is never locked for long.
+Users with a pile of unread notifications of one type get them collapsed into a
+single summary notification. The policy is read from SystemConfig.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive, SystemConfig
+from .notifications import reconcile_unread_count, suspend_counter_updates
+from .tasks import register_task
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_COMPACTION_THRESHOLD = 20
+DEFAULT_BATCH_SIZE = 500
+
+
+def get_retention_policy():
+    """Current retention policy from SystemConfig, with defaults"""
+    return {
+        'retention_days': SystemConfig.get_value('notification_retention_days', DEFAULT_RETENTION_DAYS, int),
+        'archive': SystemConfig.get_value('notification_archive_enabled', True, bool),
+        'compaction_threshold': SystemConfig.get_value(
+            'notification_compaction_threshold', DEFAULT_COMPACTION_THRESHOLD, int
+        ),
+    }
+
+
+def _archive_and_delete(ids, archive):
+    """Move one batch of notifications out of the live table"""
+    with transaction.atomic():
+        if archive:
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive.from_notification(n) for n in Notification.objects.filter(id__in=ids)]
+            )
+        Notification.objects.filter(id__in=ids).delete()
+
+
+def purge_read_notifications(retention_days, archive=True, batch_size=DEFAULT_BATCH_SIZE, pause=0.05, now=None):
+    """
+    Archive/delete read notifications older than retention_days, batch by batch.
+    Returns the number of notifications removed.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    # Oldest first, walking the partial (created_at WHERE is_read) index
+    stale = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('created_at')
+
+    removed = 0
+    while True:
+        ids = list(stale.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        _archive_and_delete(ids, archive)
+        removed += len(ids)
+        if len(ids) < batch_size:
+            break
+        if pause:
+            # Give concurrent writers a turn between batches
+            time.sleep(pause)
+    return removed
+
+
+def compact_unread_notifications(threshold, archive=True, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Collapse each user's unread notifications of one type into a single summary
+    once there are more than threshold of them. Returns (groups, notifications) collapsed.
+    """
+    groups = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id', 'notification_type')
+        .annotate(total=Count('id'))
+        .filter(total__gt=threshold)
+        .order_by()
+    )
+    type_labels = dict(Notification.NOTIFICATION_TYPES)
+
+    collapsed_groups = collapsed = 0
+    for group in list(groups):
+        user_id, notification_type = group['user_id'], group['notification_type']
+        # One transaction per group: the user never loses the notifications without the summary
+        with transaction.atomic(), suspend_counter_updates():
+            items = Notification.objects.filter(
+                user_id=user_id, notification_type=notification_type, is_read=False
+            ).order_by('-created_at')
+            ids = list(items.select_for_update().values_list('id', flat=True))
+            latest = list(items.values_list('title', flat=True)[:3])
+            for start in range(0, len(ids), batch_size):
+                _archive_and_delete(ids[start:start + batch_size], archive)
+            Notification.objects.create(
+                user_id=user_id,
+                notification_type=notification_type,
+                title=f'{len(ids)} new {type_labels.get(notification_type, notification_type).lower()} notifications',
+                message='Latest: ' + '; '.join(latest),
+            )
+        reconcile_unread_count(user_id)
+
+        collapsed_groups += 1
+        collapsed += len(ids)
+    return collapsed_groups, collapsed
+
+
+@register_task('notification_retention', interval=24 * 60 * 60, lease_seconds=2 * 60 * 60)
+def run_notification_retention(batch_size=DEFAULT_BATCH_SIZE, compact=True):
+    """Apply the configured retention policy; returns row counts"""
+    policy = get_retention_policy()
+    stats = {'purged': 0, 'compacted_groups': 0, 'compacted': 0}
+    stats['purged'] = purge_read_notifications(
+        policy['retention_days'], archive=policy['archive'], batch_size=batch_size
+    )
+    if compact and policy['compaction_threshold'] > 0:
+        stats['compacted_groups'], stats['compacted'] = compact_unread_notifications(
+            policy['compaction_threshold'], archive=policy['archive'], batch_size=batch_size
+        )
+    return stats
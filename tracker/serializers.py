@@ -3,22 +3,24 @@ from django.contrib.auth.models import User
 from .models import (
     Institution, Department, Course, Skill, Student, Organization,
     TrainingOpportunity, Application, ApplicationStatusHistory, Notification,
-    SystemConfig, Review
+    SystemConfig, Review, LetterBatch, CVDocument, SkillSuggestion
 )
+from .thumbnails import ThumbnailListSerializer, ThumbnailsField
+from .tracing import TracedSerializerMixin
 
 
 # ============================================================================
 # USER SERIALIZERS
 # ============================================================================
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
         read_only_fields = ('id',)
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined')
@@ -29,7 +31,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
 # INSTITUTION & DEPARTMENT SERIALIZERS
 # ============================================================================
 
-class InstitutionSerializer(serializers.ModelSerializer):
+class InstitutionSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     department_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -41,7 +43,7 @@ class InstitutionSerializer(serializers.ModelSerializer):
         return obj.departments.filter(is_active=True).count()
 
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     institution_name = serializers.CharField(source='institution.name', read_only=True)
     
     class Meta:
@@ -54,7 +56,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
 # COURSE & SKILL SERIALIZERS
 # ============================================================================
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     department_name = serializers.CharField(source='department.name', read_only=True)
     
     class Meta:
@@ -63,7 +65,7 @@ class CourseSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Skill
         fields = ('id', 'name', 'category', 'description', 'is_active')
@@ -74,27 +76,30 @@ class SkillSerializer(serializers.ModelSerializer):
 # STUDENT SERIALIZERS
 # ============================================================================
 
-class StudentListSerializer(serializers.ModelSerializer):
+class StudentListSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
     course_name = serializers.CharField(source='course.name', read_only=True)
     institution_name = serializers.CharField(source='institution.name', read_only=True)
     skill_count = serializers.SerializerMethodField()
+    profile_photo_thumbnails = ThumbnailsField(source='profile_photo')
     
     class Meta:
         model = Student
         fields = (
             'id', 'user', 'full_name', 'email', 'registration_number', 'institution',
             'institution_name', 'course', 'course_name', 'academic_level', 'phone',
-            'preferred_location', 'is_placed', 'placement_date', 'skill_count'
+            'preferred_location', 'is_placed', 'placement_date', 'skill_count',
+            'profile_photo_thumbnails'
         )
         read_only_fields = ('id', 'user', 'placement_date')
+        list_serializer_class = ThumbnailListSerializer
     
     def get_skill_count(self, obj):
         return obj.skills.count()
 
 
-class StudentDetailSerializer(serializers.ModelSerializer):
+class StudentDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
@@ -108,6 +113,7 @@ class StudentDetailSerializer(serializers.ModelSerializer):
         many=True,
         source='skills'
     )
+    profile_photo_thumbnails = ThumbnailsField(source='profile_photo')
     
     class Meta:
         model = Student
@@ -115,30 +121,53 @@ class StudentDetailSerializer(serializers.ModelSerializer):
             'id', 'user', 'username', 'full_name', 'email', 'registration_number',
             'institution', 'institution_name', 'department', 'department_name',
             'course', 'course_name', 'academic_level', 'phone', 'profile_photo',
-            'bio', 'preferred_location', 'skills', 'skill_ids', 'is_active',
+            'profile_photo_thumbnails', 'bio', 'preferred_location', 'skills', 'skill_ids', 'is_active',
             'is_placed', 'placement_date', 'registered_at', 'updated_at'
         )
         read_only_fields = ('id', 'user', 'registered_at', 'updated_at', 'placement_date')
 
 
+class SkillSuggestionSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    skill_name = serializers.CharField(source='skill.name', read_only=True)
+    
+    class Meta:
+        model = SkillSuggestion
+        fields = ('id', 'skill', 'skill_name', 'mentions', 'evidence', 'status')
+        read_only_fields = fields
+
+
+class CVDocumentSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    skill_suggestions = SkillSuggestionSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = CVDocument
+        fields = (
+            'id', 'student', 'original_name', 'file_size', 'status', 'page_count', 'ocr_pages',
+            'cached_pages', 'error', 'created_at', 'processed_at', 'skill_suggestions'
+        )
+        read_only_fields = fields
+
+
 # ============================================================================
 # ORGANIZATION SERIALIZERS
 # ============================================================================
 
-class OrganizationListSerializer(serializers.ModelSerializer):
+class OrganizationListSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     contact_person = serializers.CharField(source='user.get_full_name', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
     course_count = serializers.SerializerMethodField()
     opportunity_count = serializers.SerializerMethodField()
+    logo_thumbnails = ThumbnailsField(source='logo')
     
     class Meta:
         model = Organization
         fields = (
             'id', 'user', 'name', 'industry_type', 'location', 'phone', 'email',
             'contact_person', 'is_verified', 'is_active', 'rating', 'review_count',
-            'course_count', 'opportunity_count'
+            'course_count', 'opportunity_count', 'logo_thumbnails'
         )
         read_only_fields = ('id', 'user', 'rating', 'review_count')
+        list_serializer_class = ThumbnailListSerializer
     
     def get_course_count(self, obj):
         return obj.supported_courses.count()
@@ -147,7 +176,8 @@ class OrganizationListSerializer(serializers.ModelSerializer):
         return obj.training_opportunities.filter(is_active=True).count()
 
 
-class OrganizationDetailSerializer(serializers.ModelSerializer):
+class OrganizationDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     contact_person = serializers.CharField(source='user.get_full_name', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
@@ -165,15 +195,16 @@ class OrganizationDetailSerializer(serializers.ModelSerializer):
         many=True,
         source='required_skills'
     )
+    logo_thumbnails = ThumbnailsField(source='logo')
     
     class Meta:
         model = Organization
         fields = (
             'id', 'user', 'username', 'name', 'industry_type', 'location',
-            'description', 'phone', 'email', 'website', 'logo', 'contact_person',
+            'description', 'phone', 'email', 'website', 'logo', 'logo_thumbnails', 'contact_person',
             'supported_courses', 'course_ids', 'required_skills', 'skill_ids',
             'is_verified', 'verified_at', 'is_active', 'rating', 'review_count',
-            'created_at', 'updated_at'
+            'rating_histogram', 'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'user', 'rating', 'review_count', 'verified_at', 'created_at', 'updated_at')
 
@@ -182,7 +213,7 @@ class OrganizationDetailSerializer(serializers.ModelSerializer):
 # TRAINING OPPORTUNITY SERIALIZERS
 # ============================================================================
 
-class TrainingOpportunityListSerializer(serializers.ModelSerializer):
+class TrainingOpportunityListSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     slots_filled = serializers.SerializerMethodField()
     
@@ -199,7 +230,7 @@ class TrainingOpportunityListSerializer(serializers.ModelSerializer):
         return obj.slots_filled
 
 
-class TrainingOpportunityDetailSerializer(serializers.ModelSerializer):
+class TrainingOpportunityDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     organization_detail = OrganizationListSerializer(source='organization', read_only=True)
     supported_courses = CourseSerializer(many=True, read_only=True)
@@ -237,7 +268,7 @@ class TrainingOpportunityDetailSerializer(serializers.ModelSerializer):
 # APPLICATION SERIALIZERS
 # ============================================================================
 
-class ApplicationStatusHistorySerializer(serializers.ModelSerializer):
+class ApplicationStatusHistorySerializer(TracedSerializerMixin, serializers.ModelSerializer):
     changed_by_name = serializers.CharField(source='changed_by.get_full_name', read_only=True)
     
     class Meta:
@@ -246,7 +277,7 @@ class ApplicationStatusHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'changed_at')
 
 
-class ApplicationListSerializer(serializers.ModelSerializer):
+class ApplicationListSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.full_name', read_only=True)
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     opportunity_title = serializers.CharField(source='training_opportunity.title', read_only=True)
@@ -261,7 +292,7 @@ class ApplicationListSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'applied_at', 'responded_at')
 
 
-class ApplicationDetailSerializer(serializers.ModelSerializer):
+class ApplicationDetailSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     student_detail = StudentListSerializer(source='student', read_only=True)
     organization_detail = OrganizationListSerializer(source='organization', read_only=True)
     opportunity_detail = TrainingOpportunityListSerializer(source='training_opportunity', read_only=True)
@@ -279,11 +310,21 @@ class ApplicationDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'match_score', 'match_quality', 'match_details', 'applied_at', 'responded_at', 'created_at', 'updated_at')
 
 
+class LetterBatchSerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = LetterBatch
+        fields = (
+            'id', 'opportunity', 'status', 'total', 'rendered', 'reused', 'error', 'template_version',
+            'created_at', 'started_at', 'finished_at'
+        )
+        read_only_fields = fields
+
+
 # ============================================================================
 # NOTIFICATION SERIALIZERS
 # ============================================================================
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     
     class Meta:
@@ -299,7 +340,7 @@ class NotificationSerializer(serializers.ModelSerializer):
 # REVIEW SERIALIZERS
 # ============================================================================
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.full_name', read_only=True)
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     
@@ -316,7 +357,7 @@ class ReviewSerializer(serializers.ModelSerializer):
 # AUTHENTICATION SERIALIZERS
 # ============================================================================
 
-class StudentRegistrationSerializer(serializers.Serializer):
+class StudentRegistrationSerializer(TracedSerializerMixin, serializers.Serializer):
     """Serializer for student registration"""
     username = serializers.CharField(max_length=150, required=True)
     email = serializers.EmailField(required=True)
@@ -362,7 +403,7 @@ class StudentRegistrationSerializer(serializers.Serializer):
         return student
 
 
-class OrganizationRegistrationSerializer(serializers.Serializer):
+class OrganizationRegistrationSerializer(TracedSerializerMixin, serializers.Serializer):
     """Serializer for organization registration"""
     username = serializers.CharField(max_length=150, required=True)
     email = serializers.EmailField(required=True)
@@ -0,0 +1,267 @@
+"""
+Signal handlers for the tracker app.
+Loaded from TrackerConfig.ready().
+"""
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_user_tokens
+from .db_stats import install_query_counter
+from .letters import letter_storage
+from .cache import response_cache, tags_for_instance
+from .models import (
+    AcceptanceLetter, CVDocument, Course, Department, Institution, Notification, Organization, Review, Skill, Student,
+    SystemConfig, TrainingOpportunity,
+)
+from .notifications import (
+    increment_unread_count, decrement_unread_count, reconcile_unread_count, counter_updates_suspended
+)
+from .profiling import reset_sample_rates
+from .tracing import install_db_tracing
+from .ratings import apply_review_change, review_contribution
+from .slow_queries import install_slow_query_logger
+from .sqlite import configure_connection
+from .streaming import broadcaster
+from . import storage, thumbnails
+
+
+# ============================================================================
+# NOTIFICATIONS
+# ============================================================================
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the unread counter in step with new or edited notifications"""
+    if created:
+        if not instance.is_read and not counter_updates_suspended():
+            increment_unread_count(instance.user_id)
+        # Push to open notification streams once the row is visible to readers
+        transaction.on_commit(lambda: broadcaster.publish_notification(instance))
+    elif update_fields is None and not counter_updates_suspended():
+        # Full saves (e.g. from the admin) may flip is_read either way
+        reconcile_unread_count(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    """Drop deleted unread notifications from the counter"""
+    if not instance.is_read and not counter_updates_suspended():
+        decrement_unread_count(instance.user_id)
+
+
+# ============================================================================
+# ORGANIZATION RATINGS
+# ============================================================================
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, **kwargs):
+    """Remember what the stored review contributed before this save"""
+    previous = None
+    if instance.pk:
+        previous = Review.objects.filter(pk=instance.pk).only('organization_id', 'rating', 'is_verified').first()
+    instance._rating_contribution = review_contribution(previous)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    """Adjust the organization's rating aggregate by the review's change"""
+    apply_review_change(getattr(instance, '_rating_contribution', None), review_contribution(instance))
+    instance._rating_contribution = review_contribution(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Remove a deleted verified review from the aggregate"""
+    apply_review_change(review_contribution(instance), None)
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """Retire cached catalog/organization responses that show this row"""
+    tags = tags_for_instance(instance)
+    if tags:
+        response_cache.invalidate_on_commit(tags)
+
+
+for _model in (Institution, Department, Course, Skill, Organization, TrainingOpportunity, Review):
+    post_save.connect(invalidate_cached_responses, sender=_model, dispatch_uid=f'response_cache_save_{_model.__name__}')
+    post_delete.connect(invalidate_cached_responses, sender=_model, dispatch_uid=f'response_cache_delete_{_model.__name__}')
+
+
+@receiver(m2m_changed, sender=Organization.supported_courses.through)
+@receiver(m2m_changed, sender=Organization.required_skills.through)
+def organization_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Organizations embed their supported courses and required skills"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        response_cache.invalidate_on_commit(tags_for_instance(instance))
+    else:
+        response_cache.invalidate_on_commit(['organization'] + [f'organization:{pk}' for pk in pk_set or ()])
+
+
+@receiver(post_save, sender=User)
+def organization_user_saved(sender, instance, update_fields=None, **kwargs):
+    """Organizations show their user's name and email (logins only touch last_login)"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    organization_ids = list(Organization.objects.filter(user_id=instance.pk).values_list('id', flat=True))
+    if organization_ids:
+        response_cache.invalidate_on_commit(['organization'] + [f'organization:{pk}' for pk in organization_ids])
+
+
+# ============================================================================
+# THUMBNAILS
+# ============================================================================
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    """Render the variants of a new profile photo or logo once it is committed"""
+    field = thumbnails.IMAGE_FIELDS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    name = getattr(instance, field).name
+    if name and not thumbnails.variants(name):
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+for _model in thumbnails.IMAGE_FIELDS:
+    post_save.connect(image_saved, sender=_model, dispatch_uid=f'thumbnails_save_{_model.__name__}')
+
+
+# ============================================================================
+# MEDIA REFERENCE COUNTS
+# ============================================================================
+
+def _image_changes(sender, update_fields):
+    field = thumbnails.IMAGE_FIELDS[sender]
+    return None if update_fields is not None and field not in update_fields else field
+
+
+def image_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored image name so post_save can move the blob refcounts"""
+    field = _image_changes(sender, update_fields)
+    if field is None:
+        return
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._stored_image = previous or ''
+
+
+def image_refcounts_saved(sender, instance, update_fields=None, **kwargs):
+    """The row now references its new image instead of the old one (same transaction as the save)"""
+    field = _image_changes(sender, update_fields)
+    if field is None or not hasattr(instance, '_stored_image'):
+        return
+    name = getattr(instance, field).name or ''
+    if name != instance._stored_image:
+        storage.acquire(name)
+        storage.release(instance._stored_image)
+    instance._stored_image = name
+
+
+def image_refcounts_deleted(sender, instance, **kwargs):
+    storage.release(getattr(instance, thumbnails.IMAGE_FIELDS[sender]).name)
+
+
+for _model in thumbnails.IMAGE_FIELDS:
+    pre_save.connect(image_pre_save, sender=_model, dispatch_uid=f'media_refcount_pre_save_{_model.__name__}')
+    post_save.connect(image_refcounts_saved, sender=_model, dispatch_uid=f'media_refcount_save_{_model.__name__}')
+    post_delete.connect(image_refcounts_deleted, sender=_model, dispatch_uid=f'media_refcount_delete_{_model.__name__}')
+
+
+# ============================================================================
+# ACCEPTANCE LETTERS
+# ============================================================================
+
+@receiver(post_delete, sender=AcceptanceLetter)
+def acceptance_letter_deleted(sender, instance, **kwargs):
+    """Remove the PDF once the row is gone (pruning, or its application was deleted)"""
+    name = instance.name
+    transaction.on_commit(lambda: letter_storage().delete(name))
+
+
+# ============================================================================
+# CV INGESTION
+# ============================================================================
+
+@receiver(post_delete, sender=CVDocument)
+def cv_deleted(sender, instance, **kwargs):
+    """Remove the uploaded file with its row (the student or the CV was deleted)"""
+    file = instance.file
+    if file:
+        transaction.on_commit(lambda: file.storage.delete(file.name))
+
+
+# ============================================================================
+# AUTH TOKEN CACHE
+# ============================================================================
+
+@receiver(post_save, sender=User, dispatch_uid='auth_token_cache_user_saved')
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Deactivation, password and profile edits must reach cached token lookups"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_user_tokens([instance.pk])
+
+
+@receiver(post_delete, sender=Token, dispatch_uid='auth_token_cache_token_deleted')
+def token_deleted(sender, instance, **kwargs):
+    invalidate_user_tokens([instance.user_id])
+
+
+def profile_changed(sender, instance, **kwargs):
+    """Cached users carry their student/organization profile"""
+    invalidate_user_tokens([instance.user_id])
+
+
+for _model in (Student, Organization):
+    post_save.connect(profile_changed, sender=_model, dispatch_uid=f'auth_token_cache_save_{_model.__name__}')
+    post_delete.connect(profile_changed, sender=_model, dispatch_uid=f'auth_token_cache_delete_{_model.__name__}')
+
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+@receiver(post_save, sender=SystemConfig)
+@receiver(post_delete, sender=SystemConfig)
+def system_config_changed(sender, instance, **kwargs):
+    """Pick up new profiler sample rates now in this process (others within seconds)"""
+    if instance.key == 'profiler_sample_rates':
+        reset_sample_rates()
+
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS (WAL, busy timeout, cache) to new SQLite connections"""
+    configure_connection(connection)
+
+
+@receiver(connection_created)
+def count_queries_per_alias(sender, connection, **kwargs):
+    """Per-alias and per-request query counts (tracker.db_stats)"""
+    install_query_counter(connection)
+
+
+@receiver(connection_created)
+def log_slow_queries(sender, connection, **kwargs):
+    """Slow-query and N+1 reports (tracker.slow_queries)"""
+    install_slow_query_logger(connection)
+
+
+@receiver(connection_created)
+def trace_queries(sender, connection, **kwargs):
+    """A span per query in traced requests (tracker.tracing)"""
+    install_db_tracing(connection)
@@ -0,0 +1,210 @@
+"""
+Slow-query and N+1 log.
+An execute wrapper on every connection reports statements slower than
+SLOW_QUERY_MS, and statements a single request runs N_PLUS_ONE_THRESHOLD times
+with different parameters (an N+1 loop; reported with the loop's total time). Each report carries the normalized SQL,
+its duration, the innermost calling frame inside tracker/ (serializer method,
+view action, matcher function) and the request route. Reports are logged to
+'tracker.slow_queries' and aggregated by SQL fingerprint in a small SQLite file
+(SLOW_QUERY_DB) shared by all processes; see `manage.py slow_queries`.
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .db_stats import current_request_stats
+from .logs import current_request
+
+logger = logging.getLogger('tracker.slow_queries')
+
+TRACKER_DIR = str(Path(__file__).resolve().parent)
+# Frames in these modules are plumbing, not the code that asked for the rows
+_SKIPPED_FILES = tuple(
+    str(Path(TRACKER_DIR) / name)
+    for name in (
+        'slow_queries.py', 'db_stats.py', 'db_router.py', 'db_pool.py', 'sqlite_backend', 'mysql_backend',
+        'middleware.py', 'cache.py', 'logs.py', 'metrics.py', 'profiling.py', 'tracing.py',
+    )
+)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*(?:%s|\?|\d+)(?:\s*,\s*(?:%s|\?|\d+))*\s*\)', re.IGNORECASE)
+_PLACEHOLDERS = re.compile(r'%s|\?')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """SQL with literals and placeholders replaced by ?, IN lists collapsed and spaces squeezed"""
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:16]
+
+
+def calling_frame():
+    """'tracker/serializers.py:41 in get_department_count' for the innermost tracker frame"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(TRACKER_DIR) and not filename.startswith(_SKIPPED_FILES):
+            relative = Path(filename).relative_to(Path(TRACKER_DIR).parent)
+            return f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def current_route():
+    request = current_request()
+    if request is None:
+        return None
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else request.path
+
+
+# ============================================================================
+# AGGREGATE STORE
+# ============================================================================
+
+class SlowQueryStore:
+    """Reports aggregated by (fingerprint, kind, caller, route); one UPSERT per report"""
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS slow_query ('
+        'fingerprint TEXT NOT NULL, kind TEXT NOT NULL, caller TEXT NOT NULL, route TEXT NOT NULL, '
+        'sql TEXT NOT NULL, count INTEGER NOT NULL, total_ms REAL NOT NULL, max_ms REAL NOT NULL, '
+        'first_seen REAL NOT NULL, last_seen REAL NOT NULL, '
+        'PRIMARY KEY (fingerprint, kind, caller, route))'
+    )
+    RECORD_SQL = (
+        'INSERT INTO slow_query VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?) '
+        'ON CONFLICT (fingerprint, kind, caller, route) DO UPDATE SET '
+        'count = count + 1, total_ms = total_ms + excluded.total_ms, '
+        'max_ms = max(max_ms, excluded.max_ms), last_seen = excluded.last_seen'
+    )
+
+    ORDERINGS = {'total_ms': 'sum(total_ms)', 'count': 'sum(count)', 'max_ms': 'max(max_ms)'}
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def record(self, fingerprint, kind, caller, route, sql, duration_ms):
+        now = time.time()
+        self._connection().execute(
+            self.RECORD_SQL, (fingerprint, kind, caller or '-', route or '-', sql, duration_ms, duration_ms, now, now)
+        )
+
+    def report(self, kind=None, since=None, order_by='total_ms', limit=20):
+        """Totals per fingerprint and kind, with each calling site (caller @ route xcount)"""
+        where, params = [], []
+        if kind:
+            where.append('kind = ?')
+            params.append(kind)
+        if since:
+            where.append('last_seen >= ?')
+            params.append(since)
+        where_sql = f'WHERE {" AND ".join(where)}' if where else ''
+        rows = self._connection().execute(
+            f'SELECT fingerprint, kind, sql, sum(count), sum(total_ms), max(max_ms), max(last_seen), '
+            f'group_concat(caller || \' @ \' || route || \' x\' || count, char(10)) '
+            f'FROM slow_query {where_sql} GROUP BY fingerprint, kind '
+            f'ORDER BY {self.ORDERINGS[order_by]} DESC '
+            f'LIMIT ?', params + [limit]
+        ).fetchall()
+        keys = ('fingerprint', 'kind', 'sql', 'count', 'total_ms', 'max_ms', 'last_seen', 'sites')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def clear(self):
+        return self._connection().execute('DELETE FROM slow_query').rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SlowQueryStore(settings.SLOW_QUERY_DB)
+    return _store
+
+
+# ============================================================================
+# EXECUTE WRAPPER
+# ============================================================================
+
+def report(kind, sql, duration_ms, caller, route):
+    normalized = normalize(sql)
+    key = fingerprint(normalized)
+    logger.warning(
+        f"{kind} query {duration_ms:.1f} ms [{key}] at {caller or '-'} route={route or '-'}: {normalized[:500]}"
+    )
+    try:
+        get_store().record(key, kind, caller, route, normalized, duration_ms)
+    except sqlite3.Error as e:
+        logger.error(f"Could not record {kind} query {key}: {e}")
+
+
+def _params_key(params):
+    try:
+        return hash(tuple(params.items()) if isinstance(params, dict) else tuple(params or ()))
+    except TypeError:
+        # Unhashable parameter values (lists for array columns)
+        return repr(params)
+
+
+def install_slow_query_logger(connection):
+    """Report slow statements and per-request N+1 repeats on this connection"""
+    if not settings.SLOW_QUERY_LOG or getattr(connection, '_slow_query_logger_installed', False):
+        return
+
+    def log_slow_queries(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= settings.SLOW_QUERY_MS:
+                report('slow', sql, duration_ms, calling_frame(), current_route())
+
+            stats = current_request_stats()
+            if stats is not None and not many:
+                # The same statement text with new parameters is the N+1 signature;
+                # repeating identical parameters is a different problem
+                if stats.statements is None:
+                    stats.statements = {}
+                distinct, seen_ms = stats.statements.get(sql) or (set(), 0.0)
+                seen_ms += duration_ms
+                if len(distinct) < settings.N_PLUS_ONE_THRESHOLD:
+                    distinct.add(_params_key(params))
+                    if len(distinct) == settings.N_PLUS_ONE_THRESHOLD:
+                        # Duration of the whole loop so far
+                        report('n+1', sql, seen_ms, calling_frame(), current_route())
+                stats.statements[sql] = (distinct, seen_ms)
+
+    connection.execute_wrappers.append(log_slow_queries)
+    connection._slow_query_logger_installed = True
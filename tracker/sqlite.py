@@ -0,0 +1,96 @@
+"""
+SQLite production profile.
+configure_connection() applies SQLITE_PRAGMAS to every new connection (WAL so
+readers never block the writer, synchronous=NORMAL, a busy timeout instead of
+instant "database is locked", bigger page cache, mmap, in-memory temp tables).
+optimize_database() refreshes planner statistics and checkpoints the WAL, and
+backup_database() copies a live database with the online backup API in small
+page steps so writers only ever wait for one step.
+"""
+import sqlite3
+import time
+
+from django.conf import settings
+
+
+def configure_connection(connection):
+    """Apply SQLITE_PRAGMAS to a freshly opened SQLite connection"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection, names=('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size',
+                                       'cache_size', 'temp_store')):
+    with connection.cursor() as cursor:
+        values = {}
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+def optimize_database(connection, analysis_limit=1000):
+    """
+    Refresh query planner statistics (full ANALYZE the first time, PRAGMA optimize
+    afterwards) and truncate the WAL. Returns a stats dict.
+    """
+    stats = {}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        analyzed = cursor.fetchone()[0]
+        started = time.perf_counter()
+        if analyzed:
+            cursor.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+            cursor.execute('PRAGMA optimize')
+        else:
+            cursor.execute('ANALYZE')
+        stats['analyze'] = 'optimize' if analyzed else 'full'
+        stats['analyze_ms'] = int((time.perf_counter() - started) * 1000)
+
+        cursor.execute('PRAGMA journal_mode')
+        if cursor.fetchone()[0].lower() == 'wal':
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy, wal_pages, checkpointed = cursor.fetchone()
+            stats.update(checkpoint_busy=bool(busy), wal_pages=wal_pages, checkpointed_pages=checkpointed)
+    return stats
+
+
+def backup_database(source_path, target_path, pages=256, sleep=0.01, progress=None):
+    """
+    Copy source_path to target_path with the SQLite online backup API, pages at a
+    time, sleeping between steps. Returns (total pages, restarts). A write to the
+    source from another connection makes SQLite restart the copy; that is counted.
+    """
+    source = sqlite3.connect(str(source_path))
+    target = sqlite3.connect(str(target_path))
+    state = {'total': 0, 'remaining': None, 'restarts': 0}
+
+    def on_step(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+        state['remaining'], state['total'] = remaining, total
+        if progress:
+            progress(remaining, total)
+        if remaining and sleep:
+            # The source lock is only held during a step; let writers in between steps
+            time.sleep(sleep)
+
+    try:
+        source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+    return state['total'], state['restarts']
+
+
+def quick_check(path):
+    """PRAGMA quick_check on a database file; returns 'ok' or the first problem"""
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1 @@
+# Django database backend: SQLite with IMMEDIATE transactions (see base.py)
@@ -0,0 +1,20 @@
+"""
+SQLite backend that starts transactions with BEGIN IMMEDIATE.
+
+Django 4.2 opens atomic blocks with a deferred BEGIN, so a transaction that
+reads before it writes has to upgrade its lock mid-way; when another writer got
+there first SQLite returns "database is locked" at once instead of waiting for
+busy_timeout (in WAL mode whenever the read snapshot is stale). Taking the write
+lock up front lets concurrent writers queue on busy_timeout instead. This is
+Django 5.1's OPTIONS["transaction_mode"] = "IMMEDIATE".
+
+Also supports the optional POOL setting (tracker.db_pool).
+"""
+from django.db.backends.sqlite3 import base
+
+from tracker.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,204 @@
+"""
+Content-addressed storage for uploaded images (Student.profile_photo,
+Organization.logo). An upload is streamed chunk by chunk into a temporary file
+next to its destination while it is hashed, then renamed to
+blobs/<sha256[:2]>/<sha256>.<ext>; if that blob already exists the temporary
+file is dropped, so identical photos and logos are stored once however many
+rows use them and whatever upload_to they came through.
+
+Each blob has a MediaBlob row counting the rows that reference it; the
+signals in tracker.signals move the counts when an image is set, replaced or
+its row deleted, and the collect_unreferenced_media task deletes blobs that
+stayed unreferenced for MEDIA_BLOB_GRACE_SECONDS.
+
+Blob names change with their content, so tracker.views.media serves them with
+an immutable Cache-Control, and hands the bytes to the web server
+(MEDIA_SENDFILE) instead of streaming them from a Django worker. For nginx:
+
+    location /protected-media/ {
+        internal;
+        alias /srv/sitms/media/;   # MEDIA_ROOT
+    }
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage, storages
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+UPLOADS_ALIAS = 'uploads'
+CVS_ALIAS = 'cvs'
+CHUNK_SIZE = 64 * 1024
+
+BLOB_NAME = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})(\.\w+)?$')
+
+
+def get_upload_storage():
+    """Storage of the upload fields (a callable, so tests and settings can swap STORAGES['uploads'])"""
+    return storages[UPLOADS_ALIAS]
+
+
+def get_cv_storage():
+    """Storage of uploaded CVs (tracker.cv_ingestion); private, outside MEDIA_ROOT"""
+    return storages[CVS_ALIAS]
+
+
+def _media_blob_model():
+    # Imported lazily: models.py builds its upload fields from this module
+    return apps.get_model('tracker', 'MediaBlob')
+
+
+def blob_digest(name):
+    """The sha256 in a blob name, or None for legacy (upload_to) names"""
+    match = BLOB_NAME.match(name or '')
+    return match.group('digest') if match else None
+
+
+def blob_name(digest, extension):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names new files by their sha256 and stores each content once"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed (see _save)
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=extension)
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            name = blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+
+            with transaction.atomic():
+                # Taking the row first serializes with collect_unreferenced(), which deletes
+                # the row before the file in one transaction
+                self._register(name, size)
+                if os.path.exists(path):
+                    os.remove(temp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def _register(self, name, size):
+        """Create or touch the blob's row; the grace period starts over until a row references it"""
+        MediaBlob = _media_blob_model()
+        now = timezone.now()
+        blob, created = MediaBlob.objects.get_or_create(
+            name=name, defaults={'file_size': size, 'released_at': now}
+        )
+        if not created:
+            MediaBlob.objects.filter(pk=blob.pk, refcount__lte=0).update(released_at=now)
+
+
+# ============================================================================
+# REFERENCE COUNTS
+# ============================================================================
+
+def acquire(name):
+    """One more row references blob name (no-op for legacy names)"""
+    if blob_digest(name):
+        _media_blob_model().objects.filter(name=name).update(refcount=F('refcount') + 1, released_at=None)
+
+
+def release(name):
+    """One row fewer references blob name; its grace period starts when the count reaches zero"""
+    if blob_digest(name):
+        _media_blob_model().objects.filter(name=name).update(
+            refcount=F('refcount') - 1,
+            released_at=Case(When(refcount__lte=1, then=Value(timezone.now())), default=F('released_at')),
+        )
+
+
+def collect_unreferenced(limit=500):
+    """Delete blobs (and their thumbnails) unreferenced for MEDIA_BLOB_GRACE_SECONDS; returns (blobs, bytes)"""
+    MediaBlob = _media_blob_model()
+    Thumbnail = apps.get_model('tracker', 'Thumbnail')
+    storage = get_upload_storage()
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_BLOB_GRACE_SECONDS)
+    stale = MediaBlob.objects.filter(refcount__lte=0, released_at__lt=cutoff)
+
+    deleted = freed = 0
+    for blob in stale.order_by('released_at')[:limit]:
+        if _referenced(blob.name):
+            # A bulk update() bypassed the signals; recount() repairs the count
+            logger.warning(f"Blob {blob.name} has refcount {blob.refcount} but is still referenced")
+            continue
+        with transaction.atomic():
+            # Re-checked in the delete: an upload of the same content may have touched it meanwhile
+            removed, _ = stale.filter(pk=blob.pk).delete()
+            if not removed:
+                continue
+            storage.delete(blob.name)
+            variants = list(Thumbnail.objects.filter(source=blob.name).values_list('name', flat=True))
+            Thumbnail.objects.filter(source=blob.name).delete()
+        for variant in variants:
+            # Variant names derive from the content hash: a legacy copy of the same image may share them
+            if not Thumbnail.objects.filter(name=variant).exists():
+                default_storage.delete(variant)
+        deleted += 1
+        freed += blob.file_size
+    return deleted, freed
+
+
+def _referenced(name):
+    from .thumbnails import IMAGE_FIELDS
+
+    return any(model.objects.filter(**{field: name}).exists() for model, field in IMAGE_FIELDS.items())
+
+
+def recount():
+    """Recompute every blob's refcount from the image fields; returns the number of rows fixed"""
+    from .thumbnails import IMAGE_FIELDS
+
+    MediaBlob = _media_blob_model()
+    counts = {}
+    for model, field in IMAGE_FIELDS.items():
+        for name in model.objects.filter(**{f'{field}__startswith': f'{BLOB_DIR}/'}).values_list(field, flat=True):
+            counts[name] = counts.get(name, 0) + 1
+
+    fixed = 0
+    now = timezone.now()
+    for blob in MediaBlob.objects.only('name', 'refcount', 'released_at').iterator():
+        expected = counts.get(blob.name, 0)
+        if blob.refcount != expected:
+            released_at = None if expected else (blob.released_at or now)
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=expected, released_at=released_at)
+            fixed += 1
+    return fixed
@@ -0,0 +1,181 @@
+"""
+In-process notification broadcaster for the server-sent events stream.
+Each open stream subscribes an asyncio.Queue for its user. New notifications are
+pushed to those queues either directly from the post_save signal ('broadcast'
+mode, single process) or by one shared DB poller per process ('poll' mode, for
+multi-process deployments where the writer may live in another worker).
+
+Ids are not committed in order (a transaction that took a lower id can commit
+after a higher one was delivered), so the poller and the Last-Event-ID backlog
+look back NOTIFICATION_STREAM_LOOKBACK seconds by created_at and deduplicate by
+id. Delivery is at-least-once across reconnects: clients key notifications by id.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+POLL_LIMIT = 500  # Notifications per poll
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _lookback():
+    return timedelta(seconds=_setting('NOTIFICATION_STREAM_LOOKBACK', 10))
+
+
+def serialize_notification(notification):
+    """Build the event payload sent to stream clients"""
+    from .serializers import NotificationSerializer
+    return NotificationSerializer(notification).data
+
+
+class StreamQueue(asyncio.Queue):
+    """Per-connection queue; flagged when the consumer falls behind"""
+    overflowed = False
+
+
+class NotificationBroadcaster:
+    """Fan out new notifications to the streams open in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # user_id -> {(loop, queue)}
+        self._poller = None
+        self._cursor = None  # Start of the last poll; the next one reads from cursor - lookback
+        self._seen = {}  # id -> created_at of notifications polled inside the lookback window
+
+    @property
+    def mode(self):
+        return _setting('NOTIFICATION_STREAM_BACKEND', 'broadcast')
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id):
+        """Register a queue for a user; must be called from the event loop"""
+        loop = asyncio.get_running_loop()
+        queue = StreamQueue(maxsize=_setting('NOTIFICATION_STREAM_QUEUE_SIZE', 100))
+        with self._lock:
+            self._subscribers[user_id].add((loop, queue))
+        if self.mode == 'poll':
+            self._ensure_poller(loop)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if not subs:
+                return
+            subs.difference_update({s for s in subs if s[1] is queue})
+            if not subs:
+                del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id, event_id, payload):
+        """Deliver an event to every stream of a user; safe from any thread"""
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, (event_id, payload))
+            except RuntimeError:
+                # Loop already closed; the stream is going away
+                pass
+
+    def publish_notification(self, notification):
+        """Signal entry point: publish a freshly committed notification"""
+        if self.mode != 'broadcast' or not self.has_subscribers(notification.user_id):
+            return
+        self.publish(notification.user_id, notification.id, serialize_notification(notification))
+
+    def publish_notifications(self, notifications):
+        """publish_notification() for bulk_create()d rows, which send no post_save; call after commit"""
+        for notification in notifications:
+            # Backends that return no ids from bulk_create (MySQL) need the 'poll' mode
+            if notification.pk is not None:
+                self.publish_notification(notification)
+
+    @staticmethod
+    def _offer(queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Slow consumer: the stream closes and the client resumes from Last-Event-ID
+            queue.overflowed = True
+
+    # ------------------------------------------------------------------
+    # DB polling fallback
+    # ------------------------------------------------------------------
+
+    def _ensure_poller(self, loop):
+        if self._poller is None or self._poller.done():
+            self._poller = loop.create_task(self._poll_forever())
+
+    async def _poll_forever(self):
+        interval = _setting('NOTIFICATION_STREAM_POLL_INTERVAL', 2)
+        if self._cursor is None:
+            self._cursor = timezone.now()
+        while True:
+            await asyncio.sleep(interval)
+            with self._lock:
+                user_ids = list(self._subscribers)
+            if not user_ids:
+                continue
+            started = timezone.now()
+            lookback = _lookback()
+            try:
+                events = await sync_to_async(self._fetch_since)(user_ids, self._cursor - lookback, list(self._seen))
+            except Exception as e:
+                logger.error(f"Notification stream poll failed: {str(e)}")
+                continue
+            for user_id, event_id, created_at, payload in events:
+                self._seen[event_id] = created_at
+                self.publish(user_id, event_id, payload)
+            # A full page moves the window only up to what was read
+            self._cursor = started if len(events) < POLL_LIMIT else min(started, events[-1][2] + lookback)
+            horizon = self._cursor - lookback
+            self._seen = {event_id: created_at for event_id, created_at in self._seen.items() if created_at >= horizon}
+
+    @staticmethod
+    def _fetch_since(user_ids, since, seen_ids):
+        """One query per poll for all users with open streams in this process"""
+        from .models import Notification
+        rows = Notification.objects.filter(
+            user_id__in=user_ids, created_at__gte=since
+        ).exclude(id__in=seen_ids).select_related('user').order_by('created_at', 'id')[:POLL_LIMIT]
+        return [(n.user_id, n.id, n.created_at, serialize_notification(n)) for n in rows]
+
+
+def fetch_backlog(user_id, last_event_id, limit=100):
+    """
+    Notifications a reconnecting client missed, oldest first: everything created
+    from NOTIFICATION_STREAM_LOOKBACK before its last event on, which may repeat
+    a few it already has.
+    """
+    from .models import Notification
+    rows = Notification.objects.filter(user_id=user_id)
+    last_created = rows.filter(id=last_event_id).values_list('created_at', flat=True).first()
+    if last_created is None:
+        # Deleted since (retention): the id is all there is to go on
+        rows = rows.filter(id__gt=last_event_id)
+    else:
+        rows = rows.filter(created_at__gte=last_created - _lookback()).exclude(id=last_event_id)
+    rows = rows.select_related('user').order_by('created_at', 'id')[:limit]
+    return [(n.id, serialize_notification(n)) for n in rows]
+
+
+broadcaster = NotificationBroadcaster()
@@ -0,0 +1,152 @@
+"""
+Background maintenance tasks.
+Tasks register themselves with @register_task and are run by the scheduler
+worker (manage.py run_scheduler), never in the request path. Before running, a
+node claims the task's TaskLease row with one conditional UPDATE, so across
+all nodes only one runs a given task per interval. Every run records its
+duration, row counts and outcome as a TaskRun, and the lease row keeps the
+last success.
+"""
+import importlib
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TaskLease, TaskRun
+
+logger = logging.getLogger(__name__)
+
+LEASE_OWNER = f'{socket.gethostname()}:{os.getpid()}'
+
+
+class MaintenanceTask:
+    """A registered periodic task; func returns a dict of row counts"""
+
+    def __init__(self, name, func, interval, lease_seconds=None):
+        self.name = name
+        self.func = func
+        self.interval = interval  # Seconds between runs
+        self.lease_seconds = lease_seconds or max(interval, 60)
+
+    def __repr__(self):
+        return f'<MaintenanceTask {self.name} every {self.interval}s>'
+
+
+registry = {}
+
+
+def register_task(name, interval, lease_seconds=None):
+    """Decorator adding a function to the maintenance task registry"""
+    def decorator(func):
+        registry[name] = MaintenanceTask(name, func, interval, lease_seconds)
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import the modules listed in MAINTENANCE_TASK_MODULES so their tasks register"""
+    for module in getattr(settings, 'MAINTENANCE_TASK_MODULES', []):
+        importlib.import_module(module)
+    return registry
+
+
+@contextmanager
+def record_task_run(task_name, run=None):
+    """
+    Time a task and persist a TaskRun; the yielded dict collects row counts.
+
+        with record_task_run('lifecycle_sweep') as stats:
+            stats['closed'] = close_expired_opportunities()
+    """
+    run = run or TaskRun(task_name=task_name, started_at=timezone.now())
+    started = time.perf_counter()
+    stats = {}
+    try:
+        yield stats
+        run.succeeded = True
+    except Exception as e:
+        run.error = str(e)
+        logger.error(f"Task {task_name} failed: {str(e)}")
+        raise
+    finally:
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        run.finished_at = timezone.now()
+        run.stats = stats
+        run.save()
+        logger.info(f"Task {task_name} finished in {run.duration_ms} ms: {stats}")
+
+
+# ============================================================================
+# LEASES
+# ============================================================================
+
+def acquire_lease(task, force=False):
+    """
+    Claim a task for this node. Succeeds only if nobody else holds an unexpired
+    lease and (unless force) the task is due according to its interval.
+    """
+    now = timezone.now()
+    TaskLease.objects.get_or_create(name=task.name)
+
+    free = Q(expires_at__isnull=True) | Q(expires_at__lte=now) | Q(owner=LEASE_OWNER)
+    claim = TaskLease.objects.filter(free, name=task.name)
+    if not force:
+        # 10% slack so a scheduler tick that fires slightly early does not skip a whole interval
+        due_before = now - timedelta(seconds=task.interval * 0.9)
+        claim = claim.filter(Q(last_run_at__isnull=True) | Q(last_run_at__lte=due_before))
+    return bool(claim.update(
+        owner=LEASE_OWNER,
+        expires_at=now + timedelta(seconds=task.lease_seconds),
+        last_run_at=now,
+    ))
+
+
+def release_lease(task, run):
+    """Release the lease and remember how the run went"""
+    fields = {
+        'expires_at': timezone.now(),
+        'last_duration_ms': run.duration_ms,
+        'last_error': run.error,
+    }
+    if run.succeeded:
+        fields['last_success_at'] = run.finished_at
+    TaskLease.objects.filter(name=task.name, owner=LEASE_OWNER).update(**fields)
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_task(name, force=False):
+    """
+    Run a registered task if this node wins its lease.
+    Returns the stats dict, or None if another node holds the lease / it is not due.
+    """
+    task = registry[name]
+    if not acquire_lease(task, force=force):
+        logger.debug(f"Task {name} skipped: not due or leased by another node")
+        return None
+
+    run = TaskRun(task_name=name, started_at=timezone.now())
+    try:
+        with record_task_run(name, run=run) as stats:
+            stats.update(task.func() or {})
+    except Exception:
+        # Already logged and recorded on the TaskRun
+        pass
+    finally:
+        release_lease(task, run)
+    return run.stats if run.succeeded else None
+
+
+def task_status():
+    """Last run/success per registered task, for the maintenance_tasks command"""
+    leases = {lease.name: lease for lease in TaskLease.objects.filter(name__in=list(registry))}
+    return [(task, leases.get(task.name)) for task in registry.values()]
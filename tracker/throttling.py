@@ -0,0 +1,271 @@
+"""
+Fixed-window request throttles backed by a store shared by every worker process.
+DRF's SimpleRateThrottle keeps a timestamp list per client in the default
+(per-process) cache and rewrites it on every request, so each process enforces
+its own limit. These throttles count hits per (key, window) with a single atomic
+increment in THROTTLE_STORE:
+
+    'sqlite'  one UPSERT ... RETURNING on a small WAL database (THROTTLE_DB)
+    'cache'   incr() on the 'shared' cache; atomic with CACHE_BACKEND=redis
+    'local'   in-process counters (single process / development)
+
+CostBudgetThrottle meters work instead of requests: each client gets a budget of
+DB query-milliseconds per period ('cost' rate), and CostBudgetMiddleware charges
+every response its measured query time (or the view's declared cost if higher).
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .cache import shared_cache
+from .db_stats import current_request_stats
+
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class SQLiteThrottleStore:
+    """Counters in a SQLite file; one autocommit UPSERT per hit"""
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS throttle_counter ('
+        'key TEXT PRIMARY KEY, window INTEGER NOT NULL, hits INTEGER NOT NULL, expires REAL NOT NULL'
+        ') WITHOUT ROWID'
+    )
+    HIT_SQL = (
+        'INSERT INTO throttle_counter (key, window, hits, expires) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT (key) DO UPDATE SET '
+        'hits = CASE WHEN window = excluded.window THEN hits + excluded.hits ELSE excluded.hits END, '
+        'window = excluded.window, expires = excluded.expires '
+        'RETURNING hits'
+    )
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')  # Counters are disposable
+            conn.execute(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, window, expires, amount=1):
+        """Add amount to key's counter for window (resetting older windows); returns the new total"""
+        return self._connection().execute(self.HIT_SQL, (key, window, amount, expires)).fetchone()[0]
+
+    def get(self, key, window):
+        row = self._connection().execute(
+            'SELECT hits FROM throttle_counter WHERE key = ? AND window = ?', (key, window)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def prune(self, now=None):
+        """Delete counters whose window has ended"""
+        return self._connection().execute(
+            'DELETE FROM throttle_counter WHERE expires < ?', (now or time.time(),)
+        ).rowcount
+
+
+class CacheThrottleStore:
+    """Counters in the shared cache, one key per window"""
+
+    def __init__(self, cache=shared_cache):
+        self.cache = cache
+
+    def hit(self, key, window, expires, amount=1):
+        cache_key = f'throttle:{key}:{window}'
+        try:
+            return self.cache.incr(cache_key, amount)
+        except ValueError:
+            if self.cache.add(cache_key, amount, max(1, int(expires - time.time()) + 1)):
+                return amount
+            return self.cache.incr(cache_key, amount)
+
+    def get(self, key, window):
+        return self.cache.get(f'throttle:{key}:{window}', 0)
+
+    def prune(self, now=None):
+        # Keys expire on their own
+        return 0
+
+
+class LocalThrottleStore:
+    """Per-process counters"""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, expires, amount=1):
+        with self._lock:
+            current_window, hits, _ = self._counters.get(key, (window, 0, expires))
+            hits = hits + amount if current_window == window else amount
+            self._counters[key] = (window, hits, expires)
+            return hits
+
+    def get(self, key, window):
+        with self._lock:
+            current_window, hits, _ = self._counters.get(key, (None, 0, 0))
+            return hits if current_window == window else 0
+
+    def prune(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [key for key, (_, _, expires) in self._counters.items() if expires < now]
+            for key in expired:
+                del self._counters[key]
+        return len(expired)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def build_store(name):
+    if name == 'sqlite':
+        return SQLiteThrottleStore(settings.THROTTLE_DB)
+    if name == 'cache':
+        return CacheThrottleStore()
+    if name == 'local':
+        return LocalThrottleStore()
+    raise ImproperlyConfigured(f"Unknown THROTTLE_STORE '{name}' (use sqlite, cache or local)")
+
+
+def get_store():
+    """The process-wide store selected by THROTTLE_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_store(settings.THROTTLE_STORE)
+    return _store
+
+
+# ============================================================================
+# THROTTLES
+# ============================================================================
+
+class SharedRateThrottleMixin:
+    """SimpleRateThrottle with a fixed-window counter in the shared store"""
+
+    store = None  # Defaults to get_store()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_ends = (window + 1) * self.duration
+        store = self.store or get_store()
+        self.hits = store.hit(self.key, window, self.window_ends)
+        return self.hits <= self.num_requests
+
+    def wait(self):
+        return max(0.0, self.window_ends - self.now)
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    pass
+
+
+# ============================================================================
+# COST BUDGETS
+# ============================================================================
+
+class CostBudget:
+    """A client's budget for the current window, attached to the request by CostBudgetThrottle"""
+    __slots__ = ('store', 'key', 'window', 'window_ends', 'limit', 'spent', 'declared_cost', 'allowed')
+
+    def __init__(self, store, key, window, window_ends, limit, spent, declared_cost):
+        self.store = store
+        self.key = key
+        self.window = window
+        self.window_ends = window_ends
+        self.limit = limit
+        self.spent = spent
+        self.declared_cost = declared_cost
+        self.allowed = spent < limit
+
+    def charge(self, measured_ms):
+        """Charge the request (at least its declared cost unless refused); returns the cost charged"""
+        cost = math.ceil(measured_ms)
+        if self.allowed:
+            cost = max(cost, self.declared_cost or 0)
+        if cost:
+            self.spent = self.store.hit(self.key, self.window, self.window_ends, cost)
+        return cost
+
+    def headers(self, cost, now):
+        return {
+            'X-Cost-Budget-Limit': str(self.limit),
+            'X-Cost-Budget-Remaining': str(max(0, self.limit - self.spent)),
+            'X-Cost-Budget-Reset': str(max(0, math.ceil(self.window_ends - now))),
+            'X-Request-Cost': str(cost),
+        }
+
+
+def declared_cost(view):
+    """Cost a view declares for its current action in request_costs (ms), if any"""
+    costs = getattr(view, 'request_costs', None) or {}
+    return costs.get(getattr(view, 'action', None))
+
+
+class CostBudgetThrottle(UserRateThrottle):
+    """
+    Refuse requests once a client has used its 'cost' budget of DB query-ms for
+    the window (per user, or per address for anonymous clients). The check only
+    reads the counter; CostBudgetMiddleware charges the request afterwards.
+    """
+    scope = 'cost'
+    store = None  # Defaults to get_store()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_ends = (window + 1) * self.duration
+        store = self.store or get_store()
+        budget = CostBudget(
+            store, self.key, window, self.window_ends, self.num_requests,
+            spent=store.get(self.key, window), declared_cost=declared_cost(view),
+        )
+        # CostBudgetMiddleware only sees the Django request
+        getattr(request, '_request', request).cost_budget = budget
+        return budget.allowed
+
+    def wait(self):
+        return max(0.0, self.window_ends - self.now)
+
+
+def charge_request(request):
+    """Charge the current request to its cost budget; returns response headers to add"""
+    budget = getattr(request, 'cost_budget', None)
+    if budget is None:
+        return {}
+    stats = current_request_stats()
+    cost = budget.charge(stats.query_ms if stats is not None else 0)
+    return budget.headers(cost, time.time())
@@ -0,0 +1,263 @@
+"""
+Resized variants of uploaded images (Student.profile_photo, Organization.logo).
+When a new image is saved, a background thread renders one variant per
+THUMBNAIL_SIZES entry (longest side in pixels). The source is decoded once: a
+JPEG is decoded in draft mode at the smallest DCT scale that still covers the
+largest box, so a 12-megapixel photo never decodes at full size. Variants are
+WebP (JPEG if this Pillow build has no WebP encoder) stored under
+thumbnails/<source content hash>-<size>.<ext>; a new upload means new names,
+so variants are served with an immutable Cache-Control (tracker.views.media).
+
+Serializers expose {size: url} through ThumbnailsField. Web workers
+(PROCESS_ROLE 'web') render nothing themselves; the worker's
+generate_missing_thumbnails task renders their uploads and backfills images
+the upload path missed.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, models
+from django.db.models import Count
+from rest_framework import serializers
+
+from .cache import LocalLRU, response_cache, tags_for_instance
+from .lazy import lazy_import
+from .models import Organization, Student, Thumbnail
+from .storage import blob_digest
+
+logger = logging.getLogger(__name__)
+
+Image = lazy_import('PIL.Image', 'Pillow')
+ImageOps = lazy_import('PIL.ImageOps', 'Pillow')
+features = lazy_import('PIL.features', 'Pillow')
+
+IMAGE_FIELDS = {Student: 'profile_photo', Organization: 'logo'}
+VARIANT_DIR = 'thumbnails'
+
+# source name -> {size: variant name}; sources never change content under one name
+_variants = LocalLRU(max_entries=10000, timeout=300)
+MISSING_TIMEOUT = 30  # Re-check sources without variants this soon (another process may be rendering them)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def output_format():
+    """(Pillow format, file extension) for new variants"""
+    if settings.THUMBNAIL_FORMAT == 'webp' and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def content_hash(file):
+    """sha256 of a file object, read in chunks; leaves it rewound"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def render_variants(file, sizes, image_format, quality=None, draft=True):
+    """{size: (bytes, width, height)} for each (size, longest side) in sizes, from one decode"""
+    quality = quality or settings.THUMBNAIL_QUALITY
+    largest = max(box for _, box in sizes)
+    with Image.open(file) as image:
+        if draft:
+            # JPEG only: decode at 1/2, 1/4 or 1/8 scale when that still covers the box
+            image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        if image_format == 'JPEG' and image.mode == 'RGBA':
+            flattened = Image.new('RGB', image.size, (255, 255, 255))
+            flattened.paste(image, mask=image.getchannel('A'))
+            image = flattened
+
+        variants = {}
+        # Largest first, each resized from the previous one
+        for size, box in sorted(sizes, key=lambda item: -item[1]):
+            image.thumbnail((box, box), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            output = io.BytesIO()
+            options = {'method': 4} if image_format == 'WEBP' else {'optimize': True, 'progressive': True}
+            image.save(output, image_format, quality=quality, **options)
+            variants[size] = (output.getvalue(), image.width, image.height)
+    return variants
+
+
+def variant_name(digest, size, extension):
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest[:32]}-{size}.{extension}'
+
+
+def generate(source_name):
+    """Render and store every configured variant of source_name; returns {size: variant name}"""
+    image_format, extension = output_format()
+    with default_storage.open(source_name, 'rb') as source:
+        # Blob names already carry the hash (tracker.storage)
+        digest = blob_digest(source_name) or content_hash(source)
+        sizes = list(settings.THUMBNAIL_SIZES.items())
+        names = {size: variant_name(digest, size, extension) for size, _ in sizes}
+        missing = [(size, box) for size, box in sizes if not default_storage.exists(names[size])]
+        rendered = render_variants(source, missing, image_format) if missing else {}
+
+    for size, box in sizes:
+        if size in rendered:
+            content, width, height = rendered[size]
+            default_storage.save(names[size], ContentFile(content))
+        else:
+            # The same image was uploaded before; reuse its variants
+            with default_storage.open(names[size], 'rb') as existing:
+                content = existing.read()
+            with Image.open(io.BytesIO(content)) as image:
+                width, height = image.size
+        Thumbnail.objects.update_or_create(
+            source=source_name, size=size,
+            defaults={'name': names[size], 'width': width, 'height': height, 'file_size': len(content)},
+        )
+    _variants.set(source_name, names)
+    return names
+
+
+# ============================================================================
+# BACKGROUND GENERATION
+# ============================================================================
+
+def _reset_executor():
+    global _executor
+    _executor = None
+
+
+# Pool threads do not survive a fork (gunicorn --preload)
+os.register_at_fork(after_in_child=_reset_executor)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+    return _executor
+
+
+def render(source_name):
+    """generate() and retire the cached organization responses rendered without the new URLs"""
+    generate(source_name)
+    for organization in Organization.objects.filter(logo=source_name):
+        response_cache.invalidate(tags_for_instance(organization))
+
+
+def _generate_in_background(source_name):
+    try:
+        render(source_name)
+    except Exception as e:
+        # Left for the generate_missing_thumbnails task
+        logger.error(f"Thumbnails for {source_name} failed: {e}")
+    finally:
+        # This thread's connections; the pool keeps the thread alive between uploads
+        connections.close_all()
+
+
+def schedule(source_name):
+    """Render source_name's variants on a background thread (call after commit); a no-op in the web role"""
+    if settings.PROCESS_ROLE == 'web':
+        # Decoding images would compete with requests: generate_missing_thumbnails renders it
+        return
+    if settings.THUMBNAILS_ENABLED and source_name:
+        _get_executor().submit(_generate_in_background, source_name)
+
+
+def missing_sources(limit=None):
+    """Image names referenced by students and organizations that lack some configured variant"""
+    expected = len(settings.THUMBNAIL_SIZES)
+    complete = {
+        source for source, count in _counts_by_source().items() if count >= expected
+    }
+    missing = []
+    for model, field in IMAGE_FIELDS.items():
+        names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+        missing.extend(name for name in names.iterator() if name not in complete)
+    return missing[:limit] if limit else missing
+
+
+def _counts_by_source():
+    rows = Thumbnail.objects.filter(size__in=list(settings.THUMBNAIL_SIZES)).values('source').annotate(n=Count('id'))
+    return {row['source']: row['n'] for row in rows}
+
+
+# ============================================================================
+# LOOKUP AND SERIALIZERS
+# ============================================================================
+
+def variants(source_name):
+    """{size: variant name} of source_name; empty until its variants exist"""
+    if not source_name:
+        return {}
+    names = _variants.get(source_name)
+    if names is None:
+        names = dict(Thumbnail.objects.filter(source=source_name).values_list('size', 'name'))
+        _variants.set(source_name, names, None if names else MISSING_TIMEOUT)
+    return names
+
+
+def warm(source_names):
+    """Load the variants of many sources with one query (list pages)"""
+    wanted = [name for name in set(source_names) if name and _variants.get(name) is None]
+    if not wanted:
+        return
+    found = {name: {} for name in wanted}
+    for source, size, name in Thumbnail.objects.filter(source__in=wanted).values_list('source', 'size', 'name'):
+        found[source][size] = name
+    for source, names in found.items():
+        _variants.set(source, names, None if names else MISSING_TIMEOUT)
+
+
+def forget(source_names):
+    for name in source_names:
+        _variants.delete(name)
+
+
+class ThumbnailsField(serializers.Field):
+    """
+    {size: absolute URL} for the variants of an image field, e.g.
+    ThumbnailsField(source='logo'); {} while they are being rendered.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        names = variants(getattr(value, 'name', None))
+        request = self.context.get('request')
+        urls = {}
+        for size, name in names.items():
+            url = default_storage.url(name)
+            urls[size] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
+class ThumbnailListSerializer(serializers.ListSerializer):
+    """Loads the thumbnails of a whole page with one query before rendering it"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        image_fields = {
+            field.source for field in self.child.fields.values() if isinstance(field, ThumbnailsField)
+        }
+        warm(
+            getattr(getattr(item, source, None), 'name', None) for item in items for source in image_fields
+        )
+        return super().to_representation(items)
@@ -0,0 +1,371 @@
+"""
+Lightweight per-request tracing.
+TracingMiddleware opens a trace per request; inside it, span() records nested,
+timed spans: the view action (TracedViewMixin), DRF's auth/permission/throttle
+checks, serializer validation, save and rendering (TracedSerializerMixin), the
+SmartMatcher criteria and every DB query (an execute wrapper). Outside a trace
+span() is a shared no-op, so instrumented code costs one ContextVar lookup.
+
+Sampling is tail-based: the whole trace is kept in memory and exported only if
+the request was slow (TRACE_SLOW_MS), failed (5xx, an exception or a failed
+span), was sampled upstream (W3C traceparent flag) or falls in TRACE_SAMPLE_RATE.
+Kept traces are written by the 'tracker.traces' logger as one OTLP/JSON
+ExportTraceServiceRequest per line (the OpenTelemetry Collector file exporter
+format) to a size-rotated TRACE_FILE, and the response carries X-Trace-Id.
+"""
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.serializers import ListSerializer
+
+from .logs import current_user_id
+from .slow_queries import calling_frame
+
+logger = logging.getLogger('tracker.traces')
+
+_trace = ContextVar('current_trace', default=None)
+
+TRACEPARENT_HEADER = 'HTTP_TRACEPARENT'
+SERVICE_NAME = 'sitms'
+
+# OTLP SpanKind and StatusCode values
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+
+def _new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+# ============================================================================
+# TRACES AND SPANS
+# ============================================================================
+
+class Trace:
+    """Finished spans of one request, held until the sampling decision"""
+    __slots__ = ('trace_id', 'remote_parent_id', 'upstream_sampled', 'epoch_ns', 'perf_ns', 'stack', 'spans',
+                 'dropped', 'max_spans', 'failed')
+
+    def __init__(self, trace_id=None, remote_parent_id=None, upstream_sampled=False):
+        self.trace_id = trace_id or _new_id(128)
+        self.remote_parent_id = remote_parent_id
+        self.upstream_sampled = upstream_sampled
+        # Span times are perf_counter offsets from this wall-clock anchor
+        self.epoch_ns = time.time_ns()
+        self.perf_ns = time.perf_counter_ns()
+        self.stack = []
+        self.spans = []
+        self.dropped = 0
+        self.max_spans = settings.TRACE_MAX_SPANS
+        self.failed = False
+
+    def unix_ns(self, perf_ns):
+        return self.epoch_ns + perf_ns - self.perf_ns
+
+    def add(self, span):
+        if span.error:
+            self.failed = True
+        if len(self.spans) < self.max_spans or span.parent_id == self.remote_parent_id:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'kind', 'attributes', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'error')
+
+    def __init__(self, trace, name, kind, attributes):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.error = None
+
+    def __enter__(self):
+        trace = self.trace
+        self.parent_id = trace.stack[-1] if trace.stack else trace.remote_parent_id
+        self.span_id = _new_id(64)
+        trace.stack.append(self.span_id)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        self.trace.stack.pop()
+        if exc_type is not None and self.error is None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        self.trace.add(self)
+        return False
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, message):
+        self.error = message
+
+
+class _NoopSpan:
+    """Returned by span() outside a trace"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def fail(self, message):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_trace():
+    return _trace.get()
+
+
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Context manager timing a child of the current span; a no-op outside a traced request"""
+    trace = _trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return Span(trace, name, kind, attributes)
+
+
+def traced(name):
+    """Decorator: run the function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def parse_traceparent(value):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None"""
+    parts = (value or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+# ============================================================================
+# REQUEST LIFECYCLE
+# ============================================================================
+
+def trace_request(request, get_response):
+    """Run get_response inside a request trace; export it if the tail sampler keeps it"""
+    if not settings.TRACE_ENABLED:
+        return get_response(request)
+
+    trace, root, token = _open_trace(request)
+    try:
+        with root:
+            response = get_response(request)
+            _record_status(root, response)
+    finally:
+        kept = _close_trace(request, trace, root, token)
+
+    if kept:
+        response['X-Trace-Id'] = trace.trace_id
+    return response
+
+
+async def atrace_request(request, get_response):
+    """trace_request() for the async path"""
+    if not settings.TRACE_ENABLED:
+        return await get_response(request)
+
+    trace, root, token = _open_trace(request)
+    try:
+        with root:
+            response = await get_response(request)
+            _record_status(root, response)
+    finally:
+        kept = _close_trace(request, trace, root, token)
+
+    if kept:
+        response['X-Trace-Id'] = trace.trace_id
+    return response
+
+
+def _open_trace(request):
+    trace = Trace(*(parse_traceparent(request.META.get(TRACEPARENT_HEADER)) or ()))
+    token = _trace.set(trace)
+    root = Span(trace, f'{request.method} {request.path_info}', KIND_SERVER, {'http.method': request.method})
+    return trace, root, token
+
+
+def _record_status(root, response):
+    root.set('http.status_code', response.status_code)
+    if response.status_code >= 500:
+        root.fail(f'HTTP {response.status_code}')
+
+
+def _close_trace(request, trace, root, token):
+    """Name the root span after the route and export the trace if kept; returns whether it was"""
+    _trace.reset(token)
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.view_name:
+        # OTel names server spans by route, not by the concrete path
+        root.name = f'{request.method} {match.view_name}'
+        root.set('http.route', match.route)
+    root.set('http.target', request.get_full_path())
+    root.set('request.id', getattr(request, 'request_id', None))
+    kept = keep(trace, root)
+    if kept:
+        export(trace, **{'enduser.id': current_user_id(request)})
+    return kept
+
+
+def keep(trace, root):
+    """Tail-based sampling: slow, failed, sampled upstream, or the random baseline"""
+    duration_ms = (root.end_ns - root.start_ns) / 1e6
+    return (
+        trace.failed
+        or duration_ms >= settings.TRACE_SLOW_MS
+        or trace.upstream_sampled
+        or random.random() < settings.TRACE_SAMPLE_RATE
+    )
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+class TracedViewMixin:
+    """A span per view action ('ApplicationViewSet.accept'), with DRF's checks as a child span"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if _trace.get() is None:
+            return super().dispatch(request, *args, **kwargs)
+        action = getattr(self, 'action_map', {}).get(request.method.lower(), request.method.lower())
+        with span(f'{type(self).__name__}.{action}', view=type(self).__name__, action=action) as view_span:
+            response = super().dispatch(request, *args, **kwargs)
+            view_span.set('http.status_code', response.status_code)
+            return response
+
+    def initial(self, request, *args, **kwargs):
+        with span('drf.initial'):
+            # Authentication, permission and throttle checks
+            return super().initial(request, *args, **kwargs)
+
+
+def _is_top_level(serializer):
+    """The serializer a view built, or one item of it when many=True; nested fields get no spans"""
+    parent = serializer.parent
+    return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+
+class TracedSerializerMixin:
+    """Spans for validating, saving and rendering a top-level serializer (or each item of a list)"""
+
+    def is_valid(self, *args, **kwargs):
+        with span(f'{type(self).__name__}.validate') as validate_span:
+            valid = super().is_valid(*args, **kwargs)
+            validate_span.set('valid', valid)
+            return valid
+
+    def save(self, **kwargs):
+        with span(f'{type(self).__name__}.save'):
+            return super().save(**kwargs)
+
+    def to_representation(self, instance):
+        if _trace.get() is None or not _is_top_level(self):
+            return super().to_representation(instance)
+        with span(f'{type(self).__name__}.serialize'):
+            return super().to_representation(instance)
+
+
+def install_db_tracing(connection):
+    """A client span per statement run on this connection inside a traced request"""
+    if not settings.TRACE_ENABLED or getattr(connection, '_db_tracing_installed', False):
+        return
+
+    def trace_queries(execute, sql, params, many, context):
+        if _trace.get() is None:
+            return execute(sql, params, many, context)
+        with span(
+            'db.query', KIND_CLIENT, **{
+                'db.system': connection.vendor,
+                'db.name': connection.alias,
+                'db.statement': sql[:settings.TRACE_MAX_STATEMENT_LENGTH],
+                'code.function': calling_frame(),
+            }
+        ) as query_span:
+            if many:
+                query_span.set('db.executemany', True)
+            return execute(sql, params, many, context)
+
+    connection.execute_wrappers.append(trace_queries)
+    connection._db_tracing_installed = True
+
+
+# ============================================================================
+# OTLP/JSON EXPORT
+# ============================================================================
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def _otlp_span(trace, span):
+    entry = {
+        'traceId': trace.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(trace.unix_ns(span.start_ns)),
+        'endTimeUnixNano': str(trace.unix_ns(span.end_ns)),
+        'attributes': [_attribute(key, value) for key, value in span.attributes.items() if value is not None],
+    }
+    if span.parent_id:
+        entry['parentSpanId'] = span.parent_id
+    if span.error:
+        entry['status'] = {'code': STATUS_ERROR, 'message': span.error}
+    return entry
+
+
+def export(trace, **attributes):
+    """Log the trace as one OTLP/JSON line; the root span carries attributes and the dropped-span count"""
+    spans = [_otlp_span(trace, span) for span in trace.spans]
+    root = spans[-1]
+    root['attributes'].extend(_attribute(key, value) for key, value in attributes.items() if value is not None)
+    if trace.dropped:
+        root['attributes'].append(_attribute('tracker.dropped_spans', trace.dropped))
+    payload = {'resourceSpans': [{
+        'resource': {'attributes': [
+            _attribute('service.name', SERVICE_NAME), _attribute('process.pid', os.getpid()),
+        ]},
+        'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+    }]}
+    logger.info(json.dumps(payload, separators=(',', ':')))
@@ -1,18 +1,33 @@
+import asyncio
+import json
+import mimetypes
+import os
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.authtoken.models import Token
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import AuthenticationFailed
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.static import serve
 from django.db.models import Q
 from django.utils import timezone
+from django.utils._os import safe_join
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
     Institution, Department, Course, Skill, Student, Organization,
     TrainingOpportunity, Application, ApplicationStatusHistory, Notification,
-    SystemConfig, Review
+    SystemConfig, Review, CVDocument
 )
 from .serializers import (
     InstitutionSerializer, DepartmentSerializer, CourseSerializer, SkillSerializer,
@@ -21,9 +36,17 @@ from .serializers import (
     TrainingOpportunityDetailSerializer, ApplicationListSerializer,
     ApplicationDetailSerializer, NotificationSerializer, ReviewSerializer,
     StudentRegistrationSerializer, OrganizationRegistrationSerializer,
-    UserDetailSerializer
+    UserDetailSerializer, LetterBatchSerializer, CVDocumentSerializer
 )
+from .authentication import CachedTokenAuthentication
+from .cache import CachedResponseMixin, response_cache
+from .db_router import ReplicaReadMixin
+from . import cv_ingestion, letters, metrics
 from .matching import SmartMatcher
+from .notifications import get_unread_count, reset_unread_count
+from .streaming import broadcaster, fetch_backlog
+from . import storage, thumbnails
+from .tracing import TracedViewMixin
 
 
 # ============================================================================
@@ -83,6 +106,54 @@ def login(request):
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Response cache hit/miss counters for this process"""
+    return Response(response_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Per-route request metrics of all worker processes, in Prometheus text format"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def media(request, path):
+    """
+    Serve an upload or thumbnail. The web server sends the bytes (X-Accel-Redirect
+    or X-Sendfile, see MEDIA_SENDFILE); content-hashed names are cached for good.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if path.startswith(f'{storage.BLOB_DIR}/tmp/') or not os.path.isfile(full_path):
+        raise Http404
+
+    if settings.MEDIA_SENDFILE in ('x-accel', 'x-sendfile'):
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if settings.MEDIA_SENDFILE == 'x-accel':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    digest = storage.blob_digest(path)
+    if digest or path.startswith(f'{thumbnails.VARIANT_DIR}/'):
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_IMMUTABLE_CACHE_SECONDS}, immutable'
+        if digest:
+            response['ETag'] = f'"{digest}"'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
@@ -105,7 +176,8 @@ def user_profile(request):
 # INSTITUTION VIEWSETS
 # ============================================================================
 
-class InstitutionViewSet(viewsets.ModelViewSet):
+class InstitutionViewSet(TracedViewMixin, CachedResponseMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    cache_tag = 'institution'
     queryset = Institution.objects.filter(is_active=True)
     serializer_class = InstitutionSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -121,7 +193,9 @@ class InstitutionViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(TracedViewMixin, CachedResponseMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    cache_tag = 'department'
+    cache_depends_on = ('institution',)
     queryset = Department.objects.filter(is_active=True)
     serializer_class = DepartmentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -142,7 +216,9 @@ class DepartmentViewSet(viewsets.ModelViewSet):
 # COURSE & SKILL VIEWSETS
 # ============================================================================
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(TracedViewMixin, CachedResponseMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    cache_tag = 'course'
+    cache_depends_on = ('department',)
     queryset = Course.objects.filter(is_active=True)
     serializer_class = CourseSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -159,7 +235,8 @@ class CourseViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class SkillViewSet(viewsets.ModelViewSet):
+class SkillViewSet(TracedViewMixin, CachedResponseMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    cache_tag = 'skill'
     queryset = Skill.objects.filter(is_active=True)
     serializer_class = SkillSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -179,7 +256,7 @@ class SkillViewSet(viewsets.ModelViewSet):
 # STUDENT VIEWSETS
 # ============================================================================
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['institution', 'course', 'academic_level', 'is_placed']
@@ -218,13 +295,69 @@ class StudentViewSet(viewsets.ModelViewSet):
         skills = Skill.objects.filter(id__in=skill_ids)
         student.skills.set(skills)
         return Response(StudentDetailSerializer(student).data)
+    
+    @action(detail=False, methods=['get', 'post'], permission_classes=[IsAuthenticated])
+    def my_cv(self, request):
+        """POST uploads a PDF CV to extract skills from; GET shows the latest CV and the skills found in it"""
+        try:
+            student = request.user.student_profile
+        except Student.DoesNotExist:
+            return Response({'error': 'Not a student'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.method == 'GET':
+            cv = student.cvs.prefetch_related('skill_suggestions__skill').first()
+            if cv is None:
+                return Response({'error': 'No CV uploaded'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(CVDocumentSerializer(cv).data)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Attach the CV as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > settings.CV_MAX_UPLOAD_BYTES:
+            return Response(
+                {'error': f'CVs are limited to {settings.CV_MAX_UPLOAD_BYTES // (1024 * 1024)} MB'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if upload.read(5) != b'%PDF-':
+            return Response({'error': 'Only PDF CVs are supported'}, status=status.HTTP_400_BAD_REQUEST)
+        upload.seek(0)
+        
+        cv = CVDocument.objects.create(
+            student=student, uploaded_by=request.user, file=upload,
+            original_name=upload.name[:255], file_size=upload.size
+        )
+        transaction.on_commit(lambda: cv_ingestion.schedule(cv.pk))
+        return Response(CVDocumentSerializer(cv).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['post'], url_path='my_cv/skills', permission_classes=[IsAuthenticated])
+    def review_cv_skills(self, request):
+        """Accept or reject skills proposed from the latest CV: {"accept": [skill ids], "reject": [skill ids]}"""
+        try:
+            student = request.user.student_profile
+        except Student.DoesNotExist:
+            return Response({'error': 'Not a student'}, status=status.HTTP_400_BAD_REQUEST)
+        cv = student.cvs.first()
+        if cv is None:
+            return Response({'error': 'No CV uploaded'}, status=status.HTTP_404_NOT_FOUND)
+        
+        proposed = cv.skill_suggestions.filter(status='proposed')
+        accepted = list(proposed.filter(skill_id__in=request.data.get('accept', [])).values_list('skill_id', flat=True))
+        student.skills.add(*accepted)
+        proposed.filter(skill_id__in=accepted).update(status='accepted')
+        proposed.filter(skill_id__in=request.data.get('reject', [])).update(status='rejected')
+        
+        cv = student.cvs.prefetch_related('skill_suggestions__skill').get(pk=cv.pk)
+        return Response(CVDocumentSerializer(cv).data)
 
 
 # ============================================================================
 # ORGANIZATION VIEWSETS
 # ============================================================================
 
-class OrganizationViewSet(viewsets.ModelViewSet):
+class OrganizationViewSet(TracedViewMixin, CachedResponseMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    replica_actions = ('list',)
+    cache_tag = 'organization'
+    cache_depends_on = ('course', 'skill')
     queryset = Organization.objects.filter(is_active=True)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_verified', 'industry_type']
@@ -260,7 +393,8 @@ class OrganizationViewSet(viewsets.ModelViewSet):
 # TRAINING OPPORTUNITY VIEWSETS
 # ============================================================================
 
-class TrainingOpportunityViewSet(viewsets.ModelViewSet):
+class TrainingOpportunityViewSet(TracedViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    replica_actions = ('list',)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['organization', 'is_open', 'supported_levels']
     search_fields = ['title', 'description', 'organization__name']
@@ -268,6 +402,9 @@ class TrainingOpportunityViewSet(viewsets.ModelViewSet):
     ordering = ['-posted_at']
     pagination_class = PageNumberPagination
     
+    # Minimum cost charged to the client's DB budget (CostBudgetThrottle); matching is mostly Python work
+    request_costs = {'matched_opportunities': 250}
+
     def get_queryset(self):
         queryset = TrainingOpportunity.objects.filter(is_active=True)
         
@@ -331,13 +468,54 @@ class TrainingOpportunityViewSet(viewsets.ModelViewSet):
             return Response(data)
         except Student.DoesNotExist:
             return Response({'error': 'Not a student'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def _check_letter_access(self, request, opportunity):
+        if request.user.is_staff or opportunity.organization.user_id == request.user.pk:
+            return None
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    @action(detail=True, methods=['get', 'post'], url_path='acceptance-letters', permission_classes=[IsAuthenticated])
+    def acceptance_letters(self, request, pk=None):
+        """POST renders the letters of every accepted application in one background job; GET shows its progress"""
+        opportunity = self.get_object()
+        denied = self._check_letter_access(request, opportunity)
+        if denied:
+            return denied
+        
+        if request.method == 'POST':
+            batch = letters.start_batch(opportunity, request.user)
+            return Response(LetterBatchSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
+        
+        batch = opportunity.letter_batches.first()
+        if batch is None:
+            return Response({'error': 'No letters requested yet'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(LetterBatchSerializer(batch).data)
+    
+    @action(detail=True, methods=['get'], url_path='acceptance-letters/download', permission_classes=[IsAuthenticated])
+    def download_acceptance_letters(self, request, pk=None):
+        """All acceptance letters of the opportunity as one ZIP, built while it streams"""
+        opportunity = self.get_object()
+        denied = self._check_letter_access(request, opportunity)
+        if denied:
+            return denied
+        
+        members = letters.batch_members(opportunity)
+        missing = letters.letter_applications(training_opportunity=opportunity).count() - len(members)
+        if missing > 0:
+            return Response(
+                {'error': 'Some letters are not rendered yet; POST acceptance-letters first', 'missing': missing},
+                status=status.HTTP_409_CONFLICT
+            )
+        response = StreamingHttpResponse(letters.stream_zip(members), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="acceptance-letters-{opportunity.pk}.zip"'
+        return response
 
 
 # ============================================================================
 # APPLICATION VIEWSETS
 # ============================================================================
 
-class ApplicationViewSet(viewsets.ModelViewSet):
+class ApplicationViewSet(TracedViewMixin, viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['student', 'organization', 'status']
     search_fields = ['student__user__first_name', 'student__user__last_name', 'organization__name']
@@ -442,8 +620,24 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             notes=acceptance_letter
         )
         
+        # Have the PDF ready before anyone downloads it
+        transaction.on_commit(lambda: letters.schedule_letter(application.pk))
+        
         return Response(ApplicationDetailSerializer(application).data)
     
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def letter(self, request, pk=None):
+        """Download the acceptance letter as PDF"""
+        application = self.get_object()
+        if application.status not in letters.LETTER_STATUSES:
+            return Response({'error': 'Application has not been accepted'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        letter = letters.get_letter(application)
+        return FileResponse(
+            letters.letter_storage().open(letter.name, 'rb'), as_attachment=True,
+            filename=f'acceptance-letter-{application.pk}.pdf', content_type='application/pdf'
+        )
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def reject(self, request, pk=None):
         """Reject an application"""
@@ -515,7 +709,7 @@ class ApplicationViewSet(viewsets.ModelViewSet):
 # NOTIFICATION VIEWSETS
 # ============================================================================
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(TracedViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['is_read']
@@ -541,14 +735,97 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             is_read=True,
             read_at=timezone.now()
         )
+        reset_unread_count(request.user.id)
         return Response({'status': 'All notifications marked as read'})
+    
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Get the unread notification count (served from the cached counter)"""
+        return Response({'unread_count': get_unread_count(request.user)})
+
+
+# ============================================================================
+# NOTIFICATION STREAM (SERVER-SENT EVENTS, ASGI ONLY)
+# ============================================================================
+
+def _stream_user(request):
+    """Resolve the stream user from a DRF token (header or ?token=) or the session"""
+    key = None
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) == 2 and auth[0].lower() == 'token':
+        key = auth[1]
+    elif request.GET.get('token'):
+        # EventSource cannot set headers, so browsers pass the token in the query
+        key = request.GET['token']
+    
+    if key:
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+            return user
+        except AuthenticationFailed:
+            return None
+    
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+def _sse_event(event_id, payload):
+    return f"id: {event_id}\nevent: notification\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def notification_stream(request):
+    """Push new notifications to the client as server-sent events"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Notification stream requires the ASGI server'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+    retry_ms = getattr(settings, 'NOTIFICATION_STREAM_RETRY_MS', 3000)
+    
+    async def events():
+        # Subscribe before reading the backlog so nothing falls in between
+        queue = broadcaster.subscribe(user.id)
+        sent = set()  # Backlog events, which the queue may offer again
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            if last_event_id:
+                for event_id, payload in await sync_to_async(fetch_backlog)(user.id, last_event_id):
+                    sent.add(event_id)
+                    yield _sse_event(event_id, payload)
+            
+            while not queue.overflowed:
+                try:
+                    event_id, payload = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event_id in sent:
+                    # Ids commit out of order, so only a repeat of the backlog is skipped
+                    sent.discard(event_id)
+                    continue
+                yield _sse_event(event_id, payload)
+        finally:
+            broadcaster.unsubscribe(user.id, queue)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # ============================================================================
 # REVIEW VIEWSETS
 # ============================================================================
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(TracedViewMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['organization', 'rating']